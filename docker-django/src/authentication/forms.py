@@ -2,6 +2,7 @@ from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from authentication.models import Usuario
 from jogo_empresa.models import Empresa
+from jogo_empresa.widgets import AutocompleteInput, rotulo_empresa, rotulo_jogo
 from jogos.models import Jogo
 from django.contrib.auth.models import Group
 from django.db import transaction
@@ -61,14 +62,24 @@ class AdminUserCreationForm(UserCreationForm):
         required=True,
     )
 
+    # Jogo e empresa são buscados por autocomplete: as opções não vão
+    # todas para a página, só o valor escolhido é validado
+    empresa = forms.ModelChoiceField(
+        queryset=Empresa.objects.all(),
+        required=False,
+        label="Empresa",
+        widget=AutocompleteInput('jogo_empresa:autocomplete_empresas', rotulo=rotulo_empresa),
+    )
+
     codigo_de_jogo = forms.ModelChoiceField(
         queryset=Jogo.objects.all(),
         to_field_name='cod',
         required=False,
         label="Código de Jogo",
-        widget=forms.Select(attrs={
-            'id': 'id_codigo_de_jogo_selector'
-        })
+        widget=AutocompleteInput(
+            'jogo_empresa:autocomplete_jogos', campo_valor='cod', rotulo=rotulo_jogo,
+            attrs={'id': 'id_codigo_de_jogo_selector'},
+        )
     )
 
     class Meta(UserCreationForm.Meta):
@@ -83,12 +94,9 @@ class AdminUserCreationForm(UserCreationForm):
             ('mediador', 'Vincular como Mediador'),
             ('diretor', 'Vincular como Diretor (Sem vincular ao jogo)'),
             ('diretor_com_jogo', 'Vincular Apenas ao Jogo por Enquanto'),
+            ('empresa', 'Vincular a uma Empresa'),
         ]
 
-        empresas = Empresa.objects.all().order_by('nome')
-        for empresa in empresas:
-            choices.append((f'empresa_{empresa.pk}', f'{empresa.pk}# {empresa.nome}'))
-
         self.fields['vinculo'].choices = choices
 
     def clean(self):
@@ -103,6 +111,9 @@ class AdminUserCreationForm(UserCreationForm):
                 "Você deve selecionar um jogo para criar um usuário com este vínculo."
             )
 
+        if vinculo == 'empresa' and not cleaned_data.get("empresa"):
+            self.add_error('empresa', "Selecione a empresa do usuário.")
+
         if vinculo == 'diretor':
             cleaned_data['codigo_de_jogo'] = None
             
@@ -138,17 +149,11 @@ class AdminUserCreationForm(UserCreationForm):
                 user.save()
                 user.groups.add(diretor_group)
 
-        elif vinculo_selecionado.startswith('empresa_'):
-            empresa_id = int(vinculo_selecionado.split('_')[1])
-            try:
-                empresa_obj = Empresa.objects.get(pk=empresa_id)
-                user.empresa = empresa_obj
-                if commit:
-                    user.save()
-                    user.groups.add(diretor_group)
-            except Empresa.DoesNotExist:
-                self.add_error('vinculo', 'A empresa selecionada não é mais válida.')
-                return user
+        elif vinculo_selecionado == 'empresa':
+            user.empresa = self.cleaned_data.get("empresa")
+            if commit:
+                user.save()
+                user.groups.add(diretor_group)
         
         if commit:
             user.save()
@@ -162,16 +167,25 @@ class AdminUserEditForm(forms.ModelForm):
         required=True,
     )
     
+    empresa = forms.ModelChoiceField(
+        queryset=Empresa.objects.all(),
+        required=False,
+        label="Empresa",
+        widget=AutocompleteInput('jogo_empresa:autocomplete_empresas', rotulo=rotulo_empresa),
+    )
+
     codigo_de_jogo = forms.ModelChoiceField(
         queryset=Jogo.objects.all(),
+        to_field_name='cod',
         label="Jogo",
         required=False,
-        help_text="Selecione um jogo se o vínculo for 'Apenas ao Jogo' ou à uma empresa."
+        help_text="Selecione um jogo se o vínculo for 'Apenas ao Jogo' ou à uma empresa.",
+        widget=AutocompleteInput('jogo_empresa:autocomplete_jogos', campo_valor='cod', rotulo=rotulo_jogo),
     )
 
     class Meta:
         model = Usuario
-        fields = ['username', 'email', 'cpf', 'vinculo', 'codigo_de_jogo']
+        fields = ['username', 'email', 'cpf', 'vinculo', 'empresa', 'codigo_de_jogo']
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -181,21 +195,22 @@ class AdminUserEditForm(forms.ModelForm):
             ('mediador', 'Vincular como Mediador'),
             ('diretor', 'Vincular como Diretor'),
             ('diretor_com_jogo', 'Vincular Apenas ao Jogo'),
+            ('empresa', 'Vincular a uma Empresa'),
         ]
-        empresas = Empresa.objects.all().order_by('nome')
-        for empresa in empresas:
-            choices.append((f'empresa_{empresa.pk}', f'Vincular à Empresa: {empresa.nome}'))
-            
         self.fields['vinculo'].choices = choices
 
         if self.instance and self.instance.pk:
             user = self.instance
             initial_vinculo = ''
+
+            # O campo de jogo guarda o código, não a chave primária
+            if user.codigo_de_jogo:
+                self.initial['codigo_de_jogo'] = user.codigo_de_jogo.cod
             
             if user.groups.filter(name='Mediador').exists():
                 initial_vinculo = 'mediador'
             elif user.empresa:
-                initial_vinculo = f'empresa_{user.empresa.pk}'
+                initial_vinculo = 'empresa'
             elif user.codigo_de_jogo:
                 initial_vinculo = 'diretor_com_jogo'
                 self.fields['codigo_de_jogo'].initial = user.codigo_de_jogo
@@ -214,6 +229,9 @@ class AdminUserEditForm(forms.ModelForm):
                 'codigo_de_jogo', 
                 "Você deve selecionar um jogo para este tipo de vínculo."
             )
+
+        if vinculo == 'empresa' and not cleaned_data.get("empresa"):
+            self.add_error('empresa', "Selecione a empresa do usuário.")
         
         if vinculo in ['mediador', 'diretor']:
             cleaned_data['codigo_de_jogo'] = None
@@ -246,9 +264,8 @@ class AdminUserEditForm(forms.ModelForm):
         elif vinculo_selecionado == 'diretor_com_jogo':
             user.groups.add(diretor_group)
 
-        elif vinculo_selecionado.startswith('empresa_'):
-            empresa_id = int(vinculo_selecionado.split('_')[1])
-            user.empresa = Empresa.objects.get(pk=empresa_id)
+        elif vinculo_selecionado == 'empresa':
+            user.empresa = self.cleaned_data.get("empresa")
             user.groups.add(diretor_group)
         
         if commit:
@@ -3,11 +3,29 @@ from django.urls import reverse
 from django.contrib.auth.models import Group
 from django.core.exceptions import ValidationError
 from .models import Usuario, validate_cpf
-from .forms import RegisterForm, AdminUserCreationForm
+from .forms import RegisterForm, AdminUserCreationForm, AdminUserEditForm
 from jogos.models import Jogo
 from jogo_empresa.models import Empresa
 from cenarios.models import Cenario, Produto, Insumo
 
+def criar_mediador(username='mediador'):
+    return Usuario.objects.create_user(
+        username=username,
+        email=f'{username}@teste.com',
+        password='senha-forte-123',
+        cpf=username[:14],
+    )
+
+def criar_jogo_com_empresa(criador, cod='TEST123'):
+    """Cadeia mínima Insumo -> Produto -> Cenário -> Jogo -> Empresa, criada pelo mediador."""
+    insumo = Insumo.objects.create(nome='Insumo Teste', fornecedor='Fornecedor Teste', criador=criador)
+    produto = Produto.objects.create(nome='Produto Teste', criador=criador)
+    produto.insumos.add(insumo)
+    cenario = Cenario.objects.create(nome='Cenario Teste', produto=produto, criador=criador)
+    jogo = Jogo.objects.create(nome=f'Jogo {cod}', cod=cod, cenario=cenario, criador=criador)
+    empresa = Empresa.objects.create(nome=f'Empresa {cod}', jogo=jogo, criador=criador)
+    return jogo, empresa
+
 class UsuarioModelTest(TestCase):
     def setUp(self):
         self.user_data = {
@@ -48,29 +66,8 @@ class CpfValidatorTest(TestCase):
 
 class RegisterFormTest(TestCase):
     def setUp(self):
-        # Criar cenário necessário primeiro
-        self.insumo = Insumo.objects.create(
-            nome='Insumo Teste',
-            fornecedor='Fornecedor Teste'
-        )
-        self.produto = Produto.objects.create(nome='Produto Teste')
-        self.produto.insumos.add(self.insumo)
-        self.cenario = Cenario.objects.create(
-            nome='Cenario Teste',
-            produto=self.produto
-        )
-        
-        # Criar jogo com cenário
-        self.jogo = Jogo.objects.create(
-            nome='Jogo Teste',
-            cod='TEST123',
-            cenario=self.cenario
-        )
-        
-        self.empresa = Empresa.objects.create(
-            nome='Empresa Teste',
-            jogo=self.jogo
-        )
+        # Insumo, produto, cenário, jogo e empresa exigem um criador
+        self.jogo, self.empresa = criar_jogo_com_empresa(criar_mediador())
         
     def test_valid_registration(self):
         form_data = {
@@ -130,30 +127,8 @@ class ViewsTest(TestCase):
         # Garantir que o grupo Diretor existe
         Group.objects.get_or_create(name='Diretor')
         
-        # Criar cenário necessário
-        insumo = Insumo.objects.create(
-            nome='Insumo Teste',
-            fornecedor='Fornecedor Teste'
-        )
-        produto = Produto.objects.create(nome='Produto Teste')
-        produto.insumos.add(insumo)
-        cenario = Cenario.objects.create(
-            nome='Cenario Teste',
-            produto=produto
-        )
-        
-        # Criar jogo
-        jogo = Jogo.objects.create(
-            nome='Jogo Teste',
-            cod='TEST123',
-            cenario=cenario
-        )
-        
-        # Criar empresa
-        empresa = Empresa.objects.create(
-            nome='Empresa Teste',
-            jogo=jogo
-        )
+        # Insumo, produto, cenário, jogo e empresa exigem um criador
+        jogo, empresa = criar_jogo_com_empresa(criar_mediador())
         
         # Testar registro com credenciais válidas
         response = self.client.post(self.register_url, {
@@ -176,29 +151,8 @@ class ViewsTest(TestCase):
 
 class AdminUserCreationFormTest(TestCase):
     def setUp(self):
-        # Criar cenário necessário primeiro
-        self.insumo = Insumo.objects.create(
-            nome='Insumo Teste',
-            fornecedor='Fornecedor Teste'
-        )
-        self.produto = Produto.objects.create(nome='Produto Teste')
-        self.produto.insumos.add(self.insumo)
-        self.cenario = Cenario.objects.create(
-            nome='Cenario Teste',
-            produto=self.produto
-        )
-        
-        # Criar jogo com cenário
-        self.jogo = Jogo.objects.create(
-            nome='Jogo Teste',
-            cod='TEST123',
-            cenario=self.cenario
-        )
-        
-        self.empresa = Empresa.objects.create(
-            nome='Empresa Teste',
-            jogo=self.jogo
-        )
+        # Insumo, produto, cenário, jogo e empresa exigem um criador
+        self.jogo, self.empresa = criar_jogo_com_empresa(criar_mediador())
         
     def test_admin_user_creation(self):
         form_data = {
@@ -225,3 +179,83 @@ class AdminUserCreationFormTest(TestCase):
         }
         form = AdminUserCreationForm(data=form_data)
         self.assertFalse(form.is_valid())
+
+class AdminUserVinculoTest(TestCase):
+    def setUp(self):
+        Group.objects.get_or_create(name='Diretor')
+        Group.objects.get_or_create(name='Mediador')
+        criador = criar_mediador()
+        self.jogo, self.empresa = criar_jogo_com_empresa(criador)
+        self.outro_jogo, self.outra_empresa = criar_jogo_com_empresa(criador, cod='OUTRO1')
+
+    def _criar(self, **dados):
+        form = AdminUserCreationForm(data=dict({
+            'username': 'novo',
+            'email': 'novo@example.com',
+            'password1': 'adminpass123',
+            'password2': 'adminpass123',
+            'cpf': '529.982.247-25',
+        }, **dados))
+        self.assertTrue(form.is_valid(), form.errors)
+        return form.save()
+
+    def _editar(self, usuario, **dados):
+        form = AdminUserEditForm(instance=usuario, data=dict({
+            'username': usuario.username,
+            'email': usuario.email,
+            'cpf': usuario.cpf,
+        }, **dados))
+        self.assertTrue(form.is_valid(), form.errors)
+        return form.save()
+
+    def test_criar_usuario_vinculado_ao_jogo(self):
+        usuario = self._criar(vinculo='diretor_com_jogo', codigo_de_jogo=self.jogo.cod)
+        usuario.refresh_from_db()
+        self.assertEqual(usuario.codigo_de_jogo, self.jogo)
+        self.assertIsNone(usuario.empresa)
+        self.assertTrue(usuario.groups.filter(name='Diretor').exists())
+
+    def test_criar_usuario_vinculado_a_empresa(self):
+        usuario = self._criar(vinculo='empresa', empresa=self.empresa.id, codigo_de_jogo=self.jogo.cod)
+        usuario.refresh_from_db()
+        self.assertEqual(usuario.empresa, self.empresa)
+        self.assertEqual(usuario.codigo_de_jogo, self.jogo)
+
+    def test_criar_com_codigo_inexistente_e_invalido(self):
+        form = AdminUserCreationForm(data={
+            'username': 'novo', 'email': 'novo@example.com',
+            'password1': 'adminpass123', 'password2': 'adminpass123',
+            'cpf': '529.982.247-25', 'vinculo': 'diretor_com_jogo', 'codigo_de_jogo': 'NAOEXISTE',
+        })
+        self.assertFalse(form.is_valid())
+        self.assertIn('codigo_de_jogo', form.errors)
+
+    def test_editar_mostra_o_codigo_do_jogo_e_a_empresa(self):
+        usuario = self._criar(vinculo='empresa', empresa=self.empresa.id, codigo_de_jogo=self.jogo.cod)
+        form = AdminUserEditForm(instance=usuario)
+        # O campo de jogo usa o código (to_field_name='cod'), não a chave primária
+        self.assertEqual(form['codigo_de_jogo'].value(), self.jogo.cod)
+        self.assertEqual(form['empresa'].value(), self.empresa.id)
+        self.assertEqual(form.fields['vinculo'].initial, 'empresa')
+        self.assertIn(f'value="{self.jogo.cod}"', str(form['codigo_de_jogo']))
+
+    def test_editar_vinculo_apenas_ao_jogo(self):
+        usuario = self._criar(vinculo='diretor_com_jogo', codigo_de_jogo=self.jogo.cod)
+        form = AdminUserEditForm(instance=usuario)
+        self.assertEqual(form.fields['vinculo'].initial, 'diretor_com_jogo')
+        self.assertEqual(form['codigo_de_jogo'].value(), self.jogo.cod)
+
+    def test_editar_troca_jogo_e_empresa(self):
+        usuario = self._criar(vinculo='diretor_com_jogo', codigo_de_jogo=self.jogo.cod)
+        self._editar(
+            usuario, vinculo='empresa', empresa=self.outra_empresa.id, codigo_de_jogo=self.outro_jogo.cod,
+        )
+        usuario.refresh_from_db()
+        self.assertEqual(usuario.empresa, self.outra_empresa)
+        self.assertEqual(usuario.codigo_de_jogo, self.outro_jogo)
+
+        self._editar(usuario, vinculo='mediador', codigo_de_jogo=self.outro_jogo.cod)
+        usuario.refresh_from_db()
+        self.assertIsNone(usuario.empresa)
+        self.assertIsNone(usuario.codigo_de_jogo)
+        self.assertEqual(list(usuario.groups.values_list('name', flat=True)), ['Mediador'])
@@ -86,7 +86,6 @@ def user_management_view(request):
     filter_option = request.GET.get('filter', None)
 
     other_game_code = request.GET.get('other_game_code', None)
-    all_games = Jogo.objects.all().order_by('nome')
     # MUDANÇA TERMINA AQUI ------------------------------------------------------------------------------------------------------------------------
     jogo_selecionado = None
 
@@ -137,6 +136,7 @@ def user_management_view(request):
     # MUDANÇA COMEÇA AQUI ------------------------------------------------------------------------------------------------------------------------
     lista_de_usuarios = Usuario.objects.all().order_by('username')
 
+    other_game = None
     if filter_option:
         if filter_option == 'users_in_game':
             if jogo_selecionado:
@@ -151,8 +151,8 @@ def user_management_view(request):
         elif filter_option == 'users_in_other_games':
             if other_game_code:
                 try:
-                    other_game_obj = Jogo.objects.get(cod=other_game_code)
-                    lista_de_usuarios = lista_de_usuarios.filter(codigo_de_jogo=other_game_obj)
+                    other_game = Jogo.objects.get(cod=other_game_code)
+                    lista_de_usuarios = lista_de_usuarios.filter(codigo_de_jogo=other_game)
                 except Jogo.DoesNotExist:
                     messages.warning(request, f"O jogo com código '{other_game_code}' para o filtro não foi encontrado.")
             elif jogo_selecionado:
@@ -188,7 +188,7 @@ def user_management_view(request):
         'is_general': True,
         'is_mediador': is_mediador,
         'pagination_query_params': pagination_query_params,
-        'all_games': all_games,
+        'other_game': other_game,
         'other_game_code': other_game_code,
         # MUDANÇA TERMINA AQUI ------------------------------------------------------------------------------------------------------------------------
     }
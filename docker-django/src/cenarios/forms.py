@@ -1,12 +1,34 @@
 from django import forms
 from .models import Insumo,Produto,Cenario
 
-class InsumoForm(forms.ModelForm):
+class CamposComPadraoMixin:
+    """
+    Campos do motor de simulação (preço, parâmetros do mercado) são
+    opcionais no formulário: deixados em branco, valem o padrão do modelo.
+    """
+    campos_com_padrao = ()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for nome in self.campos_com_padrao:
+            self.fields[nome].required = False
+
+    def clean(self):
+        cleaned_data = super().clean()
+        for nome in self.campos_com_padrao:
+            if cleaned_data.get(nome) is None:
+                cleaned_data[nome] = self._meta.model._meta.get_field(nome).get_default()
+        return cleaned_data
+
+class InsumoForm(CamposComPadraoMixin, forms.ModelForm):
+    campos_com_padrao = ('preco_unitario',)
+
     class Meta:
         model = Insumo
         fields=[
             'nome',
-            'fornecedor'
+            'fornecedor',
+            'preco_unitario',
         ]
 
         error_messages = {
@@ -49,12 +71,18 @@ class ProdutoForm(forms.ModelForm):
             
             self.fields['insumos'].queryset = Insumo.objects.filter(criador=usuario)
         
-class CenarioForm(forms.ModelForm):
+class CenarioForm(CamposComPadraoMixin, forms.ModelForm):
+    campos_com_padrao = ('demanda_mercado', 'preco_referencia', 'elasticidade_preco', 'caixa_inicial')
+
     class Meta:
         model = Cenario
         fields=[
             'nome',
             'produto',
+            'demanda_mercado',
+            'preco_referencia',
+            'elasticidade_preco',
+            'caixa_inicial',
         ]
 
         widgets = {
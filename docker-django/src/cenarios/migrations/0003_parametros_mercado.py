@@ -0,0 +1,38 @@
+# Generated by Django 3.2.25 on 2026-10-18 15:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cenarios', '0002_auto_20251005_2320'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cenario',
+            name='caixa_inicial',
+            field=models.DecimalField(decimal_places=2, default=100000, max_digits=14, verbose_name='Caixa inicial das empresas'),
+        ),
+        migrations.AddField(
+            model_name='cenario',
+            name='demanda_mercado',
+            field=models.PositiveIntegerField(default=10000, verbose_name='Demanda do mercado por período'),
+        ),
+        migrations.AddField(
+            model_name='cenario',
+            name='elasticidade_preco',
+            field=models.FloatField(default=1.5, verbose_name='Elasticidade-preço da demanda'),
+        ),
+        migrations.AddField(
+            model_name='cenario',
+            name='preco_referencia',
+            field=models.DecimalField(decimal_places=2, default=100, max_digits=12, verbose_name='Preço de referência'),
+        ),
+        migrations.AddField(
+            model_name='insumo',
+            name='preco_unitario',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Preço unitário'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 3.2.25 on 2026-10-18 15:37
+
+import cenarios.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cenarios', '0003_parametros_mercado'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cenario',
+            name='versao_compilacao',
+            field=models.CharField(default=cenarios.models.nova_versao_compilacao, editable=False, max_length=32),
+        ),
+    ]
@@ -1,3 +1,5 @@
+import uuid
+
 from django.db import models
 from django.core.exceptions import ValidationError
 from django.conf import settings
@@ -19,6 +21,7 @@ class Insumo(models.Model):
     fornecedor = models.CharField(max_length=100,)
     forma_pagamento = models.CharField(max_length=25, choices=FormasPagamento, null=True,blank=True,default="avista")
     quantidade = models.PositiveIntegerField(null=True,blank=True,default=0)
+    preco_unitario = models.DecimalField("Preço unitário", max_digits=12, decimal_places=2, default=0)
     #fk de um mediador criador
     criador = models.ForeignKey(settings.AUTH_USER_MODEL, editable=False, on_delete=models.CASCADE, related_name='insumos_criados')
 
@@ -40,6 +43,9 @@ class Insumo(models.Model):
         
         if self.quantidade < 0:
             raise ValidationError("A quantidade de insumos não pode ser negativa!")
+
+        if self.preco_unitario is not None and self.preco_unitario < 0:
+            raise ValidationError({"preco_unitario": "O preço do insumo não pode ser negativo!"})
        
         if self.pk:
             try:
@@ -76,9 +82,21 @@ class Produto(models.Model):
         
 
 
+def nova_versao_compilacao():
+    return uuid.uuid4().hex
+
+
 class Cenario(models.Model):
     nome = models.CharField(max_length=100)
     produto = models.ForeignKey(Produto, on_delete=models.CASCADE, related_name="cenarios",blank=False,null=False)
+    # Parâmetros do mercado usados pelo motor de simulação (simulacao.motor)
+    demanda_mercado = models.PositiveIntegerField("Demanda do mercado por período", default=10000)
+    preco_referencia = models.DecimalField("Preço de referência", max_digits=12, decimal_places=2, default=100)
+    elasticidade_preco = models.FloatField("Elasticidade-preço da demanda", default=1.5)
+    caixa_inicial = models.DecimalField("Caixa inicial das empresas", max_digits=14, decimal_places=2, default=100000)
+    # Trocada sempre que o cenário, o produto ou os insumos mudam: identifica
+    # a versão compilada em cache (simulacao.cenario_compilado)
+    versao_compilacao = models.CharField(max_length=32, default=nova_versao_compilacao, editable=False)
     criador = models.ForeignKey(settings.AUTH_USER_MODEL, editable=False, on_delete=models.CASCADE, related_name='cenarios_criados')
 
     def __str__(self):
@@ -90,6 +108,9 @@ class Cenario(models.Model):
         
         if self.nome.strip().isdigit():
             raise ValidationError({"nome": "O nome do Cenário não pode conter apenas números!"})
+
+        if self.preco_referencia is not None and self.preco_referencia <= 0:
+            raise ValidationError({"preco_referencia": "O preço de referência deve ser maior que zero!"})
         
         if self.pk:
             try:
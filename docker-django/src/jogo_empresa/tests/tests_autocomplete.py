@@ -0,0 +1,58 @@
+from django.test import TestCase, Client
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from jogo_empresa.models import Empresa
+from jogos.models import Jogo
+from cenarios.models import Cenario, Produto
+from django.contrib.auth.models import Group
+
+Usuario = get_user_model()
+
+class AutocompleteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = Usuario.objects.create_user(username="user1", email="user@test.com",cpf="155.078.190-17",password="447766ifg!")
+        mediador_group, created = Group.objects.get_or_create(name="Mediador")
+        cls.usuario.groups.add(mediador_group)
+
+        cls.produto = Produto.objects.create(nome="Produto 1", criador=cls.usuario)
+        cls.cenario = Cenario.objects.create(nome="Cenário 1", produto=cls.produto, criador=cls.usuario)
+
+        cls.alfa = Jogo.objects.create(nome="Alfa Industrial", cenario=cls.cenario, criador=cls.usuario)
+        cls.beta = Jogo.objects.create(nome="Beta Alfa", cenario=cls.cenario, criador=cls.usuario)
+        Jogo.objects.create(nome="Gama", cenario=cls.cenario, criador=cls.usuario)
+
+        cls.empresa_alfa = Empresa.objects.create(nome="Alfa Ltda", jogo=cls.alfa, criador=cls.usuario)
+        cls.empresa_beta = Empresa.objects.create(nome="Alfa SA", jogo=cls.beta, criador=cls.usuario)
+
+        cls.url_jogos = reverse("jogo_empresa:autocomplete_jogos")
+        cls.url_empresas = reverse("jogo_empresa:autocomplete_empresas")
+
+    def setUp(self):
+        self.client = Client()
+        self.client.login(username="user@test.com", password="447766ifg!")
+
+    def test_jogos_prefixo_vem_primeiro(self):
+        resp = self.client.get(self.url_jogos, {"q": "alfa"})
+        self.assertEqual(resp.status_code, 200)
+        nomes = [r["nome"] for r in resp.json()["resultados"]]
+        self.assertEqual(nomes, ["Alfa Industrial", "Beta Alfa"])
+
+    def test_jogos_busca_pelo_codigo(self):
+        resp = self.client.get(self.url_jogos, {"q": self.beta.cod})
+        resultados = resp.json()["resultados"]
+        self.assertEqual([r["id"] for r in resultados], [self.beta.id])
+        self.assertEqual(resultados[0]["rotulo"], f"Beta Alfa ({self.beta.cod})")
+
+    def test_termo_curto_nao_consulta(self):
+        resp = self.client.get(self.url_jogos, {"q": "a"})
+        self.assertEqual(resp.json()["resultados"], [])
+
+    def test_empresas_filtradas_pelo_jogo(self):
+        resp = self.client.get(self.url_empresas, {"q": "alfa", "jogo": self.beta.id})
+        self.assertEqual([r["id"] for r in resp.json()["resultados"]], [self.empresa_beta.id])
+
+    def test_exige_mediador(self):
+        self.client.logout()
+        resp = self.client.get(self.url_jogos, {"q": "alfa"})
+        self.assertNotEqual(resp.status_code, 200)
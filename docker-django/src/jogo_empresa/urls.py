@@ -6,5 +6,7 @@ app_name = 'jogo_empresa'
 urlpatterns = [
     path('home', views.pagina_home, name='home'),
     path('jogos', views.jogos_crud, name='jogos_crud'),
-    path('jogos/<int:jogo_id>/empresas/', views.empresas_crud, name='empresas_crud')
+    path('jogos/<int:jogo_id>/empresas/', views.empresas_crud, name='empresas_crud'),
+    path('autocomplete/jogos', views.autocomplete_jogos, name='autocomplete_jogos'),
+    path('autocomplete/empresas', views.autocomplete_empresas, name='autocomplete_empresas'),
 ]
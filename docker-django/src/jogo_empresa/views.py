@@ -3,7 +3,8 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.urls import reverse
 
 from django.core.exceptions import ValidationError
-from django.http import HttpResponseForbidden
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.http import HttpResponseForbidden, JsonResponse
 
 
 from jogos.models import Jogo
@@ -226,4 +227,47 @@ def empresas_crud(request, jogo_id):
         'empresas': empresas,
         'empresa_edit': empresa_edit,
         'q': q, 'sort': sort,
-    })
\ No newline at end of file
+    })
+
+
+# Autocomplete: seletores de jogo/empresa buscam só os nomes digitados, em
+# vez de carregar a tabela inteira em <select>. O icontains vira
+# UPPER(nome) LIKE ..., coberto pelos índices trigram das migrações.
+AUTOCOMPLETE_MINIMO = 2
+AUTOCOMPLETE_LIMITE = 20
+
+def _buscar_por_nome(qs, termo, filtro):
+    prefixo_primeiro = Case(When(nome__istartswith=termo, then=Value(0)), default=Value(1), output_field=IntegerField())
+    return qs.filter(filtro).annotate(prefixo=prefixo_primeiro).order_by('prefixo', 'nome')[:AUTOCOMPLETE_LIMITE]
+
+@group_required(['Mediador'])
+def autocomplete_jogos(request):
+    termo = (request.GET.get('q') or '').strip()
+    if len(termo) < AUTOCOMPLETE_MINIMO:
+        return JsonResponse({'resultados': []})
+
+    jogos = _buscar_por_nome(
+        Jogo.objects.only('id', 'cod', 'nome'), termo,
+        Q(nome__icontains=termo) | Q(cod__startswith=termo),
+    )
+    return JsonResponse({'resultados': [
+        {'id': j.id, 'cod': j.cod, 'nome': j.nome, 'rotulo': f'{j.nome} ({j.cod})'}
+        for j in jogos
+    ]})
+
+@group_required(['Mediador'])
+def autocomplete_empresas(request):
+    termo = (request.GET.get('q') or '').strip()
+    if len(termo) < AUTOCOMPLETE_MINIMO:
+        return JsonResponse({'resultados': []})
+
+    qs = Empresa.objects.select_related('jogo').only('id', 'nome', 'jogo__nome')
+    jogo_id = request.GET.get('jogo')
+    if jogo_id and jogo_id.isdigit():
+        qs = qs.filter(jogo_id=jogo_id)
+
+    empresas = _buscar_por_nome(qs, termo, Q(nome__icontains=termo))
+    return JsonResponse({'resultados': [
+        {'id': e.id, 'nome': e.nome, 'jogo': e.jogo.nome, 'rotulo': str(e)}
+        for e in empresas
+    ]})
@@ -0,0 +1,41 @@
+from django import forms
+from django.urls import reverse
+from django.utils.html import format_html
+
+from jogo_empresa.models import Empresa
+from jogos.models import Jogo
+
+
+class AutocompleteInput(forms.HiddenInput):
+    """
+    Guarda o valor num campo escondido e mostra uma caixa de busca que
+    consulta um endpoint de autocomplete (ver _partials/autocomplete.html).
+    `campo_valor` é a chave do resultado gravada no campo ('id' ou 'cod');
+    `rotulo` recebe o valor atual e devolve o texto exibido na caixa.
+    """
+
+    def __init__(self, url_name, campo_valor='id', rotulo=None, attrs=None):
+        super().__init__(attrs)
+        self.url_name = url_name
+        self.campo_valor = campo_valor
+        self.rotulo = rotulo
+
+    def render(self, name, value, attrs=None, renderer=None):
+        escondido = super().render(name, value, attrs, renderer)
+        alvo = self.build_attrs(self.attrs, attrs).get('id') or f'id_{name}'
+        texto = self.rotulo(value) if value and self.rotulo else ''
+        return escondido + format_html(
+            '<input type="text" data-autocomplete="{}" data-valor="{}" data-alvo="{}" value="{}" '
+            'placeholder="Digite para buscar..." autocomplete="off">',
+            reverse(self.url_name), self.campo_valor, alvo, texto or '',
+        )
+
+
+def rotulo_jogo(cod):
+    jogo = Jogo.objects.filter(cod=cod).only('nome', 'cod').first()
+    return f'{jogo.nome} ({jogo.cod})' if jogo else ''
+
+
+def rotulo_empresa(pk):
+    empresa = Empresa.objects.select_related('jogo').filter(pk=pk).first() if str(pk).isdigit() else None
+    return str(empresa) if empresa else ''
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.25 on 2026-10-18 15:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jogos', '0002_jogo_criador'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jogo',
+            name='versao',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
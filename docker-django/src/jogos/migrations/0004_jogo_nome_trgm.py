@@ -0,0 +1,36 @@
+# Generated by Django 3.2.25 on 2026-10-18 15:40
+
+from django.db import migrations
+
+
+def criar_indice(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        disponivel = cursor.fetchone() is not None
+    if not disponivel:
+        # Servidor sem os módulos contrib: a busca funciona, só sem índice
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    # Mesma expressão que o icontains/istartswith gera: UPPER(nome::text)
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS jogos_jogo_nome_trgm '
+        'ON jogos_jogo USING gin (UPPER(nome::text) gin_trgm_ops)'
+    )
+
+
+def remover_indice(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS jogos_jogo_nome_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jogos', '0003_jogo_versao'),
+    ]
+
+    operations = [
+        migrations.RunPython(criar_indice, remover_indice),
+    ]
@@ -15,6 +15,8 @@ class Jogo(models.Model):
     periodo_anterior = models.PositiveIntegerField(default=0)
     periodo_atual = models.PositiveIntegerField(default=0)
     status_decisoes_disponiveis = models.BooleanField(default=False)
+    # Incrementada a cada mudança de estado feita pela simulação (controle otimista)
+    versao = models.PositiveIntegerField(default=0, editable=False)
     criador = models.ForeignKey(settings.AUTH_USER_MODEL, editable=False, on_delete=models.CASCADE, related_name='jogos_criados')
 
     def gerar_codigo(self):
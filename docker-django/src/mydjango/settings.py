@@ -139,6 +139,53 @@ MEDIA_URL = '/media/'
 CELERY_BROKER_URL = 'redis://redis:6379/0'
 CELERY_RESULT_BACKEND = 'redis://redis:6379/0'
 
+# Redis usado pelo app de simulação (progresso de lotes em segundo plano)
+SIMULACAO_REDIS_URL = os.environ.get('SIMULACAO_REDIS_URL', 'redis://redis:6379/1')
+SIMULACAO_PROGRESSO_TTL = 60 * 60 * 24
+# Trava de lote em execução: validade (s) e quanto um reenvio espera por ela (s)
+SIMULACAO_TRAVA_TIMEOUT = 60 * 10
+SIMULACAO_TRAVA_ESPERA = 60
+# Quantas vezes uma ação é refeita quando o jogo muda durante a simulação
+SIMULACAO_TENTATIVAS_CONFLITO = 3
+# Jogos por transação ao processar lotes com commit por bloco
+SIMULACAO_TAMANHO_BLOCO = int(os.environ.get('SIMULACAO_TAMANHO_BLOCO', 1))
+# Jogos travados por outro lote são adiados (SKIP LOCKED) por até N passadas,
+# esperando SIMULACAO_ESPERA_DISPUTA * passada segundos entre elas
+SIMULACAO_PASSADAS_DISPUTA = 3
+SIMULACAO_ESPERA_DISPUTA = 0.5
+# Em quantas tarefas paralelas um lote em segundo plano é dividido
+SIMULACAO_FATIAS_PARALELAS = int(os.environ.get('SIMULACAO_FATIAS_PARALELAS', os.cpu_count() or 1))
+# Partições mensais do histórico: quantos meses criar adiante e quantos
+# manter (0 = sem retenção). Partições vencidas são desanexadas, ou
+# removidas se SIMULACAO_RETENCAO_DESANEXAR for falso
+SIMULACAO_PARTICOES_A_FRENTE = 3
+SIMULACAO_RETENCAO_MESES = int(os.environ.get('SIMULACAO_RETENCAO_MESES', 0))
+SIMULACAO_RETENCAO_DESANEXAR = os.environ.get('SIMULACAO_RETENCAO_DESANEXAR', '1') == '1'
+
+# Arquivamento de execuções antigas (comando arquivar_simulacoes)
+SIMULACAO_ARQUIVO_DIR = os.environ.get('SIMULACAO_ARQUIVO_DIR', os.path.join(BASE_DIR, 'arquivo_simulacoes'))
+SIMULACAO_ARQUIVO_BLOCO = 500
+
+# Resumo diário do histórico: o log mais novo que isso (s) fica para a
+# rodada seguinte, para não perder linhas de transações ainda abertas
+SIMULACAO_RESUMO_ATRASO = 60 * 15
+
+# Cenários compilados do motor: quantos cada processo guarda (LRU) e por
+# quanto tempo (s) uma versão fica no Redis
+SIMULACAO_CENARIOS_LRU = 256
+SIMULACAO_CENARIOS_TTL = 60 * 60 * 24 * 7
+
+CELERY_BEAT_SCHEDULE = {
+    'simulacao-manter-particoes': {
+        'task': 'simulacao.tasks.manter_particoes',
+        'schedule': 60 * 60 * 24,
+    },
+    'simulacao-atualizar-resumo': {
+        'task': 'simulacao.tasks.atualizar_resumo',
+        'schedule': 60 * 5,
+    },
+}
+
 STATIC_ROOT = './static/'
 MEDIA_ROOT = './media/'
 
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class SimulacaoConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'simulacao'
+
+    def ready(self):
+        from . import sinais  # noqa: F401
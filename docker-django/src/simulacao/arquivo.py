@@ -0,0 +1,199 @@
+"""
+Arquivamento de execuções antigas (SimulacaoExecucao + SimulacaoPeriodo).
+
+As execuções anteriores a um corte saem em blocos por chave primária para
+arquivos NDJSON compactados (gzip), e cada bloco é apagado do banco numa
+transação curta logo depois de gravado. Um índice (indice.ndjson) diz em
+que arquivo está cada lote, e um arquivo de progresso permite retomar um
+arquivamento interrompido do ponto em que parou.
+
+O índice também guarda a marca d'água do resumo diário (resumido_ate) no
+momento em que o bloco saiu do banco: os logs anteriores a ela já estão
+somados no resumo, e a restauração não os soma de novo.
+"""
+import gzip
+import json
+import logging
+import os
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+from . import resumo
+from .models import SimulacaoExecucao, SimulacaoPeriodo
+
+logger = logging.getLogger(__name__)
+
+INDICE = "indice.ndjson"
+PROGRESSO = "progresso.json"
+
+CAMPOS_EXECUCAO = ("id", "jogo_id", "acao", "lote_id", "proximo_step", "resultado", "requested_at")
+CAMPOS_PERIODO = (
+    "id", "execucao_id", "jogo_id", "lote_id", "acao",
+    "periodo_de", "periodo_para", "passos", "step_index", "requested_at",
+)
+
+
+def _pasta(pasta):
+    pasta = pasta or settings.SIMULACAO_ARQUIVO_DIR
+    os.makedirs(pasta, exist_ok=True)
+    return pasta
+
+
+def _ler_progresso(pasta, corte):
+    caminho = os.path.join(pasta, PROGRESSO)
+    if not os.path.exists(caminho):
+        return 0
+    with open(caminho, encoding="utf-8") as arquivo:
+        progresso = json.load(arquivo)
+    # Progresso de outro corte não vale para este
+    return progresso["ultimo_pk"] if progresso.get("corte") == corte.isoformat() else 0
+
+
+def _gravar_progresso(pasta, corte, ultimo_pk):
+    caminho = os.path.join(pasta, PROGRESSO)
+    with open(caminho + ".tmp", "w", encoding="utf-8") as arquivo:
+        json.dump({"corte": corte.isoformat(), "ultimo_pk": ultimo_pk}, arquivo)
+    os.replace(caminho + ".tmp", caminho)
+
+
+def _gravar_bloco(pasta, ids):
+    """Grava as execuções `ids` e seus logs; devolve (nome, lotes, n_execucoes, n_periodos)."""
+    nome = f"simulacoes_{ids[0]:010d}_{ids[-1]:010d}.ndjson.gz"
+    caminho = os.path.join(pasta, nome)
+    lotes = set()
+    n_execucoes = n_periodos = 0
+
+    with gzip.open(caminho + ".tmp", "wt", encoding="utf-8") as arquivo:
+        execucoes = (
+            SimulacaoExecucao.objects.filter(id__in=ids).order_by("id")
+            .values(*CAMPOS_EXECUCAO).iterator(chunk_size=2000)
+        )
+        for registro in execucoes:
+            lotes.add(registro["lote_id"])
+            n_execucoes += 1
+            arquivo.write(json.dumps(dict(registro, tipo="execucao"), cls=DjangoJSONEncoder) + "\n")
+
+        periodos = (
+            SimulacaoPeriodo.objects.filter(execucao_id__in=ids).order_by("execucao_id", "step_index")
+            .values(*CAMPOS_PERIODO).iterator(chunk_size=2000)
+        )
+        for registro in periodos:
+            n_periodos += 1
+            arquivo.write(json.dumps(dict(registro, tipo="periodo"), cls=DjangoJSONEncoder) + "\n")
+    # Só o arquivo completo recebe o nome final
+    os.replace(caminho + ".tmp", caminho)
+    return nome, sorted(lotes), n_execucoes, n_periodos
+
+
+def arquivar(corte, pasta=None, tamanho_bloco=None, ao_arquivar_bloco=None):
+    """
+    Arquiva e apaga as execuções com requested_at < `corte`, bloco a bloco.
+    Reexecutar com o mesmo corte retoma depois do último bloco concluído;
+    um bloco interrompido antes do DELETE é regravado no mesmo arquivo.
+    """
+    pasta = _pasta(pasta)
+    tamanho_bloco = tamanho_bloco or settings.SIMULACAO_ARQUIVO_BLOCO
+    ultimo_pk = _ler_progresso(pasta, corte)
+    totais = {"blocos": 0, "execucoes": 0, "periodos": 0}
+
+    while True:
+        ids = list(
+            SimulacaoExecucao.objects.filter(requested_at__lt=corte, pk__gt=ultimo_pk)
+            .order_by("pk").values_list("pk", flat=True)[:tamanho_bloco]
+        )
+        if not ids:
+            break
+
+        nome, lotes, n_execucoes, n_periodos = _gravar_bloco(pasta, ids)
+        with transaction.atomic():
+            # Com a marca travada, o resumo não avança sobre o bloco até o DELETE
+            marca = resumo.travar_marca()
+            # O índice é gravado antes do DELETE: um bloco repetido após uma
+            # falha só gera uma entrada duplicada, nunca um lote sem arquivo
+            with open(os.path.join(pasta, INDICE), "a", encoding="utf-8") as indice:
+                indice.write(json.dumps({
+                    "arquivo": nome, "lotes": lotes,
+                    "execucoes": n_execucoes, "periodos": n_periodos,
+                    "resumido_ate": marca.ate,
+                }, cls=DjangoJSONEncoder) + "\n")
+            SimulacaoPeriodo.objects.filter(execucao_id__in=ids).delete()
+            SimulacaoExecucao.objects.filter(id__in=ids).delete()
+
+        ultimo_pk = ids[-1]
+        _gravar_progresso(pasta, corte, ultimo_pk)
+        totais["blocos"] += 1
+        totais["execucoes"] += n_execucoes
+        totais["periodos"] += n_periodos
+        logger.info("Bloco %s arquivado (%s execuções, %s logs)", nome, n_execucoes, n_periodos)
+        if ao_arquivar_bloco:
+            ao_arquivar_bloco(nome, n_execucoes, n_periodos)
+    return totais
+
+
+def ler_lote(lote_id, pasta=None):
+    """
+    Registros arquivados de um lote: {"execucoes": [...], "periodos": [...],
+    "resumidos": {ids dos logs que já estavam somados no resumo diário}}.
+    """
+    pasta = _pasta(pasta)
+    registros = {"execucoes": [], "periodos": [], "resumidos": set()}
+    caminho_indice = os.path.join(pasta, INDICE)
+    if not os.path.exists(caminho_indice):
+        return registros
+
+    # Um bloco repetido após uma falha tem mais de uma entrada; vale a última,
+    # a do DELETE que foi confirmado. Índices antigos não têm resumido_ate.
+    resumido_ate = {}
+    with open(caminho_indice, encoding="utf-8") as indice:
+        for entrada in map(json.loads, indice):
+            if lote_id in entrada["lotes"]:
+                marca = entrada.get("resumido_ate")
+                resumido_ate[entrada["arquivo"]] = parse_datetime(marca) if marca else None
+    for nome, marca in resumido_ate.items():
+        with gzip.open(os.path.join(pasta, nome), "rt", encoding="utf-8") as arquivo:
+            for linha in arquivo:
+                registro = json.loads(linha)
+                if registro["lote_id"] != lote_id:
+                    continue
+                tipo = registro.pop("tipo")
+                registro["requested_at"] = parse_datetime(registro["requested_at"])
+                registros["execucoes" if tipo == "execucao" else "periodos"].append(registro)
+                if tipo == "periodo" and marca is not None and registro["requested_at"] < marca:
+                    registros["resumidos"].add(registro["id"])
+    return registros
+
+
+@transaction.atomic
+def restaurar_lote(lote_id, pasta=None):
+    """
+    Devolve ao banco as execuções e logs arquivados de um lote, com as
+    chaves e datas originais. Execuções que já estão no banco são mantidas.
+    Logs que não estavam somados no resumo diário quando foram arquivados
+    são somados a ele (resumo.somar_restaurados).
+    """
+    registros = ler_lote(lote_id, pasta)
+    existentes = set(
+        SimulacaoExecucao.objects.filter(id__in=[e["id"] for e in registros["execucoes"]])
+        .values_list("id", flat=True)
+    )
+    execucoes = [e for e in registros["execucoes"] if e["id"] not in existentes]
+    periodos = [p for p in registros["periodos"] if p["execucao_id"] not in existentes]
+
+    SimulacaoExecucao.objects.bulk_create(SimulacaoExecucao(**e) for e in execucoes)
+    SimulacaoPeriodo.objects.bulk_create(SimulacaoPeriodo(**p) for p in periodos)
+
+    # requested_at é auto_now_add: o bulk_create grava a hora atual, então a
+    # data original é reposta com um UPDATE por instante distinto
+    for modelo, linhas in ((SimulacaoExecucao, execucoes), (SimulacaoPeriodo, periodos)):
+        por_instante = defaultdict(list)
+        for linha in linhas:
+            por_instante[linha["requested_at"]].append(linha["id"])
+        for instante, ids in por_instante.items():
+            modelo.objects.filter(id__in=ids).update(requested_at=instante)
+
+    resumo.somar_restaurados([p["id"] for p in periodos if p["id"] not in registros["resumidos"]])
+    return {"execucoes": len(execucoes), "periodos": len(periodos)}
@@ -0,0 +1,163 @@
+"""
+Cenário compilado: a forma do Cenário consumida pelo motor de simulação.
+
+Um cenário é um Produto com um conjunto M2M de Insumos; em vez de refazer
+esses joins a cada simulação, ele é compilado uma vez em:
+- parametros: parâmetros do mercado e custo unitário do produto (floats);
+- custos: vetor com o custo de cada insumo por unidade produzida
+  (lista de materiais, na ordem dos insumos);
+- parcelas: matriz insumo x período com a fração do custo paga em cada
+  período a partir da compra, conforme a forma de pagamento do insumo.
+
+O cache tem duas camadas: um LRU em cada processo e o Redis, compartilhado
+pelos workers. A chave é (cenario_id, versao_compilacao); a versão é um
+token aleatório trocado por simulacao.sinais sempre que o cenário, o
+produto ou os insumos mudam. Como a troca acontece na mesma transação da
+alteração, nenhuma das camadas precisa ser apagada: a versão antiga
+simplesmente deixa de ser pedida e sai do LRU / expira no Redis.
+Sem Redis, vale só o LRU local.
+"""
+import json
+import logging
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+from django.conf import settings
+from redis.exceptions import RedisError
+
+from cenarios.models import Cenario
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Fração do custo paga em cada período, a partir do período da compra
+PARCELAS = {
+    "avista": (1.0,),
+    "x1": (0.0, 1.0),
+    "x2": (0.0, 0.5, 0.5),
+    "entrada+1": (0.5, 0.5),
+    "entrada+2": (1 / 3, 1 / 3, 1 / 3),
+}
+PRAZO_MAXIMO = max(len(parcelas) for parcelas in PARCELAS.values())
+
+CenarioCompilado = namedtuple("CenarioCompilado", "cenario_id versao parametros custos parcelas")
+
+_lru = OrderedDict()
+
+
+def _chave(cenario_id, versao):
+    return f"simulacao:cenario:{cenario_id}:{versao}"
+
+
+def compilar(cenario):
+    """Monta o CenarioCompilado a partir do banco (produto e insumos)."""
+    insumos = sorted(cenario.produto.insumos.all(), key=lambda insumo: insumo.pk)
+    # Quantidade 0 (não informada) conta como um insumo por unidade produzida
+    custos = np.array([float(insumo.preco_unitario) * (insumo.quantidade or 1) for insumo in insumos])
+    parcelas = np.zeros((len(insumos), PRAZO_MAXIMO))
+    for linha, insumo in enumerate(insumos):
+        prazo = PARCELAS.get(insumo.forma_pagamento or "avista", PARCELAS["avista"])
+        parcelas[linha, :len(prazo)] = prazo
+
+    parametros = {
+        "demanda": float(cenario.demanda_mercado),
+        "preco_referencia": float(cenario.preco_referencia),
+        "elasticidade": float(cenario.elasticidade_preco),
+        "caixa_inicial": float(cenario.caixa_inicial),
+        "custo_unitario": float(custos.sum()),
+    }
+    return CenarioCompilado(cenario.pk, cenario.versao_compilacao, parametros, custos, parcelas)
+
+
+def _serializar(compilado):
+    return json.dumps({
+        "parametros": compilado.parametros,
+        "custos": compilado.custos.tolist(),
+        "parcelas": compilado.parcelas.tolist(),
+    })
+
+
+def _desserializar(cenario_id, versao, texto):
+    dados = json.loads(texto)
+    return CenarioCompilado(
+        cenario_id, versao, dados["parametros"],
+        np.array(dados["custos"], dtype=float),
+        np.array(dados["parcelas"], dtype=float).reshape(-1, PRAZO_MAXIMO),
+    )
+
+
+def _guardar_local(compilado):
+    _lru[(compilado.cenario_id, compilado.versao)] = compilado
+    _lru.move_to_end((compilado.cenario_id, compilado.versao))
+    while len(_lru) > settings.SIMULACAO_CENARIOS_LRU:
+        _lru.popitem(last=False)
+
+
+def _buscar_redis(versoes):
+    """Compilados que estão no Redis, dentre {cenario_id: versao}."""
+    ids = list(versoes)
+    try:
+        textos = get_redis().mget([_chave(cenario_id, versoes[cenario_id]) for cenario_id in ids])
+    except RedisError:
+        logger.warning("Redis indisponível; cenários compilados só no cache local")
+        return {}
+    return {
+        cenario_id: _desserializar(cenario_id, versoes[cenario_id], texto)
+        for cenario_id, texto in zip(ids, textos)
+        if texto is not None
+    }
+
+
+def _gravar_redis(compilados):
+    try:
+        pipe = get_redis().pipeline()
+        for compilado in compilados:
+            pipe.set(
+                _chave(compilado.cenario_id, compilado.versao), _serializar(compilado),
+                ex=settings.SIMULACAO_CENARIOS_TTL,
+            )
+        pipe.execute()
+    except RedisError:
+        logger.warning("Redis indisponível; %d cenário(s) compilado(s) não foram compartilhados", len(compilados))
+
+
+def obter_varios(versoes):
+    """
+    Cenários compilados de {cenario_id: versao_compilacao}, como
+    {cenario_id: CenarioCompilado}. Procura no LRU local, depois no Redis,
+    e só compila a partir do banco o que não estiver em nenhum dos dois.
+    """
+    compilados = {}
+    for cenario_id, versao in versoes.items():
+        compilado = _lru.get((cenario_id, versao))
+        if compilado is not None:
+            _lru.move_to_end((cenario_id, versao))
+            compilados[cenario_id] = compilado
+
+    faltando = {cenario_id: versao for cenario_id, versao in versoes.items() if cenario_id not in compilados}
+    if faltando:
+        for cenario_id, compilado in _buscar_redis(faltando).items():
+            _guardar_local(compilado)
+            compilados[cenario_id] = compilado
+
+    faltando = [cenario_id for cenario_id in faltando if cenario_id not in compilados]
+    if faltando:
+        novos = [
+            compilar(cenario)
+            for cenario in Cenario.objects.filter(pk__in=faltando)
+            .select_related("produto").prefetch_related("produto__insumos")
+        ]
+        for compilado in novos:
+            _guardar_local(compilado)
+            compilados[compilado.cenario_id] = compilado
+        _gravar_redis(novos)
+    return compilados
+
+
+def obter(cenario):
+    """Cenário compilado na versão atual do `cenario`."""
+    return obter_varios({cenario.pk: cenario.versao_compilacao})[cenario.pk]
+
+
+def limpar_cache_local():
+    _lru.clear()
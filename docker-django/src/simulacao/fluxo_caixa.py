@@ -0,0 +1,68 @@
+"""
+Fluxo de caixa das compras de insumos, conforme a forma de pagamento.
+
+Cada compra (devedor, período, valor, prazo) vira uma linha de parcelas:
+valor x fração paga em cada período a partir da compra (as frações vêm
+de cenario_compilado.PARCELAS). As parcelas de todas as compras são
+somadas de uma vez com np.add.at num tensor
+(período da compra, devedor, período do vencimento); o fechamento de
+cada período lê dele o que foi pago e o que continua a pagar.
+"""
+import numpy as np
+
+
+def parcelas(valores, prazos):
+    """Valor de cada parcela: matriz compra x prazo, (m, L)."""
+    return valores[:, None] * prazos
+
+
+def compras_de_producao(producao, custos, prazos):
+    """
+    Compras de insumos implicadas pela produção: uma por período x empresa
+    x insumo. `producao` é (P, n), `custos` (I,) e `prazos` (I, L).
+    Devolve os vetores achatados (devedor, periodo, valores, prazos).
+    """
+    periodos, n = producao.shape
+    insumos = custos.size
+    valores = (producao[:, :, None] * custos[None, None, :]).ravel()
+    periodo = np.repeat(np.arange(periodos), n * insumos)
+    devedor = np.tile(np.repeat(np.arange(n), insumos), periodos)
+    return devedor, periodo, valores, np.tile(prazos, (periodos * n, 1))
+
+
+def contas_a_pagar(devedor, periodo, valores, prazos, n_devedores, n_periodos):
+    """
+    Distribui as parcelas de todas as compras pelos períodos de vencimento.
+    Devolve o tensor (período da compra, devedor, vencimento), com
+    n_periodos + L - 1 colunas de vencimento.
+    """
+    largura = prazos.shape[1]
+    contas = np.zeros((n_periodos, n_devedores, n_periodos + largura - 1))
+    vencimento = periodo[:, None] + np.arange(largura)
+    np.add.at(
+        contas,
+        (np.broadcast_to(periodo[:, None], vencimento.shape),
+         np.broadcast_to(devedor[:, None], vencimento.shape),
+         vencimento),
+        parcelas(valores, prazos),
+    )
+    return contas
+
+
+def vencimentos(contas, pendentes_iniciais):
+    """
+    Fechamento de cada período a partir de contas_a_pagar. Devolve
+    (pagamentos, pendentes): o pago por devedor em cada período, (P, n),
+    e as parcelas que ainda vencem nos L - 1 períodos seguintes, (P, n, L - 1).
+    `pendentes_iniciais` (n, L - 1) é o que já estava a pagar antes do primeiro período.
+    """
+    n_periodos = contas.shape[0]
+    adiante = pendentes_iniciais.shape[1]
+    # Só as compras feitas até o período k contam no fechamento de k
+    acumulado = np.cumsum(contas, axis=0)
+    acumulado[:, :, :adiante] += pendentes_iniciais
+
+    k = np.arange(n_periodos)
+    pagamentos = acumulado[k, :, k]
+    pendentes = acumulado[k[:, None], :, k[:, None] + 1 + np.arange(adiante)]
+    return pagamentos, pendentes.transpose(0, 2, 1)
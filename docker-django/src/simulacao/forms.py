@@ -53,6 +53,10 @@ class SimularForm(forms.Form):
         label="Forçar decisões automáticas",
         required=False
     )
+    assincrono = forms.BooleanField(
+        label="Executar em segundo plano",
+        required=False
+    )
 
     # Se vier vazio, a view gera um novo; se vier preenchido, validamos.
     request_id = forms.CharField(
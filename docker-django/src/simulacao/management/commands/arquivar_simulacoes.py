@@ -0,0 +1,43 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from simulacao import arquivo
+
+
+class Command(BaseCommand):
+    help = (
+        "Move para arquivos NDJSON compactados as execuções de simulação "
+        "anteriores ao corte, apagando-as do banco bloco a bloco. "
+        "Reexecutar com o mesmo corte retoma de onde parou."
+    )
+
+    def add_arguments(self, parser):
+        corte = parser.add_mutually_exclusive_group(required=True)
+        corte.add_argument("--antes-de", help="Data de corte (AAAA-MM-DD).")
+        corte.add_argument("--dias", type=int, help="Arquiva o que tiver mais de N dias.")
+        parser.add_argument("--pasta", help="Pasta dos arquivos (padrão: SIMULACAO_ARQUIVO_DIR).")
+        parser.add_argument("--bloco", type=int, help="Execuções por bloco (padrão: SIMULACAO_ARQUIVO_BLOCO).")
+
+    def handle(self, *args, **opts):
+        if opts["dias"] is not None:
+            corte = timezone.now() - datetime.timedelta(days=opts["dias"])
+        else:
+            data = parse_date(opts["antes_de"] or "")
+            if data is None:
+                raise CommandError("Use --antes-de no formato AAAA-MM-DD.")
+            corte = timezone.make_aware(datetime.datetime.combine(data, datetime.time.min))
+
+        def ao_arquivar_bloco(nome, n_execucoes, n_periodos):
+            self.stdout.write(f"{nome}: {n_execucoes} execuções, {n_periodos} logs")
+
+        totais = arquivo.arquivar(
+            corte, pasta=opts["pasta"], tamanho_bloco=opts["bloco"],
+            ao_arquivar_bloco=ao_arquivar_bloco,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"{totais['execucoes']} execuções e {totais['periodos']} logs arquivados "
+            f"em {totais['blocos']} blocos."
+        ))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from simulacao.models import SimulacaoResumoMarca
+from simulacao.resumo import atualizar_resumo
+
+
+class Command(BaseCommand):
+    help = "Soma ao resumo diário do histórico o log gravado desde a última atualização."
+
+    def handle(self, *args, **opts):
+        alteradas = atualizar_resumo()
+        marca = SimulacaoResumoMarca.objects.get(pk=1)
+        self.stdout.write(self.style.SUCCESS(
+            f"{alteradas} linhas do resumo atualizadas; log somado até {marca.ate:%d/%m/%Y %H:%M}."
+        ))
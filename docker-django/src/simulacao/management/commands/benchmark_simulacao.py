@@ -0,0 +1,150 @@
+import json
+import time
+
+import django
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from cenarios.models import Insumo, Produto, Cenario
+from jogo_empresa.models import Empresa
+from jogos.models import Jogo
+from simulacao.models import ResultadoEmpresa, SimulacaoExecucao, SimulacaoPeriodo
+from simulacao.services import (
+    _FUNCS, ACOES_VETORIZADAS, processar_lista, processar_lista_vetorizada,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede o serviço de simulação: monta turmas sintéticas (N jogos com "
+        "periodo_atual até P) e cronometra cada ação de _FUNCS, gravando "
+        "tempo, número de queries e linhas escritas num relatório JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--jogos", type=int, default=50, help="Jogos por turma sintética.")
+        parser.add_argument("--periodo", type=int, default=20, help="Maior periodo_atual dos jogos.")
+        parser.add_argument("--empresas", type=int, default=10, help="Empresas por jogo simuladas pelo motor.")
+        parser.add_argument("--saida", default="benchmark_simulacao.json", help="Arquivo do relatório JSON.")
+        parser.add_argument(
+            "--banco-atual",
+            action="store_true",
+            help="Roda no banco configurado em vez de criar o banco de testes "
+                 "(os dados sintéticos são sempre desfeitos ao final).",
+        )
+
+    def handle(self, *args, **opts):
+        nome_original = None
+        if not opts["banco_atual"]:
+            nome_original = connection.settings_dict["NAME"]
+            connection.creation.create_test_db(verbosity=0, autoclobber=True)
+
+        try:
+            relatorio = self._medir(opts["jogos"], opts["periodo"], opts["empresas"])
+        finally:
+            if nome_original is not None:
+                connection.creation.destroy_test_db(nome_original, verbosity=0)
+
+        with open(opts["saida"], "w", encoding="utf-8") as arquivo:
+            json.dump(relatorio, arquivo, indent=2, ensure_ascii=False)
+
+        for nome, medida in relatorio["acoes"].items():
+            self.stdout.write(
+                f"{nome:<8} {medida['tempo_s']:>9.4f}s {medida['queries']:>6} queries "
+                f"{medida['linhas_escritas']:>7} linhas"
+            )
+        self.stdout.write(self.style.SUCCESS(f"Relatório gravado em {opts['saida']}"))
+
+    def _medir(self, n_jogos, periodo_max, n_empresas):
+        relatorio = {
+            "gerado_em": timezone.now().isoformat(),
+            "django": django.get_version(),
+            "banco": connection.vendor,
+            "jogos": n_jogos,
+            "periodo_max": periodo_max,
+            "empresas": n_empresas,
+            "acoes": {},
+        }
+
+        with transaction.atomic():
+            cenario = self._cenario()
+            for acao in _FUNCS:
+                relatorio["acoes"][acao] = self._medir_acao(
+                    processar_lista, acao, cenario, n_jogos, periodo_max, n_empresas,
+                )
+                if acao in ACOES_VETORIZADAS:
+                    relatorio["acoes"][f"{acao}-vet"] = self._medir_acao(
+                        processar_lista_vetorizada, acao, cenario, n_jogos, periodo_max, n_empresas,
+                    )
+            transaction.set_rollback(True)
+
+        return relatorio
+
+    def _cenario(self):
+        criador = get_user_model().objects.create_user(
+            username="benchmark", email="benchmark@simulaweb.local",
+            password=None, cpf="benchmark",
+        )
+        insumo = Insumo.objects.create(nome="Insumo", fornecedor="Fornecedor", preco_unitario=40, criador=criador)
+        produto = Produto.objects.create(nome="Produto", criador=criador)
+        produto.insumos.set([insumo])
+        return Cenario.objects.create(nome="Benchmark", produto=produto, criador=criador)
+
+    def _turma(self, cenario, prefixo, n_jogos, periodo_max, n_empresas):
+        """
+        N jogos com períodos espalhados entre 0 e periodo_max, decisões
+        liberadas e n_empresas empresas cada (com decisões automáticas).
+        """
+        jogos = Jogo.objects.bulk_create([
+            Jogo(
+                nome=f"Benchmark {prefixo} {i}",
+                cod=f"bench-{prefixo}-{i}",
+                cenario=cenario,
+                criador=cenario.criador,
+                periodo_atual=i % (periodo_max + 1),
+                status_decisoes_disponiveis=True,
+            )
+            for i in range(n_jogos)
+        ])
+        Empresa.objects.bulk_create([
+            Empresa(nome=f"Empresa {k}", jogo=jogo, criador=cenario.criador)
+            for jogo in jogos
+            for k in range(n_empresas)
+        ])
+        return jogos
+
+    def _medir_acao(self, executar, acao, cenario, n_jogos, periodo_max, n_empresas):
+        with transaction.atomic():
+            jogos = self._turma(cenario, f"{executar.__name__}-{acao}", n_jogos, periodo_max, n_empresas)
+            ids = [j.id for j in jogos]
+            resultados_antes = ResultadoEmpresa.objects.count()
+            logs_antes = SimulacaoPeriodo.objects.count()
+            execucoes_antes = SimulacaoExecucao.objects.count()
+
+            with CaptureQueriesContext(connection) as ctx:
+                inicio = time.perf_counter()
+                res = executar(ids, acao)
+                tempo = time.perf_counter() - inicio
+
+            logs = SimulacaoPeriodo.objects.count() - logs_antes
+            execucoes = SimulacaoExecucao.objects.count() - execucoes_antes
+            resultados = ResultadoEmpresa.objects.count() - resultados_antes
+            jogos_alterados = sum(
+                1 for r in res["resultados"]
+                if (r["periodo_antes"], r["decisoes_antes"]) != (r["periodo_depois"], r["decisoes_depois"])
+            )
+            transaction.set_rollback(True)
+
+        return {
+            "modo": executar.__name__,
+            "tempo_s": round(tempo, 6),
+            "queries": len(ctx.captured_queries),
+            "linhas_log": logs,
+            "execucoes": execucoes,
+            "jogos_alterados": jogos_alterados,
+            "resultados_empresas": resultados,
+            "linhas_escritas": logs + execucoes + jogos_alterados + resultados,
+        }
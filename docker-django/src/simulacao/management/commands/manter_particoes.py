@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from simulacao import particoes
+
+
+class Command(BaseCommand):
+    help = (
+        "Cria as partições mensais do histórico de simulações para os "
+        "próximos meses e aplica a retenção, desanexando ou removendo "
+        "partições inteiras."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--meses-a-frente", type=int, default=settings.SIMULACAO_PARTICOES_A_FRENTE,
+            help="Meses além do corrente que devem ter partição.",
+        )
+        parser.add_argument(
+            "--retencao", type=int, default=settings.SIMULACAO_RETENCAO_MESES,
+            help="Meses mantidos anexados (0 desliga a retenção).",
+        )
+        parser.add_argument(
+            "--remover", action="store_true",
+            help="Remove as partições vencidas em vez de só desanexá-las.",
+        )
+
+    def handle(self, *args, **opts):
+        if not particoes.particionada():
+            self.stderr.write(self.style.WARNING("O histórico não está particionado; nada a fazer."))
+            return
+
+        desanexar = settings.SIMULACAO_RETENCAO_DESANEXAR and not opts["remover"]
+        relatorio = particoes.manter(
+            meses_a_frente=opts["meses_a_frente"],
+            retencao_meses=opts["retencao"],
+            desanexar=desanexar,
+        )
+        for chave, rotulo in (("criadas", "Criada"), ("desanexadas", "Desanexada"), ("removidas", "Removida")):
+            for nome in relatorio[chave]:
+                self.stdout.write(f"{rotulo}: {nome}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(particoes.listar_particoes())} partições mensais anexadas."
+        ))
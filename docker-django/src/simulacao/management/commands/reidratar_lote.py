@@ -0,0 +1,36 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+
+from simulacao import arquivo
+
+
+class Command(BaseCommand):
+    help = (
+        "Lê um lote arquivado por arquivar_simulacoes: imprime seus registros "
+        "em NDJSON ou, com --restaurar, devolve-os ao banco."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("lote_id")
+        parser.add_argument("--pasta", help="Pasta dos arquivos (padrão: SIMULACAO_ARQUIVO_DIR).")
+        parser.add_argument("--restaurar", action="store_true", help="Reinsere o lote nas tabelas.")
+
+    def handle(self, *args, **opts):
+        lote_id = opts["lote_id"]
+        if opts["restaurar"]:
+            totais = arquivo.restaurar_lote(lote_id, pasta=opts["pasta"])
+            if not totais["execucoes"]:
+                raise CommandError(f"Nada a restaurar para o lote {lote_id}.")
+            self.stdout.write(self.style.SUCCESS(
+                f"{totais['execucoes']} execuções e {totais['periodos']} logs restaurados."
+            ))
+            return
+
+        registros = arquivo.ler_lote(lote_id, pasta=opts["pasta"])
+        if not registros["execucoes"]:
+            raise CommandError(f"Lote {lote_id} não encontrado no arquivo.")
+        for chave, tipo in (("execucoes", "execucao"), ("periodos", "periodo")):
+            for registro in registros[chave]:
+                self.stdout.write(json.dumps(dict(registro, tipo=tipo), cls=DjangoJSONEncoder))
@@ -0,0 +1,28 @@
+# Generated by Django 3.2.25 on 2026-10-18 15:06
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def preencher_proximo_step(apps, schema_editor):
+    SimulacaoExecucao = apps.get_model('simulacao', 'SimulacaoExecucao')
+    execucoes = SimulacaoExecucao.objects.annotate(ultimo_step=Max('periodos__step_index'))
+    for execucao in execucoes.filter(ultimo_step__isnull=False).iterator():
+        execucao.proximo_step = execucao.ultimo_step + 1
+        execucao.save(update_fields=['proximo_step'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('simulacao', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='simulacaoexecucao',
+            name='proximo_step',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(preencher_proximo_step, migrations.RunPython.noop),
+    ]
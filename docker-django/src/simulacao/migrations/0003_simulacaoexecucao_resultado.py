@@ -0,0 +1,18 @@
+# Generated by Django 3.2.25 on 2026-10-18 15:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('simulacao', '0002_simulacaoexecucao_proximo_step'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='simulacaoexecucao',
+            name='resultado',
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.25 on 2026-10-18 15:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('simulacao', '0003_simulacaoexecucao_resultado'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='simulacaoperiodo',
+            index=models.Index(fields=['requested_at', 'id'], name='simulacao_s_request_ba35f8_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 3.2.25 on 2026-10-18 15:14
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copiar_lote_id(apps, schema_editor):
+    SimulacaoExecucao = apps.get_model('simulacao', 'SimulacaoExecucao')
+    SimulacaoPeriodo = apps.get_model('simulacao', 'SimulacaoPeriodo')
+    lote = SimulacaoExecucao.objects.filter(pk=OuterRef('execucao_id')).values('lote_id')[:1]
+    SimulacaoPeriodo.objects.update(lote_id=Subquery(lote))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('simulacao', '0004_simulacaoperiodo_keyset_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='simulacaoperiodo',
+            name='lote_id',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+        migrations.RunPython(copiar_lote_id, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='simulacaoexecucao',
+            index=models.Index(fields=['lote_id'], name='simulacao_s_lote_id_b48318_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='simulacaoperiodo',
+            index=models.Index(fields=['lote_id', 'requested_at'], name='simulacao_s_lote_id_5566a6_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.25 on 2026-10-18 15:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('simulacao', '0005_simulacaoperiodo_lote_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='simulacaoperiodo',
+            name='passos',
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,99 @@
+# Generated by Django 3.2.25 on 2026-10-18 15:19
+
+from django.db import migrations, models
+
+TABELA = 'simulacao_simulacaoperiodo'
+LEGADO = TABELA + '_legado'
+MESES_A_FRENTE = 3
+
+
+def _meses(cursor):
+    """Meses (UTC) desde a linha mais antiga até MESES_A_FRENTE adiante."""
+    cursor.execute(
+        f"SELECT date_trunc('month', COALESCE(MIN(requested_at), now()) AT TIME ZONE 'UTC')::date, "
+        f"(date_trunc('month', now() AT TIME ZONE 'UTC') + interval '{MESES_A_FRENTE} months')::date "
+        f"FROM {LEGADO}"
+    )
+    mes, ultimo = cursor.fetchone()
+    while mes <= ultimo:
+        proximo = mes.replace(year=mes.year + mes.month // 12, month=mes.month % 12 + 1)
+        yield mes, proximo
+        mes = proximo
+
+
+def _recriar(schema_editor, particionar):
+    """
+    Recria a tabela de logs (particionada ou comum) com as mesmas colunas,
+    índices, chaves estrangeiras e sequência, copiando as linhas existentes.
+    """
+    cursor = schema_editor.connection.cursor()
+    cursor.execute(f'ALTER TABLE {TABELA} RENAME TO {LEGADO}')
+    cursor.execute(
+        "SELECT pg_get_indexdef(indexrelid) FROM pg_index "
+        "WHERE indrelid = %s::regclass AND NOT indisprimary",
+        [LEGADO],
+    )
+    indices = [definicao for (definicao,) in cursor.fetchall()]
+    cursor.execute(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE conrelid = %s::regclass AND contype = 'f'",
+        [LEGADO],
+    )
+    estrangeiras = cursor.fetchall()
+    cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [LEGADO])
+    (sequencia,) = cursor.fetchone()
+
+    particao = ' PARTITION BY RANGE (requested_at)' if particionar else ''
+    cursor.execute(
+        f'CREATE TABLE {TABELA} (LIKE {LEGADO} INCLUDING DEFAULTS INCLUDING CONSTRAINTS){particao}'
+    )
+    cursor.execute(f'ALTER SEQUENCE {sequencia} OWNED BY {TABELA}.id')
+    if particionar:
+        for de, ate in _meses(cursor):
+            cursor.execute(
+                f'CREATE TABLE {TABELA}_p{de:%Y%m} PARTITION OF {TABELA} FOR VALUES FROM (%s) TO (%s)',
+                [f'{de} 00:00:00+00', f'{ate} 00:00:00+00'],
+            )
+        cursor.execute(f'CREATE TABLE {TABELA}_padrao PARTITION OF {TABELA} DEFAULT')
+        chave = 'id, requested_at'
+    else:
+        chave = 'id'
+
+    cursor.execute(f'INSERT INTO {TABELA} SELECT * FROM {LEGADO}')
+    # Sem CASCADE: nenhuma outra tabela referencia os logs
+    cursor.execute(f'DROP TABLE {LEGADO}')
+
+    cursor.execute(f'ALTER TABLE {TABELA} ADD PRIMARY KEY ({chave})')
+    for definicao in indices:
+        cursor.execute(definicao.replace(LEGADO, TABELA))
+    for nome, definicao in estrangeiras:
+        cursor.execute(f'ALTER TABLE {TABELA} ADD CONSTRAINT {nome} {definicao}')
+
+
+def particionar(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        _recriar(schema_editor, particionar=True)
+
+
+def desparticionar(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        _recriar(schema_editor, particionar=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('simulacao', '0006_simulacaoperiodo_passos'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='simulacaoperiodo',
+            unique_together=set(),
+        ),
+        migrations.AddIndex(
+            model_name='simulacaoperiodo',
+            index=models.Index(fields=['execucao', 'step_index'], name='simulacao_s_execuca_a4b538_idx'),
+        ),
+        migrations.RunPython(particionar, desparticionar),
+    ]
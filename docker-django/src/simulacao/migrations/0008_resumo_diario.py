@@ -0,0 +1,45 @@
+# Generated by Django 3.2.25 on 2026-10-18 15:22
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jogos', '0003_jogo_versao'),
+        ('simulacao', '0007_particionar_simulacaoperiodo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimulacaoResumoMarca',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ate', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SimulacaoResumoDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('acao', models.CharField(choices=[('R0D', 'Reprocessar 0→atual'), ('RND', 'Reprocessar 0→atual e liberar próximo'), ('SPA', 'Simular período atual'), ('SPN', 'Simular período atual e liberar próximo'), ('RDA', 'Reprocessar período passado'), ('LPD', 'Liberar próximo período de decisões'), ('CAD', 'Cancelar simulação do último período'), ('RSD', 'Reprocessar 0→atual, simular e liberar próximo')], max_length=3)),
+                ('dia', models.DateField()),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('passos', models.PositiveIntegerField(default=0)),
+                ('periodo_max', models.PositiveIntegerField(default=0)),
+                ('jogo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumos_simulacao', to='jogos.jogo')),
+            ],
+            options={
+                'ordering': ('-dia',),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='simulacaoresumodiario',
+            index=models.Index(fields=['dia', 'acao'], name='simulacao_s_dia_5f6efd_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='simulacaoresumodiario',
+            unique_together={('jogo', 'acao', 'dia')},
+        ),
+    ]
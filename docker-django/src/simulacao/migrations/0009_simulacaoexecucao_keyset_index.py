@@ -0,0 +1,17 @@
+# Generated by Django 3.2.25 on 2026-10-18 15:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('simulacao', '0008_resumo_diario'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='simulacaoexecucao',
+            index=models.Index(fields=['requested_at', 'id'], name='simulacao_s_request_d37034_idx'),
+        ),
+    ]
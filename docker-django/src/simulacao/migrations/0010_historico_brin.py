@@ -0,0 +1,22 @@
+# Generated by Django 3.2.25 on 2026-10-18 15:25
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('simulacao', '0009_simulacaoexecucao_keyset_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='simulacaoexecucao',
+            index=django.contrib.postgres.indexes.BrinIndex(fields=['requested_at'], name='simulacao_execucao_quando_brin'),
+        ),
+        migrations.AddIndex(
+            model_name='simulacaoperiodo',
+            index=django.contrib.postgres.indexes.BrinIndex(fields=['requested_at'], name='simulacao_periodo_quando_brin'),
+        ),
+    ]
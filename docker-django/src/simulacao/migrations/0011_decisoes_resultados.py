@@ -0,0 +1,64 @@
+# Generated by Django 3.2.25 on 2026-10-18 15:31
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jogo_empresa', '0003_empresa_nome_trgm'),
+        ('jogos', '0004_jogo_nome_trgm'),
+        ('simulacao', '0010_historico_brin'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResultadoEmpresa',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('periodo', models.PositiveIntegerField()),
+                ('preco', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('producao', models.PositiveIntegerField()),
+                ('automatica', models.BooleanField(default=False)),
+                ('demanda', models.PositiveIntegerField()),
+                ('vendas', models.PositiveIntegerField()),
+                ('estoque', models.PositiveIntegerField()),
+                ('receita', models.DecimalField(decimal_places=2, max_digits=16)),
+                ('custo_producao', models.DecimalField(decimal_places=2, max_digits=16)),
+                ('lucro', models.DecimalField(decimal_places=2, max_digits=16)),
+                ('caixa', models.DecimalField(decimal_places=2, max_digits=16)),
+                ('empresa', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resultados', to='jogo_empresa.empresa')),
+                ('jogo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resultados_empresas', to='jogos.jogo')),
+            ],
+            options={
+                'ordering': ('periodo', 'empresa'),
+            },
+        ),
+        migrations.CreateModel(
+            name='DecisaoEmpresa',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('periodo', models.PositiveIntegerField()),
+                ('preco', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('producao', models.PositiveIntegerField()),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+                ('empresa', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='decisoes', to='jogo_empresa.empresa')),
+            ],
+            options={
+                'ordering': ('periodo',),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='resultadoempresa',
+            index=models.Index(fields=['jogo', 'periodo'], name='simulacao_r_jogo_id_d494cd_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='resultadoempresa',
+            unique_together={('empresa', 'periodo')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='decisaoempresa',
+            unique_together={('empresa', 'periodo')},
+        ),
+    ]
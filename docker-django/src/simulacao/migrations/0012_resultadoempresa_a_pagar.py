@@ -0,0 +1,23 @@
+# Generated by Django 3.2.25 on 2026-10-18 15:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('simulacao', '0011_decisoes_resultados'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resultadoempresa',
+            name='a_pagar',
+            field=models.JSONField(default=list),
+        ),
+        migrations.AddField(
+            model_name='resultadoempresa',
+            name='pagamentos',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=16),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 3.2.25 on 2026-10-18 15:42
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jogos', '0004_jogo_nome_trgm'),
+        ('simulacao', '0012_resultadoempresa_a_pagar'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstadoPeriodo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('periodo', models.PositiveIntegerField()),
+                ('versao_cenario', models.CharField(max_length=32)),
+                ('empresas', models.JSONField(default=list)),
+                ('estado', models.BinaryField()),
+                ('jogo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='estados', to='jogos.jogo')),
+            ],
+            options={
+                'ordering': ('jogo', 'periodo'),
+                'unique_together': {('jogo', 'periodo')},
+            },
+        ),
+    ]
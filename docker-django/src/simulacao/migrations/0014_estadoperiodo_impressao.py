@@ -0,0 +1,18 @@
+# Generated by Django 3.2.25 on 2026-10-18 15:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('simulacao', '0013_estadoperiodo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='estadoperiodo',
+            name='impressao',
+            field=models.CharField(default='', max_length=64),
+        ),
+    ]
@@ -1,3 +1,4 @@
+from django.contrib.postgres.indexes import BrinIndex
 from django.db import models
 from django.conf import settings
 from jogos.models import Jogo
@@ -24,29 +25,68 @@ class SimulacaoPeriodo(models.Model):
     )
     execucao = models.ForeignKey('SimulacaoExecucao', on_delete=models.CASCADE, related_name='periodos')
     jogo = models.ForeignKey(Jogo, on_delete=models.CASCADE, related_name='periodos')
+    # Cópia de execucao.lote_id: o filtro por lote usa índice próprio, sem join
+    lote_id = models.CharField(max_length=64, blank=True, default='', editable=False)
     acao = models.CharField(max_length=3, choices=ACAO_CHOICES)
 
     periodo_de = models.PositiveIntegerField()
     periodo_para = models.PositiveIntegerField()
+    # Transições k -> k+1 representadas pela linha: um reprocessamento
+    # 0 -> p é gravado como uma única faixa com passos = p
+    passos = models.PositiveIntegerField(default=1)
 
     step_index = models.PositiveIntegerField(default=0)
     requested_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
-        unique_together = (('execucao', 'step_index'),)
+        # Tabela particionada por mês em requested_at (migração 0007, módulo
+        # particoes): a chave primária real é (id, requested_at) e um UNIQUE
+        # sem a coluna de partição não é permitido. step_index continua
+        # único por execução porque é reservado atomicamente em proximo_step.
         indexes = [
+            models.Index(fields=['execucao', 'step_index']),
             models.Index(fields=['jogo', 'requested_at']),
             models.Index(fields=['acao', 'requested_at']),
+            # Chave da paginação por cursor do histórico
+            models.Index(fields=['requested_at', 'id']),
+            models.Index(fields=['lote_id', 'requested_at']),
+            # Filtro por intervalo de datas: o log só cresce em requested_at,
+            # então um BRIN resolve com uma fração do tamanho de um B-tree
+            BrinIndex(fields=['requested_at'], name='simulacao_periodo_quando_brin'),
         ]
         ordering = ('requested_at',)
 
+    def save(self, *args, **kwargs):
+        if not self.lote_id and self.execucao_id:
+            self.lote_id = self.execucao.lote_id
+        super().save(*args, **kwargs)
+
+    @property
+    def compactado(self):
+        return self.passos > 1
+
+    def expandir(self):
+        """Gera os pares (de, para) de cada transição, sob demanda."""
+        if not self.compactado:
+            yield self.periodo_de, self.periodo_para
+            return
+        for k in range(self.periodo_de, self.periodo_para):
+            yield k, k + 1
+
     def __str__(self):
-        return f'{self.jogo.cod} {self.acao} {self.periodo_de}->{self.periodo_para} (step {self.step_index})'
+        faixa = f'{self.periodo_de}->{self.periodo_para}'
+        if self.compactado:
+            faixa += f' [{self.passos} passos]'
+        return f'{self.jogo.cod} {self.acao} {faixa} (step {self.step_index})'
 
 class SimulacaoExecucao(models.Model):
     jogo = models.ForeignKey(Jogo, on_delete=models.CASCADE, related_name='execucoes')
     acao = models.CharField(max_length=3, choices=SimulacaoPeriodo.ACAO_CHOICES)
     lote_id = models.CharField(max_length=64)
+    # Próximo step_index livre; reservado atomicamente por services._reservar_steps
+    proximo_step = models.PositiveIntegerField(default=0)
+    # Resultado gravado quando a execução termina; reenvios do lote o reaproveitam
+    resultado = models.JSONField(null=True, blank=True, editable=False)
     requested_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -54,8 +94,113 @@ class SimulacaoExecucao(models.Model):
         indexes = [
             models.Index(fields=['jogo', 'requested_at']),
             models.Index(fields=['acao', 'requested_at']),
+            models.Index(fields=['lote_id']),
+            # Paginação por cursor do histórico agrupado por execução
+            models.Index(fields=['requested_at', 'id']),
+            BrinIndex(fields=['requested_at'], name='simulacao_execucao_quando_brin'),
         ]
         ordering = ('-requested_at',)
 
     def __str__(self):
         return f'Execução {self.acao} [{self.lote_id}] - {self.jogo.cod}'
+
+class SimulacaoResumoDiario(models.Model):
+    """Totais do log por jogo, ação e dia, mantidos por simulacao.resumo."""
+    jogo = models.ForeignKey(Jogo, on_delete=models.CASCADE, related_name='resumos_simulacao')
+    acao = models.CharField(max_length=3, choices=SimulacaoPeriodo.ACAO_CHOICES)
+    dia = models.DateField()
+    total = models.PositiveIntegerField(default=0)
+    passos = models.PositiveIntegerField(default=0)
+    periodo_max = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = (('jogo', 'acao', 'dia'),)
+        indexes = [
+            models.Index(fields=['dia', 'acao']),
+        ]
+        ordering = ('-dia',)
+
+    def __str__(self):
+        return f'{self.dia} {self.jogo.cod} {self.acao}: {self.total}'
+
+class SimulacaoResumoMarca(models.Model):
+    """Marca d'água do resumo diário: o log até `ate` já foi somado."""
+    ate = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f'Resumo atualizado até {self.ate}'
+
+class DecisaoEmpresa(models.Model):
+    """Decisão de uma empresa para um período: preço de venda e produção."""
+    empresa = models.ForeignKey('jogo_empresa.Empresa', on_delete=models.CASCADE, related_name='decisoes')
+    periodo = models.PositiveIntegerField()
+    preco = models.DecimalField(max_digits=12, decimal_places=2)
+    producao = models.PositiveIntegerField()
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = (('empresa', 'periodo'),)
+        ordering = ('periodo',)
+
+    def __str__(self):
+        return f'{self.empresa} P{self.periodo}: {self.producao} un. a {self.preco}'
+
+class ResultadoEmpresa(models.Model):
+    """
+    Resultado de uma empresa num período simulado, gravado por
+    simulacao.motor. caixa, estoque e a_pagar são o estado ao fim do
+    período e servem de ponto de partida para o período seguinte.
+    """
+    jogo = models.ForeignKey(Jogo, on_delete=models.CASCADE, related_name='resultados_empresas')
+    empresa = models.ForeignKey('jogo_empresa.Empresa', on_delete=models.CASCADE, related_name='resultados')
+    periodo = models.PositiveIntegerField()
+    # Decisão efetivamente aplicada; automatica=True quando a empresa não decidiu
+    preco = models.DecimalField(max_digits=12, decimal_places=2)
+    producao = models.PositiveIntegerField()
+    automatica = models.BooleanField(default=False)
+
+    demanda = models.PositiveIntegerField()
+    vendas = models.PositiveIntegerField()
+    estoque = models.PositiveIntegerField()
+    receita = models.DecimalField(max_digits=16, decimal_places=2)
+    custo_producao = models.DecimalField(max_digits=16, decimal_places=2)
+    lucro = models.DecimalField(max_digits=16, decimal_places=2)
+    caixa = models.DecimalField(max_digits=16, decimal_places=2)
+    # Parcelas das compras de insumos pagas no período e as que vencem nos
+    # períodos seguintes (a_pagar[0] vence no próximo), conforme a forma de pagamento
+    pagamentos = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    a_pagar = models.JSONField(default=list)
+
+    class Meta:
+        unique_together = (('empresa', 'periodo'),)
+        indexes = [
+            models.Index(fields=['jogo', 'periodo']),
+        ]
+        ordering = ('periodo', 'empresa')
+
+    def __str__(self):
+        return f'{self.empresa} P{self.periodo}: vendas {self.vendas}, caixa {self.caixa}'
+
+
+class EstadoPeriodo(models.Model):
+    """
+    Checkpoint do motor: o estado de todas as empresas de um jogo ao fim de
+    um período, numa linha só. `estado` guarda uma matriz float64
+    empresa x (preço, produção, caixa, estoque, a_pagar...), na ordem de
+    `empresas`. `impressao` é o hash das entradas do período (estado
+    anterior, decisões, versão do cenário; ver motor.impressao): nos
+    reprocessamentos, o período é reaproveitado enquanto ela não mudar.
+    """
+    jogo = models.ForeignKey(Jogo, on_delete=models.CASCADE, related_name='estados')
+    periodo = models.PositiveIntegerField()
+    versao_cenario = models.CharField(max_length=32)
+    empresas = models.JSONField(default=list)
+    impressao = models.CharField(max_length=64, default='')
+    estado = models.BinaryField()
+
+    class Meta:
+        unique_together = (('jogo', 'periodo'),)
+        ordering = ('jogo', 'periodo')
+
+    def __str__(self):
+        return f'Estado de {self.jogo} ao fim de P{self.periodo}'
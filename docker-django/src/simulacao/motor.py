@@ -0,0 +1,365 @@
+"""
+Motor de simulação econômica dos períodos (SPA, SPN e reprocessamentos).
+
+Todas as empresas de um jogo são carregadas em vetores NumPy (preço,
+produção, caixa, estoque) e cada período é calculado numa única passada
+vetorizada: divisão da demanda do mercado, vendas, receita, custo de
+produção e caixa. Os períodos de um trecho são encadeados em sequência,
+já que cada um parte do caixa e do estoque deixados pelo anterior.
+
+Modelo de mercado (por período, com n empresas):
+- a demanda total cai com o preço médio: D * (preço médio / referência) ^ -e;
+- cada empresa recebe uma fatia proporcional a (preço / referência) ^ -e;
+- quem não tem produto para atender a sua fatia perde a venda, que migra
+  (uma vez) para as empresas com estoque sobrando;
+- a produção custa o custo unitário da lista de materiais do produto
+  (soma de preço x quantidade dos insumos), mas cada insumo é pago
+  conforme a sua forma de pagamento: as parcelas de todas as compras do
+  trecho são distribuídas de uma vez por simulacao.fluxo_caixa, e o
+  caixa de cada período só desconta o que vence nele.
+
+Os parâmetros do mercado e o custo vêm do cenário compilado
+(simulacao.cenario_compilado), sem reler produto e insumos a cada período.
+
+Empresas sem decisão gravada para um período repetem a última decisão
+aplicada; sem nenhuma, usam o preço de referência e uma fatia igual da
+demanda do mercado (decisão automática).
+
+Ao fim de cada período o estado de todas as empresas do jogo é gravado
+numa linha (EstadoPeriodo), com a impressão digital das entradas que o
+produziram. O período seguinte parte dele, e os reprocessamentos
+(retomar=True) reaproveitam os períodos cuja impressão não mudou em vez
+de refazer o jogo desde o período 0: uma decisão alterada tarde no jogo
+só invalida os períodos dali em diante.
+"""
+import hashlib
+import operator
+from functools import reduce
+
+import numpy as np
+from django.db.models import Q
+
+from jogo_empresa.models import Empresa
+from jogos.models import Jogo
+from . import cenario_compilado, fluxo_caixa
+from .models import DecisaoEmpresa, EstadoPeriodo, ResultadoEmpresa
+
+# Preço mínimo considerado no cálculo da atratividade (evita divisão por zero)
+PRECO_MINIMO = 0.01
+
+
+def simular_periodo(parametros, precos, producao, caixa, estoque, pagamentos=None):
+    """
+    Um período para todas as empresas de um jogo de uma vez. Recebe vetores
+    (n,) com a decisão e o estado inicial de cada empresa e devolve um dict
+    de vetores (n,) com o resultado e o estado ao fim do período.
+    `pagamentos` é o que vence para os fornecedores no período; sem ele,
+    a produção é paga à vista.
+    """
+    referencia = parametros["preco_referencia"]
+    elasticidade = parametros["elasticidade"]
+
+    relativo = np.maximum(precos, PRECO_MINIMO) / referencia
+    atratividade = relativo ** -elasticidade
+    demanda_total = parametros["demanda"] * relativo.mean() ** -elasticidade
+    demanda = np.floor(demanda_total * atratividade / atratividade.sum())
+
+    disponivel = estoque + producao
+    vendas = np.minimum(demanda, disponivel)
+
+    # Venda perdida por falta de produto migra para quem ainda tem estoque
+    sobra = (demanda - vendas).sum()
+    folga = disponivel - vendas
+    if sobra > 0 and folga.any():
+        peso = np.where(folga > 0, atratividade, 0.0)
+        vendas += np.minimum(folga, np.floor(sobra * peso / peso.sum()))
+
+    custo_unitario = parametros["custo_unitario"]
+    receita = vendas * precos
+    custo_producao = producao * custo_unitario
+    if pagamentos is None:
+        pagamentos = custo_producao
+    return {
+        "demanda": demanda,
+        "vendas": vendas,
+        "estoque": disponivel - vendas,
+        "receita": receita,
+        "custo_producao": custo_producao,
+        "lucro": receita - vendas * custo_unitario,
+        "caixa": caixa + receita - pagamentos,
+    }
+
+
+def _preencher_decisoes(matriz, semente):
+    """
+    Completa as lacunas (NaN) de uma matriz período x empresa repetindo o
+    último valor conhecido de cada coluna; `semente` é o valor anterior à
+    primeira linha.
+    """
+    completa = np.vstack([semente, matriz])
+    linhas = np.where(np.isnan(completa), 0, np.arange(completa.shape[0])[:, None])
+    np.maximum.accumulate(linhas, axis=0, out=linhas)
+    return completa[linhas, np.arange(completa.shape[1])][1:]
+
+
+def _ou(filtros):
+    """Junta os filtros (um por jogo) numa única condição OR."""
+    return reduce(operator.or_, filtros)
+
+
+def _empacotar(matriz):
+    return np.ascontiguousarray(matriz, dtype="<f8").tobytes()
+
+
+def _desempacotar(empresas, estado):
+    """Linhas de um EstadoPeriodo no formato de `anteriores` de _simular_trecho."""
+    matriz = np.frombuffer(bytes(estado), dtype="<f8").reshape(len(empresas), -1)
+    return [
+        (empresa_id, linha[0], int(linha[1]), linha[2], int(linha[3]), linha[4:].tolist())
+        for empresa_id, linha in zip(empresas, matriz)
+    ]
+
+
+def impressao(periodo, versao, empresas, estado_anterior, precos, producao):
+    """
+    Impressão digital (sha256) das entradas de um período: o estado ao fim
+    do anterior (bytes de um EstadoPeriodo; vazio no período 0), as
+    decisões gravadas no período (NaN onde a empresa não decidiu), a
+    versão do cenário compilado e as empresas. O resultado do período só
+    depende delas: a mesma impressão dá o mesmo resultado.
+    """
+    h = hashlib.sha256(f"{periodo}:{versao}:{','.join(map(str, empresas))}:".encode())
+    h.update(estado_anterior)
+    h.update(np.ascontiguousarray(precos, dtype="<f8").tobytes())
+    h.update(np.ascontiguousarray(producao, dtype="<f8").tobytes())
+    return h.hexdigest()
+
+
+def _matrizes_de_decisoes(decisoes, coluna, de, ate):
+    """Decisões gravadas de de..ate-1 em matrizes período x empresa (NaN sem decisão)."""
+    precos = np.full((ate - de, len(coluna)), np.nan)
+    producao = np.full((ate - de, len(coluna)), np.nan)
+    for empresa_id, periodo, preco, quantidade in decisoes:
+        if de <= periodo < ate:
+            precos[periodo - de, coluna[empresa_id]] = float(preco)
+            producao[periodo - de, coluna[empresa_id]] = quantidade
+    return precos, producao
+
+
+def _simular_trecho(jogo_id, de, ate, compilado, empresas, decisoes, anteriores, estado_anterior):
+    """
+    Encadeia os períodos de..ate-1 de um jogo; devolve os ResultadoEmpresa
+    e os EstadoPeriodo a gravar. `estado_anterior` são os bytes do
+    checkpoint de onde o trecho parte (vazio se não houver).
+    """
+    parametros = compilado.parametros
+    n, periodos = len(empresas), ate - de
+    coluna = {empresa_id: i for i, empresa_id in enumerate(empresas)}
+
+    gravados_preco, gravados_producao = _matrizes_de_decisoes(decisoes, coluna, de, ate)
+    automatica = np.isnan(gravados_preco)
+
+    semente_preco = np.full(n, parametros["preco_referencia"])
+    semente_producao = np.full(n, np.floor(parametros["demanda"] / n))
+    caixa = np.full(n, parametros["caixa_inicial"])
+    estoque = np.zeros(n)
+    a_pagar = np.zeros((n, cenario_compilado.PRAZO_MAXIMO - 1))
+    for empresa_id, preco, quantidade, caixa_ant, estoque_ant, a_pagar_ant in anteriores:
+        i = coluna.get(empresa_id)
+        if i is None:  # empresa excluída depois do checkpoint
+            continue
+        semente_preco[i], semente_producao[i] = float(preco), quantidade
+        caixa[i], estoque[i] = float(caixa_ant), estoque_ant
+        a_pagar[i, :len(a_pagar_ant)] = a_pagar_ant[:a_pagar.shape[1]]
+
+    precos = _preencher_decisoes(gravados_preco, semente_preco)
+    producao = _preencher_decisoes(gravados_producao, semente_producao)
+
+    contas = fluxo_caixa.contas_a_pagar(
+        *fluxo_caixa.compras_de_producao(producao, compilado.custos, compilado.parcelas),
+        n_devedores=n, n_periodos=periodos,
+    )
+    pagamentos, a_pagar = fluxo_caixa.vencimentos(contas, a_pagar)
+
+    resultados, estados = [], []
+    for k in range(periodos):
+        saida = simular_periodo(parametros, precos[k], producao[k], caixa, estoque, pagamentos[k])
+        caixa, estoque = saida["caixa"], saida["estoque"]
+        # Arredondado como nos resultados: retomar daqui dá o mesmo que seguir deles
+        estado = _empacotar(np.column_stack([
+            np.round(precos[k], 2), producao[k], np.round(caixa, 2), estoque, np.round(a_pagar[k], 2),
+        ]))
+        estados.append(EstadoPeriodo(
+            jogo_id=jogo_id,
+            periodo=de + k,
+            versao_cenario=compilado.versao,
+            empresas=list(empresas),
+            impressao=impressao(
+                de + k, compilado.versao, empresas, estado_anterior, gravados_preco[k], gravados_producao[k],
+            ),
+            estado=estado,
+        ))
+        estado_anterior = estado
+        resultados.extend(
+            ResultadoEmpresa(
+                jogo_id=jogo_id,
+                empresa_id=empresa_id,
+                periodo=de + k,
+                preco=round(float(precos[k, i]), 2),
+                producao=int(producao[k, i]),
+                automatica=bool(automatica[k, i]),
+                demanda=int(saida["demanda"][i]),
+                vendas=int(saida["vendas"][i]),
+                estoque=int(saida["estoque"][i]),
+                receita=round(float(saida["receita"][i]), 2),
+                custo_producao=round(float(saida["custo_producao"][i]), 2),
+                lucro=round(float(saida["lucro"][i]), 2),
+                caixa=round(float(saida["caixa"][i]), 2),
+                pagamentos=round(float(pagamentos[k, i]), 2),
+                a_pagar=[round(float(valor), 2) for valor in a_pagar[k, i]],
+            )
+            for i, empresa_id in enumerate(empresas)
+        )
+    return resultados, estados
+
+
+def _retomar(trechos, empresas, versoes, decisoes):
+    """
+    Avança o início de cada trecho enquanto o período tiver um checkpoint
+    com a mesma impressão das entradas atuais: o resultado gravado dele
+    continua valendo e não é recalculado. Devolve os novos trechos e o
+    checkpoint de onde cada jogo recomeça, {jogo_id: (empresas, estado)}.
+    """
+    if not versoes:
+        return trechos, {}
+    checkpoints = {jogo_id: {} for jogo_id in versoes}
+    for jogo_id, periodo, impressao_gravada, ids, estado in EstadoPeriodo.objects.filter(_ou(
+        Q(jogo_id=jogo_id, periodo__gte=de - 1, periodo__lt=ate)
+        for jogo_id, (de, ate) in trechos.items() if jogo_id in versoes
+    )).values_list("jogo_id", "periodo", "impressao", "empresas", "estado"):
+        checkpoints[jogo_id][periodo] = (impressao_gravada, ids, bytes(estado))
+
+    retomados, iniciais = dict(trechos), {}
+    for jogo_id, versao in versoes.items():
+        de, ate = trechos[jogo_id]
+        anterior = checkpoints[jogo_id].get(de - 1)
+        if de > 0 and anterior is None:
+            continue
+        coluna = {empresa_id: i for i, empresa_id in enumerate(empresas[jogo_id])}
+        precos, producao = _matrizes_de_decisoes(decisoes[jogo_id], coluna, de, ate)
+
+        periodo = de
+        while periodo < ate:
+            atual = checkpoints[jogo_id].get(periodo)
+            esperada = impressao(
+                periodo, versao, empresas[jogo_id], anterior[2] if anterior else b"",
+                precos[periodo - de], producao[periodo - de],
+            )
+            if atual is None or atual[0] != esperada:
+                break
+            anterior, periodo = atual, periodo + 1
+        retomados[jogo_id] = (periodo, ate)
+        if anterior is not None:
+            iniciais[jogo_id] = anterior[1:]
+    return retomados, iniciais
+
+
+def simular_jogos(trechos, retomar=False):
+    """
+    Simula, para cada jogo, os períodos de..ate-1 de `trechos`
+    ({jogo_id: (de, ate)}) e regrava os resultados a partir de `de`
+    (os seguintes deixam de valer). Com retomar=True, os períodos cujas
+    entradas não mudaram (mesma impressão do checkpoint) são mantidos e só
+    os seguintes são recalculados. Os dados de todos os jogos são lidos
+    com um número fixo de consultas. Devolve quantos resultados foram gravados.
+    """
+    trechos = {jogo_id: (de, ate) for jogo_id, (de, ate) in trechos.items() if ate > de}
+    if not trechos:
+        return 0
+
+    empresas = {jogo_id: [] for jogo_id in trechos}
+    for empresa_id, jogo_id in (
+        Empresa.objects.filter(jogo_id__in=trechos).order_by("id").values_list("id", "jogo_id")
+    ):
+        empresas[jogo_id].append(empresa_id)
+    # Jogos sem empresas só têm os resultados antigos descartados
+    jogos = list(
+        Jogo.objects.filter(id__in=[jogo_id for jogo_id, ids in empresas.items() if ids])
+        .values_list("id", "cenario_id", "cenario__versao_compilacao")
+    )
+
+    decisoes = {jogo_id: [] for jogo_id in trechos}
+    for jogo_id, *decisao in (
+        DecisaoEmpresa.objects.filter(_ou(
+            Q(empresa__jogo_id=jogo_id, periodo__gte=de, periodo__lt=ate)
+            for jogo_id, (de, ate) in trechos.items()
+        )).values_list("empresa__jogo_id", "empresa_id", "periodo", "preco", "producao")
+    ):
+        decisoes[jogo_id].append(decisao)
+
+    iniciais = {}
+    if retomar:
+        trechos, iniciais = _retomar(trechos, empresas, {jogo_id: versao for jogo_id, _, versao in jogos}, decisoes)
+        jogos = [jogo for jogo in jogos if trechos[jogo[0]][0] < trechos[jogo[0]][1]]
+    compilados = cenario_compilado.obter_varios({cenario_id: versao for _, cenario_id, versao in jogos})
+
+    continuam = {
+        jogo_id: trechos[jogo_id][0] for jogo_id, _, _ in jogos
+        if trechos[jogo_id][0] > 0 and jogo_id not in iniciais
+    }
+    if continuam:
+        for jogo_id, ids, estado in EstadoPeriodo.objects.filter(_ou(
+            Q(jogo_id=jogo_id, periodo=de - 1) for jogo_id, de in continuam.items()
+        )).values_list("jogo_id", "empresas", "estado"):
+            iniciais[jogo_id] = (ids, bytes(estado))
+            del continuam[jogo_id]
+    anteriores = {jogo_id: _desempacotar(ids, estado) for jogo_id, (ids, estado) in iniciais.items()}
+    # Resultados gravados antes dos checkpoints: parte deles
+    if continuam:
+        for jogo_id, *anterior in (
+            ResultadoEmpresa.objects.filter(_ou(
+                Q(jogo_id=jogo_id, periodo=de - 1) for jogo_id, de in continuam.items()
+            )).values_list("jogo_id", "empresa_id", "preco", "producao", "caixa", "estoque", "a_pagar")
+        ):
+            anteriores.setdefault(jogo_id, []).append(anterior)
+
+    descartar({jogo_id: de for jogo_id, (de, _) in trechos.items()})
+
+    novos, estados = [], []
+    for jogo_id, cenario_id, _ in jogos:
+        de, ate = trechos[jogo_id]
+        resultados, checkpoints = _simular_trecho(
+            jogo_id, de, ate, compilados[cenario_id], empresas[jogo_id], decisoes[jogo_id],
+            anteriores.get(jogo_id, []), iniciais.get(jogo_id, (None, b""))[1],
+        )
+        novos.extend(resultados)
+        estados.extend(checkpoints)
+    ResultadoEmpresa.objects.bulk_create(novos, batch_size=1000)
+    EstadoPeriodo.objects.bulk_create(estados, batch_size=500)
+    return len(novos)
+
+
+def simular(jogo, de, ate):
+    """Simula os períodos de..ate-1 de um jogo (ver simular_jogos)."""
+    return simular_jogos({jogo.id: (de, ate)})
+
+
+def reprocessar(jogo, ate):
+    """
+    Refaz os períodos 0..ate-1 de um jogo (R0D, RND, RSD), reaproveitando
+    os períodos cujas entradas não mudaram (ver simular_jogos).
+    """
+    return simular_jogos({jogo.id: (0, ate)}, retomar=True)
+
+
+def descartar(inicios):
+    """
+    Apaga os resultados de cada jogo a partir de um período
+    ({jogo_id: periodo}); usado ao resimular e ao cancelar uma simulação.
+    """
+    if not inicios:
+        return 0
+    filtro = _ou(Q(jogo_id=jogo_id, periodo__gte=periodo) for jogo_id, periodo in inicios.items())
+    EstadoPeriodo.objects.filter(filtro).delete()
+    apagados, _ = ResultadoEmpresa.objects.filter(filtro).delete()
+    return apagados
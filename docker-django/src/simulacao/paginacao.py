@@ -0,0 +1,76 @@
+"""
+Paginação por cursor (keyset) para o histórico de simulações.
+
+A ordem é sempre (-requested_at, -id). Em vez de OFFSET + COUNT(*), cada
+página guarda a chave do primeiro e do último item e a página vizinha é
+buscada com "(requested_at, id) menor/maior que a chave": a página 500
+custa o mesmo que a primeira.
+"""
+import base64
+import binascii
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+def codificar_cursor(obj):
+    bruto = f"{obj.requested_at.isoformat()}|{obj.pk}"
+    return base64.urlsafe_b64encode(bruto.encode()).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor):
+    """Devolve (requested_at, id) ou None se o cursor for inválido."""
+    try:
+        bruto = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        instante, pk = bruto.rsplit("|", 1)
+        requested_at = parse_datetime(instante)
+        return (requested_at, int(pk)) if requested_at else None
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+
+class PaginaKeyset:
+    def __init__(self, object_list, has_next, has_previous):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.cursor_proximo = codificar_cursor(object_list[-1]) if object_list else ""
+        self.cursor_anterior = codificar_cursor(object_list[0]) if object_list else ""
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def paginar(qs, apos=None, antes=None, tamanho=20):
+    """
+    Página de `qs` em ordem (-requested_at, -id).
+    - apos: cursor do último item da página atual (próxima página)
+    - antes: cursor do primeiro item da página atual (página anterior)
+    Sem cursor válido, devolve a primeira página.
+    """
+    chave_apos = decodificar_cursor(apos) if apos else None
+    chave_antes = decodificar_cursor(antes) if antes else None
+
+    if chave_antes:
+        instante, pk = chave_antes
+        itens = list(
+            qs.filter(requested_at__gte=instante)
+            .filter(Q(requested_at__gt=instante) | Q(pk__gt=pk))
+            .order_by("requested_at", "id")[:tamanho + 1]
+        )
+        tem_anterior = len(itens) > tamanho
+        itens = itens[:tamanho][::-1]
+        return PaginaKeyset(itens, has_next=True, has_previous=tem_anterior)
+
+    if chave_apos:
+        instante, pk = chave_apos
+        qs = (
+            qs.filter(requested_at__lte=instante)
+            .filter(Q(requested_at__lt=instante) | Q(pk__lt=pk))
+        )
+
+    itens = list(qs.order_by("-requested_at", "-id")[:tamanho + 1])
+    return PaginaKeyset(itens[:tamanho], has_next=len(itens) > tamanho, has_previous=bool(chave_apos))
@@ -0,0 +1,144 @@
+"""
+Partições mensais de SimulacaoPeriodo (PostgreSQL, RANGE em requested_at).
+
+A migração 0007 transforma a tabela em particionada; daqui em diante as
+partições dos próximos meses são criadas com antecedência e a retenção
+desanexa ou remove partições inteiras, sem DELETE linha a linha.
+"""
+import datetime
+import logging
+import re
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import SimulacaoPeriodo
+
+logger = logging.getLogger(__name__)
+
+TABELA = SimulacaoPeriodo._meta.db_table
+PADRAO = f"{TABELA}_padrao"
+_NOME_MENSAL = re.compile(rf"^{TABELA}_p(\d{{4}})(\d{{2}})$")
+
+
+def inicio_do_mes(data):
+    return datetime.date(data.year, data.month, 1)
+
+
+def somar_meses(mes, quantidade):
+    indice = mes.year * 12 + mes.month - 1 + quantidade
+    return datetime.date(indice // 12, indice % 12 + 1, 1)
+
+
+def nome_particao(mes):
+    return f"{TABELA}_p{mes:%Y%m}"
+
+
+def _limite(mes):
+    # Limites sempre em UTC, independente do fuso da sessão
+    return f"{mes.isoformat()} 00:00:00+00"
+
+
+def particionada():
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)", [TABELA]
+        )
+        return cursor.fetchone() is not None
+
+
+def listar_particoes():
+    """Partições mensais anexadas, como [(mes, nome)] em ordem cronológica."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(%s)",
+            [TABELA],
+        )
+        nomes = [nome for (nome,) in cursor.fetchall()]
+    mensais = []
+    for nome in nomes:
+        casamento = _NOME_MENSAL.match(nome)
+        if casamento:
+            mensais.append((datetime.date(int(casamento[1]), int(casamento[2]), 1), nome))
+    return sorted(mensais)
+
+
+def criar_particao(mes):
+    """
+    Cria a partição do mês, se ainda não existir. Linhas do mês que tenham
+    caído na partição padrão são movidas para ela na mesma transação.
+    Devolve True se a partição foi criada.
+    """
+    nome = nome_particao(mes)
+    de, ate = _limite(mes), _limite(somar_meses(mes, 1))
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute("SELECT to_regclass(%s)", [nome])
+        if cursor.fetchone()[0] is not None:
+            return False
+
+        cursor.execute(
+            f"SELECT EXISTS (SELECT 1 FROM {PADRAO} WHERE requested_at >= %s AND requested_at < %s)",
+            [de, ate],
+        )
+        orfas = cursor.fetchone()[0]
+        if orfas:
+            cursor.execute(f"ALTER TABLE {TABELA} DETACH PARTITION {PADRAO}")
+
+        cursor.execute(
+            f"CREATE TABLE {nome} PARTITION OF {TABELA} FOR VALUES FROM (%s) TO (%s)", [de, ate]
+        )
+
+        if orfas:
+            cursor.execute(
+                f"WITH movidas AS (DELETE FROM {PADRAO} WHERE requested_at >= %s AND requested_at < %s "
+                f"RETURNING *) INSERT INTO {TABELA} SELECT * FROM movidas",
+                [de, ate],
+            )
+            cursor.execute(f"ALTER TABLE {TABELA} ATTACH PARTITION {PADRAO} DEFAULT")
+    logger.info("Partição %s criada", nome)
+    return True
+
+
+def manter(meses_a_frente=None, retencao_meses=None, desanexar=None):
+    """
+    Garante as partições do mês corrente e dos `meses_a_frente` seguintes e
+    aplica a retenção: partições anteriores a `retencao_meses` meses são
+    desanexadas (continuam como tabelas avulsas, prontas para arquivar) ou,
+    com desanexar=False, removidas. retencao_meses=0 desliga a retenção.
+    """
+    if meses_a_frente is None:
+        meses_a_frente = settings.SIMULACAO_PARTICOES_A_FRENTE
+    if retencao_meses is None:
+        retencao_meses = settings.SIMULACAO_RETENCAO_MESES
+    if desanexar is None:
+        desanexar = settings.SIMULACAO_RETENCAO_DESANEXAR
+
+    relatorio = {"criadas": [], "desanexadas": [], "removidas": []}
+    if not particionada():
+        logger.warning("%s não é particionada; nada a manter", TABELA)
+        return relatorio
+
+    atual = inicio_do_mes(timezone.now())
+    for n in range(meses_a_frente + 1):
+        mes = somar_meses(atual, n)
+        if criar_particao(mes):
+            relatorio["criadas"].append(nome_particao(mes))
+
+    if retencao_meses:
+        limite = somar_meses(atual, -retencao_meses)
+        with connection.cursor() as cursor:
+            for mes, nome in listar_particoes():
+                if mes >= limite:
+                    break
+                if desanexar:
+                    cursor.execute(f"ALTER TABLE {TABELA} DETACH PARTITION {nome}")
+                    relatorio["desanexadas"].append(nome)
+                else:
+                    cursor.execute(f"DROP TABLE {nome}")
+                    relatorio["removidas"].append(nome)
+                logger.info("Partição %s %s pela retenção", nome, "desanexada" if desanexar else "removida")
+    return relatorio
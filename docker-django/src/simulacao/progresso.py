@@ -0,0 +1,92 @@
+"""
+Progresso dos lotes executados em segundo plano, guardado no Redis.
+
+Cada lote usa três chaves:
+- simulacao:lote:<lote_id>             hash com status, ação, total e concluídos
+- simulacao:lote:<lote_id>:jogos       hash jogo_id -> resultado (JSON) de cada jogo
+- simulacao:lote:<lote_id>:registrado  marca (SET NX) de que o lote já foi enfileirado
+"""
+import json
+
+from django.conf import settings
+
+from .redis_client import get_redis
+
+PENDENTE = "pendente"
+EXECUTANDO = "executando"
+CONCLUIDO = "concluido"
+ERRO = "erro"
+
+
+def _chave(lote_id):
+    return f"simulacao:lote:{lote_id}"
+
+
+def _chave_jogos(lote_id):
+    return f"simulacao:lote:{lote_id}:jogos"
+
+
+def iniciar(lote_id, acao, jogos_ids):
+    """
+    Registra o lote como pendente, com todos os jogos aguardando execução.
+    Devolve False, sem alterar nada, se o lote já foi registrado antes
+    (reenvio do mesmo formulário): ele não deve ser enfileirado de novo.
+    """
+    ttl = settings.SIMULACAO_PROGRESSO_TTL
+    cliente = get_redis()
+    if not cliente.set(f"{_chave(lote_id)}:registrado", acao, nx=True, ex=ttl):
+        return False
+
+    pipe = cliente.pipeline()
+    pipe.hset(_chave(lote_id), mapping={
+        "status": PENDENTE,
+        "acao": acao,
+        "total": len(jogos_ids),
+        "concluidos": 0,
+        "erro": "",
+    })
+    pipe.hset(_chave_jogos(lote_id), mapping={
+        str(jogo_id): json.dumps({"jogo_id": jogo_id, "status": PENDENTE})
+        for jogo_id in jogos_ids
+    })
+    pipe.expire(_chave(lote_id), ttl)
+    pipe.expire(_chave_jogos(lote_id), ttl)
+    pipe.execute()
+    return True
+
+
+def marcar_executando(lote_id):
+    get_redis().hset(_chave(lote_id), "status", EXECUTANDO)
+
+
+def registrar_resultado(lote_id, resultado):
+    """Guarda o resultado de um jogo e avança o contador do lote."""
+    situacao = ERRO if resultado.get("erro") else CONCLUIDO
+    pipe = get_redis().pipeline()
+    pipe.hset(_chave_jogos(lote_id), str(resultado["jogo_id"]), json.dumps(dict(resultado, status=situacao)))
+    pipe.hincrby(_chave(lote_id), "concluidos", 1)
+    pipe.execute()
+
+
+def finalizar(lote_id, status=CONCLUIDO, erro=""):
+    get_redis().hset(_chave(lote_id), mapping={"status": status, "erro": erro})
+
+
+def ler(lote_id):
+    """Devolve o progresso do lote, ou None se ele não existe (ou já expirou)."""
+    pipe = get_redis().pipeline()
+    pipe.hgetall(_chave(lote_id))
+    pipe.hvals(_chave_jogos(lote_id))
+    lote, jogos = pipe.execute()
+    if not lote:
+        return None
+
+    return {
+        "lote_id": lote_id,
+        "status": lote.get("status", PENDENTE),
+        "acao": lote.get("acao", ""),
+        "total": int(lote.get("total", 0)),
+        "concluidos": int(lote.get("concluidos", 0)),
+        "erro": lote.get("erro", ""),
+        "jogos": sorted((json.loads(j) for j in jogos), key=lambda j: j["jogo_id"]),
+    }
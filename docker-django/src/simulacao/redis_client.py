@@ -0,0 +1,12 @@
+import redis
+from django.conf import settings
+
+_cliente = None
+
+
+def get_redis():
+    """Cliente Redis do app de simulação (um pool de conexões por processo)."""
+    global _cliente
+    if _cliente is None:
+        _cliente = redis.Redis.from_url(settings.SIMULACAO_REDIS_URL, decode_responses=True)
+    return _cliente
@@ -0,0 +1,98 @@
+"""
+Resumo diário do histórico (SimulacaoResumoDiario), atualizado de forma
+incremental a partir de uma marca d'água em requested_at.
+
+Cada rodada soma só o log entre a marca e agora - SIMULACAO_RESUMO_ATRASO.
+O atraso cobre transações ainda abertas: uma linha gravada com um
+requested_at antigo só fica visível no commit, e não pode cair atrás da
+marca. Por isso o atraso deve ser maior que a transação mais longa de
+processar_lista.
+
+O arquivamento (simulacao.arquivo) não mexe no resumo: o log arquivado
+continua somado. Ao restaurar um lote, somar_restaurados soma só as
+linhas que ainda não tinham sido somadas quando foram arquivadas.
+"""
+import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import SimulacaoPeriodo, SimulacaoResumoDiario, SimulacaoResumoMarca
+
+
+def travar_marca():
+    """Marca d'água travada até o fim da transação; serializa quem lê ou move a marca."""
+    marca, _ = SimulacaoResumoMarca.objects.select_for_update().get_or_create(pk=1)
+    return marca
+
+
+def _somar(novos):
+    """Soma as linhas de log `novos` aos totais do resumo; devolve quantas linhas do resumo mudaram."""
+    somas = {
+        (linha["jogo_id"], linha["acao"], linha["dia"]): linha
+        for linha in novos.annotate(dia=TruncDate("requested_at"))
+        .values("jogo_id", "acao", "dia")
+        .annotate(total=Count("id"), passos=Sum("passos"), periodo_max=Max("periodo_para"))
+        .order_by()
+    }
+
+    existentes = {}
+    if somas:
+        dias = {dia for _, _, dia in somas}
+        jogos = {jogo_id for jogo_id, _, _ in somas}
+        for resumo in SimulacaoResumoDiario.objects.filter(dia__in=dias, jogo_id__in=jogos):
+            existentes[(resumo.jogo_id, resumo.acao, resumo.dia)] = resumo
+
+    alterar, criar = [], []
+    for chave, soma in somas.items():
+        resumo = existentes.get(chave)
+        if resumo is None:
+            criar.append(SimulacaoResumoDiario(
+                jogo_id=chave[0], acao=chave[1], dia=chave[2],
+                total=soma["total"], passos=soma["passos"], periodo_max=soma["periodo_max"],
+            ))
+        else:
+            resumo.total += soma["total"]
+            resumo.passos += soma["passos"]
+            resumo.periodo_max = max(resumo.periodo_max, soma["periodo_max"])
+            alterar.append(resumo)
+    SimulacaoResumoDiario.objects.bulk_create(criar)
+    SimulacaoResumoDiario.objects.bulk_update(alterar, ["total", "passos", "periodo_max"])
+    return len(criar) + len(alterar)
+
+
+@transaction.atomic
+def atualizar_resumo(agora=None):
+    """Soma ao resumo o log novo desde a última rodada; devolve quantas linhas mudaram."""
+    # A marca travada serializa rodadas concorrentes (beat e comando manual)
+    marca = travar_marca()
+    agora = agora or timezone.now()
+    ate = agora - datetime.timedelta(seconds=settings.SIMULACAO_RESUMO_ATRASO)
+    if marca.ate is not None and ate <= marca.ate:
+        return 0
+
+    novos = SimulacaoPeriodo.objects.filter(requested_at__lt=ate)
+    if marca.ate is not None:
+        novos = novos.filter(requested_at__gte=marca.ate)
+    alteradas = _somar(novos)
+
+    marca.ate = ate
+    marca.save(update_fields=["ate"])
+    return alteradas
+
+
+@transaction.atomic
+def somar_restaurados(ids):
+    """
+    Soma ao resumo logs devolvidos ao banco por arquivo.restaurar_lote que
+    não estavam somados quando foram arquivados. Os que ficaram atrás da
+    marca não seriam mais vistos pela atualização incremental e são somados
+    aqui; os demais ficam para ela.
+    """
+    marca = travar_marca()
+    if marca.ate is None or not ids:
+        return 0
+    return _somar(SimulacaoPeriodo.objects.filter(id__in=ids, requested_at__lt=marca.ate))
@@ -1,9 +1,23 @@
+import logging
+import time
 import uuid
-from django.db import transaction
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
 from jogos.models import Jogo
+from . import motor
 from .models import SimulacaoExecucao, SimulacaoPeriodo
 
 ACOES = {c for c, _ in SimulacaoPeriodo.ACAO_CHOICES}
+# Ações que só mexem em periodo_atual/status_decisoes_disponiveis e podem
+# ser aplicadas a todos os jogos com poucas instruções SQL
+ACOES_VETORIZADAS = {SimulacaoPeriodo.LPD, SimulacaoPeriodo.SPN, SimulacaoPeriodo.CAD}
+
+logger = logging.getLogger(__name__)
+
+
+class ConflitoDeVersao(Exception):
+    """O jogo foi alterado por outro processo depois de ser lido."""
 
 
 def gerar_lote_id():
@@ -17,25 +31,55 @@ def _criar_execucao(jogo: Jogo, acao: str, lote_id: str, user):
         defaults={"acao": acao},
     )
     if not created and obj.acao != acao:
+        # Mesmo lote com outra ação: é uma nova execução, o resultado antigo não vale
         obj.acao = acao
-        obj.save(update_fields=["acao"])
+        obj.resultado = None
+        obj.save(update_fields=["acao", "resultado"])
     return obj
 
 
-def _proximo_step(execucao: SimulacaoExecucao):
-    ultimo = (
-        SimulacaoPeriodo.objects.filter(execucao=execucao)
-        .order_by("-step_index")
-        .first()
-    )
-    return 0 if not ultimo else ultimo.step_index + 1
+def _reservar_steps(execucao: SimulacaoExecucao, quantidade=1):
+    """
+    Reserva um bloco de `quantidade` step_index na execução e devolve o primeiro.
+    É um único UPDATE ... RETURNING: o incremento é atômico e a linha fica
+    travada até o commit, então escritores concorrentes nunca colidem.
+    """
+    tabela = connection.ops.quote_name(SimulacaoExecucao._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {tabela} SET proximo_step = proximo_step + %s "
+            f"WHERE id = %s RETURNING proximo_step",
+            [quantidade, execucao.pk],
+        )
+        fim = cursor.fetchone()[0]
+    execucao.proximo_step = fim
+    return fim - quantidade
+
+
+def _reservar_um_step_por_execucao(execucao_ids):
+    """
+    Reserva um step_index em cada execução com um único UPDATE ... RETURNING.
+    Devolve {execucao_id: step_index}.
+    """
+    if not execucao_ids:
+        return {}
+    tabela = connection.ops.quote_name(SimulacaoExecucao._meta.db_table)
+    marcadores = ", ".join(["%s"] * len(execucao_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {tabela} SET proximo_step = proximo_step + 1 "
+            f"WHERE id IN ({marcadores}) RETURNING id, proximo_step",
+            list(execucao_ids),
+        )
+        return {execucao_id: fim - 1 for execucao_id, fim in cursor.fetchall()}
 
 
 def _criar_periodo(execucao, jogo, acao, periodo_de, periodo_para):
-    step = _proximo_step(execucao)
+    step = _reservar_steps(execucao)
     return SimulacaoPeriodo.objects.create(
         execucao=execucao,
         jogo=jogo,
+        lote_id=execucao.lote_id,
         acao=acao,
         periodo_de=periodo_de,
         periodo_para=periodo_para,
@@ -43,10 +87,66 @@ def _criar_periodo(execucao, jogo, acao, periodo_de, periodo_para):
     )
 
 
+def _criar_periodos(execucao, jogo, passos):
+    """
+    Grava vários passos (acao, periodo_de, periodo_para, passos) de uma só vez.
+    Os step_index saem de um único bloco reservado na execução.
+    """
+    if not passos:
+        return []
+    inicio = _reservar_steps(execucao, len(passos))
+    return SimulacaoPeriodo.objects.bulk_create([
+        SimulacaoPeriodo(
+            execucao=execucao,
+            jogo=jogo,
+            lote_id=execucao.lote_id,
+            acao=acao,
+            periodo_de=periodo_de,
+            periodo_para=periodo_para,
+            passos=quantidade,
+            step_index=inicio + i,
+        )
+        for i, (acao, periodo_de, periodo_para, quantidade) in enumerate(passos)
+    ])
+
+
+def _salvar_estado(jogo, campos):
+    """
+    Grava `campos` do jogo com compare-and-swap na coluna versao: o UPDATE só
+    acontece se ninguém alterou o jogo desde que ele foi lido. Caso contrário
+    levanta ConflitoDeVersao, e quem chamou decide se relê e tenta de novo.
+
+    As ações o chamam antes do motor: com outra simulação do mesmo jogo em
+    curso, o UPDATE espera a trava da linha e falha na versao, em vez de os
+    resultados das duas colidirem nas chaves únicas (IntegrityError).
+    """
+    valores = {campo: getattr(jogo, campo) for campo in campos}
+    atualizados = (
+        Jogo.objects.filter(pk=jogo.pk, versao=jogo.versao)
+        .update(versao=F("versao") + 1, **valores)
+    )
+    if not atualizados:
+        raise ConflitoDeVersao(jogo.pk)
+    jogo.versao += 1
+
+
+def _passos_replay(acao, ate):
+    """
+    Reprocessamento de 0 até `ate` como uma única faixa compactada; as
+    transições k -> k+1 são reconstruídas por SimulacaoPeriodo.expandir().
+    """
+    if ate <= 0:
+        return []
+    return [(acao, 0, ate, ate)]
+
+
 def _acao_R0D(jogo, execucao):
     p = jogo.periodo_atual
-    for k in range(0, p):
-        _criar_periodo(execucao, jogo, SimulacaoPeriodo.R0D, k, k + 1)
+    _criar_periodos(execucao, jogo, _passos_replay(SimulacaoPeriodo.R0D, p))
+    # Não muda o jogo, mas reescreve os resultados: a versao sobe para que um
+    # SPN concorrente, que gravaria o período que o motor vai descartar, conflite
+    _salvar_estado(jogo, [])
+    motor.reprocessar(jogo, p)
     return {
         "logs": p,
         "periodo_final": jogo.periodo_atual,
@@ -56,11 +156,11 @@ def _acao_R0D(jogo, execucao):
 
 def _acao_RND(jogo, execucao):
     p = jogo.periodo_atual
-    for k in range(0, p + 1):
-        _criar_periodo(execucao, jogo, SimulacaoPeriodo.RND, k, k + 1)
+    _criar_periodos(execucao, jogo, _passos_replay(SimulacaoPeriodo.RND, p + 1))
     jogo.periodo_atual = p + 1
     jogo.status_decisoes_disponiveis = False
-    jogo.save(update_fields=["periodo_atual", "status_decisoes_disponiveis"])
+    _salvar_estado(jogo, ["periodo_atual", "status_decisoes_disponiveis"])
+    motor.reprocessar(jogo, p + 1)
     return {
         "logs": p + 1,
         "periodo_final": jogo.periodo_atual,
@@ -82,7 +182,8 @@ def _acao_SPA(jogo, execucao):
 
     jogo.periodo_atual = p + 1
     jogo.status_decisoes_disponiveis = False
-    jogo.save(update_fields=["periodo_atual", "status_decisoes_disponiveis"])
+    _salvar_estado(jogo, ["periodo_atual", "status_decisoes_disponiveis"])
+    motor.simular(jogo, p, p + 1)
 
     return {
         "logs": 1,
@@ -105,7 +206,8 @@ def _acao_SPN(jogo, execucao):
 
     jogo.periodo_atual = p + 1
     jogo.status_decisoes_disponiveis = True
-    jogo.save(update_fields=["periodo_atual", "status_decisoes_disponiveis"])
+    _salvar_estado(jogo, ["periodo_atual", "status_decisoes_disponiveis"])
+    motor.simular(jogo, p, p + 1)
 
     return {
         "logs": 1,
@@ -117,6 +219,8 @@ def _acao_SPN(jogo, execucao):
 def _acao_RDA(jogo, execucao):
     p = jogo.periodo_atual
     _criar_periodo(execucao, jogo, SimulacaoPeriodo.RDA, max(0, p - 1), p)
+    _salvar_estado(jogo, [])
+    motor.simular(jogo, max(0, p - 1), p)
     return {
         "logs": 1,
         "periodo_final": jogo.periodo_atual,
@@ -128,7 +232,7 @@ def _acao_LPD(jogo, execucao):
     _criar_periodo(execucao, jogo, SimulacaoPeriodo.LPD, jogo.periodo_atual, jogo.periodo_atual)
     if not jogo.status_decisoes_disponiveis:
         jogo.status_decisoes_disponiveis = True
-        jogo.save(update_fields=["status_decisoes_disponiveis"])
+        _salvar_estado(jogo, ["status_decisoes_disponiveis"])
     return {
         "logs": 1,
         "periodo_final": jogo.periodo_atual,
@@ -142,7 +246,8 @@ def _acao_CAD(jogo, execucao):
     _criar_periodo(execucao, jogo, SimulacaoPeriodo.CAD, p, novo)
     if p != novo:
         jogo.periodo_atual = novo
-        jogo.save(update_fields=["periodo_atual"])
+        _salvar_estado(jogo, ["periodo_atual"])
+        motor.descartar({jogo.id: novo})
     return {
         "logs": 1,
         "periodo_final": jogo.periodo_atual,
@@ -152,18 +257,16 @@ def _acao_CAD(jogo, execucao):
 
 def _acao_RSD(jogo, execucao):
     p = jogo.periodo_atual
-    for k in range(0, p):
-        _criar_periodo(execucao, jogo, SimulacaoPeriodo.R0D, k, k + 1)
+    passos = _passos_replay(SimulacaoPeriodo.R0D, p)
+    passos.append((SimulacaoPeriodo.SPN, p, p + 1, 1))
+    passos.append((SimulacaoPeriodo.LPD, p + 1, p + 1, 1))
+    _criar_periodos(execucao, jogo, passos)
 
-    _criar_periodo(execucao, jogo, SimulacaoPeriodo.SPN, p, p + 1)
+    # SPN seguido de LPD: termina no próximo período com decisões liberadas
     jogo.periodo_atual = p + 1
-    jogo.status_decisoes_disponiveis = False
-    jogo.save(update_fields=["periodo_atual", "status_decisoes_disponiveis"])
-
-    _criar_periodo(execucao, jogo, SimulacaoPeriodo.LPD, jogo.periodo_atual, jogo.periodo_atual)
-    if not jogo.status_decisoes_disponiveis:
-        jogo.status_decisoes_disponiveis = True
-        jogo.save(update_fields=["status_decisoes_disponiveis"])
+    jogo.status_decisoes_disponiveis = True
+    _salvar_estado(jogo, ["periodo_atual", "status_decisoes_disponiveis"])
+    motor.reprocessar(jogo, p + 1)
 
     total_logs = p + 2
     return {
@@ -185,8 +288,95 @@ _FUNCS = {
 }
 
 
+def _resultado(jogo, acao, lote, antes_p, antes_dec, info):
+    return {
+        "jogo_id": jogo.id,
+        "cod": jogo.cod,
+        "nome": jogo.nome,
+        "acao": acao,
+        "lote_id": lote,
+        "periodo_antes": antes_p,
+        "periodo_depois": info["periodo_final"],
+        "decisoes_antes": antes_dec,
+        "decisoes_depois": info["decisoes"],
+        "logs_criados": info["logs"],
+        "erro": info.get("erro", ""),
+        "repetido": False,
+    }
+
+
+def _repeticao(execucao):
+    """Resultado já gravado de uma execução concluída, sem executá-la de novo."""
+    return dict(execucao.resultado, repetido=True)
+
+
+def _processar_jogo(jogo, acao, lote, user):
+    execucao = _criar_execucao(jogo, acao, lote, user)
+    if execucao.resultado is not None:
+        return _repeticao(execucao)
+
+    info = None
+    antes_p = jogo.periodo_atual
+    antes_dec = jogo.status_decisoes_disponiveis
+    for _ in range(settings.SIMULACAO_TENTATIVAS_CONFLITO):
+        try:
+            with transaction.atomic():
+                info = _FUNCS[acao](jogo, execucao)
+            break
+        except ConflitoDeVersao:
+            # Outro processo mudou o jogo: desfaz os logs desta tentativa e relê o estado
+            jogo.refresh_from_db(fields=["periodo_atual", "status_decisoes_disponiveis", "versao"])
+            antes_p = jogo.periodo_atual
+            antes_dec = jogo.status_decisoes_disponiveis
+
+    if info is None:
+        # Não grava o resultado: repetir o mesmo lote tenta de novo em vez de devolver o conflito
+        return _resultado(jogo, acao, lote, antes_p, antes_dec, {
+            "erro": "Conflito: o jogo foi alterado por outra simulação ao mesmo tempo. Tente novamente.",
+            "logs": 0,
+            "periodo_final": jogo.periodo_atual,
+            "decisoes": jogo.status_decisoes_disponiveis,
+        })
+    resultado = _resultado(jogo, acao, lote, antes_p, antes_dec, info)
+
+    execucao.resultado = resultado
+    execucao.save(update_fields=["resultado"])
+    return resultado
+
+
+def _processar_jogo_isolado(jogo, acao, lote, user):
+    """
+    Processa o jogo num savepoint próprio. Se a ação falhar, só o que foi
+    gravado para este jogo é desfeito e o erro volta no resultado.
+    """
+    antes_p = jogo.periodo_atual
+    antes_dec = jogo.status_decisoes_disponiveis
+    antes_versao = jogo.versao
+    try:
+        with transaction.atomic():
+            return _processar_jogo(jogo, acao, lote, user)
+    except Exception as exc:
+        logger.exception("Falha ao simular o jogo %s no lote %s", jogo.id, lote)
+        jogo.periodo_atual = antes_p
+        jogo.status_decisoes_disponiveis = antes_dec
+        jogo.versao = antes_versao
+        return _resultado(jogo, acao, lote, antes_p, antes_dec, {
+            "erro": f"Falha ao simular: {exc}",
+            "logs": 0,
+            "periodo_final": antes_p,
+            "decisoes": antes_dec,
+        })
+
+
 @transaction.atomic
-def processar_lista(jogos_ids, acao, user=None, lote_id=None):
+def processar_lista(jogos_ids, acao, user=None, lote_id=None, ao_processar_jogo=None):
+    """
+    Aplica `acao` a cada jogo da lista, tudo numa única transação.
+    Jogos cuja execução neste lote já foi concluída devolvem o resultado
+    gravado, sem executar a ação de novo (reenvios são idempotentes).
+    Se informado, `ao_processar_jogo(resultado)` é chamado após cada jogo
+    (usado para publicar o progresso de lotes em segundo plano).
+    """
     if acao not in ACOES:
         raise ValueError("acao invalida")
 
@@ -200,29 +390,248 @@ def processar_lista(jogos_ids, acao, user=None, lote_id=None):
     )
 
     for jogo in jogos:
-        execucao = _criar_execucao(jogo, acao, lote, user)
-
-        antes_p = jogo.periodo_atual
-        antes_dec = jogo.status_decisoes_disponiveis
-
-        info = _FUNCS[acao](jogo, execucao)
-
-        resultados.append(
-            {
-                "jogo_id": jogo.id,
-                "cod": jogo.cod,
-                "nome": jogo.nome,
-                "acao": acao,
-                "lote_id": lote,
-                "periodo_antes": antes_p,
-                "periodo_depois": info["periodo_final"],
-                "decisoes_antes": antes_dec,
-                "decisoes_depois": info["decisoes"],
-                "logs_criados": info["logs"],
-                "erro": info.get("erro", ""),
-            }
-        )
+        resultado = _processar_jogo(jogo, acao, lote, user)
+        resultados.append(resultado)
+        if ao_processar_jogo:
+            ao_processar_jogo(resultado)
+
+    return {"lote_id": lote, "resultados": resultados}
+
 
+def _resultado_disputado(jogo, acao, lote):
+    info = {
+        "erro": "Jogo em uso por outra simulação; tente novamente mais tarde.",
+        "logs": 0,
+        "periodo_final": jogo.periodo_atual,
+        "decisoes": jogo.status_decisoes_disponiveis,
+    }
+    resultado = _resultado(jogo, acao, lote, jogo.periodo_atual, jogo.status_decisoes_disponiveis, info)
+    resultado["disputado"] = True
+    return resultado
+
+
+def processar_lista_por_jogo(jogos_ids, acao, user=None, lote_id=None,
+                             tamanho_bloco=None, ao_processar_jogo=None):
+    """
+    Como processar_lista, mas cada bloco de `tamanho_bloco` jogos é travado
+    e commitado na sua própria transação, e cada jogo roda num savepoint.
+    Um jogo com erro é desfeito e registrado no resultado sem derrubar os
+    demais, e as travas nunca ficam presas por mais de um bloco.
+
+    Os jogos são reivindicados com SKIP LOCKED: os que estão travados por
+    outro lote ficam para a passada seguinte, em vez de fazer este worker
+    esperar. Os que continuarem travados após SIMULACAO_PASSADAS_DISPUTA
+    passadas voltam no resultado com "disputado": True.
+    """
+    if acao not in ACOES:
+        raise ValueError("acao invalida")
+
+    lote = lote_id or gerar_lote_id()
+    tamanho_bloco = max(1, tamanho_bloco or settings.SIMULACAO_TAMANHO_BLOCO)
+    pendentes = list(
+        Jogo.objects.filter(id__in=jogos_ids).order_by("id").values_list("id", flat=True)
+    )
+    resultados = []
+
+    for passada in range(settings.SIMULACAO_PASSADAS_DISPUTA):
+        if passada:
+            time.sleep(settings.SIMULACAO_ESPERA_DISPUTA * passada)
+
+        adiados = []
+        for inicio in range(0, len(pendentes), tamanho_bloco):
+            bloco = pendentes[inicio:inicio + tamanho_bloco]
+            with transaction.atomic():
+                jogos = list(
+                    Jogo.objects.select_for_update(skip_locked=True, of=("self",))
+                    .filter(id__in=bloco)
+                    .select_related("cenario")
+                    .order_by("id")
+                )
+                reivindicados = {jogo.id for jogo in jogos}
+                adiados.extend(jogo_id for jogo_id in bloco if jogo_id not in reivindicados)
+                resultados_bloco = [_processar_jogo_isolado(jogo, acao, lote, user) for jogo in jogos]
+
+            # Só publica depois do commit, para o progresso refletir o que foi gravado
+            resultados.extend(resultados_bloco)
+            if ao_processar_jogo:
+                for resultado in resultados_bloco:
+                    ao_processar_jogo(resultado)
+
+        pendentes = adiados
+        if not pendentes:
+            break
+
+    if pendentes:
+        logger.warning("Lote %s: %d jogo(s) continuaram travados", lote, len(pendentes))
+        disputados = [_resultado_disputado(jogo, acao, lote) for jogo in Jogo.objects.filter(id__in=pendentes)]
+        resultados.extend(disputados)
+        if ao_processar_jogo:
+            for resultado in disputados:
+                ao_processar_jogo(resultado)
+
+    resultados.sort(key=lambda r: r["jogo_id"])
     return {"lote_id": lote, "resultados": resultados}
 
 
+def dividir_em_fatias(jogos_ids, quantidade):
+    """
+    Distribui os ids (em ordem) entre até `quantidade` fatias, alternando
+    jogo a jogo para que todas recebam uma carga parecida.
+    """
+    ids = sorted(set(jogos_ids))
+    quantidade = max(1, min(quantidade, len(ids)))
+    return [ids[i::quantidade] for i in range(quantidade)]
+
+
+def juntar_resultados(lote_id, resultados_fatias):
+    """Monta, a partir das fatias, o mesmo payload de processar_lista."""
+    resultados = [r for fatia in resultados_fatias for r in fatia]
+    resultados.sort(key=lambda r: r["jogo_id"])
+    return {"lote_id": lote_id, "resultados": resultados}
+
+
+def _transicao(acao, periodo, decisoes):
+    """
+    Estado após aplicar uma ação de ACOES_VETORIZADAS, espelhando as _acao_*.
+    Devolve (periodo, decisoes, passo, erro); passo é (de, para) ou None.
+    """
+    if acao == SimulacaoPeriodo.LPD:
+        return periodo, True, (periodo, periodo), ""
+    if acao == SimulacaoPeriodo.SPN:
+        if not decisoes:
+            return periodo, decisoes, None, "Você deve liberar o período primeiro."
+        return periodo + 1, True, (periodo, periodo + 1), ""
+    novo = max(0, periodo - 1)
+    return novo, decisoes, (periodo, novo), ""
+
+
+def _atualizar_jogos_em_massa(acao, ids):
+    """
+    UPDATE condicional equivalente à ação, para todos os jogos de uma vez.
+    Os jogos já estão travados; a versao sobe para invalidar leituras alheias.
+    """
+    alvo = Jogo.objects.filter(id__in=ids)
+    if acao == SimulacaoPeriodo.LPD:
+        alvo.filter(status_decisoes_disponiveis=False).update(
+            status_decisoes_disponiveis=True, versao=F("versao") + 1,
+        )
+    elif acao == SimulacaoPeriodo.SPN:
+        alvo.filter(status_decisoes_disponiveis=True).update(
+            periodo_atual=F("periodo_atual") + 1, versao=F("versao") + 1,
+        )
+    elif acao == SimulacaoPeriodo.CAD:
+        alvo.filter(periodo_atual__gt=0).update(
+            periodo_atual=F("periodo_atual") - 1, versao=F("versao") + 1,
+        )
+
+
+def _criar_execucoes_em_massa(ids, acao, lote, execucoes):
+    """
+    Versão em lote de _criar_execucao. `execucoes` são as já existentes
+    ({jogo_id: execucao}); devolve o mesmo dict completo.
+    """
+    divergentes = [e for e in execucoes.values() if e.acao != acao]
+    if divergentes:
+        SimulacaoExecucao.objects.filter(pk__in=[e.pk for e in divergentes]).update(acao=acao, resultado=None)
+        for e in divergentes:
+            e.acao, e.resultado = acao, None
+
+    novas = SimulacaoExecucao.objects.bulk_create([
+        SimulacaoExecucao(jogo_id=jogo_id, acao=acao, lote_id=lote)
+        for jogo_id in ids if jogo_id not in execucoes
+    ])
+    execucoes.update({e.jogo_id: e for e in novas})
+    return execucoes
+
+
+@transaction.atomic
+def processar_lista_vetorizada(jogos_ids, acao, user=None, lote_id=None):
+    """
+    Aplica uma ação de ACOES_VETORIZADAS a todos os jogos com um número fixo
+    de consultas: trava e lê o estado, faz um UPDATE condicional, cria as
+    execuções e grava todos os logs com um bulk_create. O relatório é o
+    mesmo de processar_lista, inclusive no reaproveitamento de lotes concluídos.
+    """
+    if acao not in ACOES_VETORIZADAS:
+        raise ValueError("acao nao vetorizavel")
+
+    lote = lote_id or gerar_lote_id()
+    jogos = list(
+        Jogo.objects.select_for_update()
+        .filter(id__in=jogos_ids)
+        .order_by("id")
+        .values("id", "cod", "nome", "periodo_atual", "status_decisoes_disponiveis")
+    )
+    if not jogos:
+        return {"lote_id": lote, "resultados": []}
+
+    existentes = {
+        e.jogo_id: e
+        for e in SimulacaoExecucao.objects.filter(lote_id=lote, jogo_id__in=[j["id"] for j in jogos])
+    }
+    concluidas = {
+        jogo_id: e for jogo_id, e in existentes.items()
+        if e.acao == acao and e.resultado is not None
+    }
+    jogos_concluidos = [j for j in jogos if j["id"] in concluidas]
+    jogos = [j for j in jogos if j["id"] not in concluidas]
+
+    ids = [j["id"] for j in jogos]
+    _atualizar_jogos_em_massa(acao, ids)
+    execucoes = _criar_execucoes_em_massa(ids, acao, lote, existentes)
+
+    transicoes = {
+        j["id"]: _transicao(acao, j["periodo_atual"], j["status_decisoes_disponiveis"])
+        for j in jogos
+    }
+    # O motor roda uma vez para todos os jogos que mudaram de período
+    if acao == SimulacaoPeriodo.SPN:
+        motor.simular_jogos({
+            j["id"]: (j["periodo_atual"], transicoes[j["id"]][0])
+            for j in jogos if transicoes[j["id"]][2] is not None
+        })
+    elif acao == SimulacaoPeriodo.CAD:
+        motor.descartar({
+            j["id"]: transicoes[j["id"]][0]
+            for j in jogos if transicoes[j["id"]][0] != j["periodo_atual"]
+        })
+    com_passo = [jogo_id for jogo_id in ids if transicoes[jogo_id][2] is not None]
+    steps = _reservar_um_step_por_execucao([execucoes[jogo_id].pk for jogo_id in com_passo])
+    SimulacaoPeriodo.objects.bulk_create([
+        SimulacaoPeriodo(
+            execucao=execucoes[jogo_id],
+            jogo_id=jogo_id,
+            lote_id=lote,
+            acao=acao,
+            periodo_de=transicoes[jogo_id][2][0],
+            periodo_para=transicoes[jogo_id][2][1],
+            step_index=steps[execucoes[jogo_id].pk],
+        )
+        for jogo_id in com_passo
+    ])
+
+    resultados = []
+    for j in jogos:
+        periodo, decisoes, passo, erro = transicoes[j["id"]]
+        resultados.append({
+            "jogo_id": j["id"],
+            "cod": j["cod"],
+            "nome": j["nome"],
+            "acao": acao,
+            "lote_id": lote,
+            "periodo_antes": j["periodo_atual"],
+            "periodo_depois": periodo,
+            "decisoes_antes": j["status_decisoes_disponiveis"],
+            "decisoes_depois": decisoes,
+            "logs_criados": 1 if passo else 0,
+            "erro": erro,
+            "repetido": False,
+        })
+
+    for r in resultados:
+        execucoes[r["jogo_id"]].resultado = r
+    SimulacaoExecucao.objects.bulk_update([execucoes[jogo_id] for jogo_id in ids], ["resultado"])
+
+    resultados.extend(_repeticao(concluidas[j["id"]]) for j in jogos_concluidos)
+    resultados.sort(key=lambda r: r["jogo_id"])
+    return {"lote_id": lote, "resultados": resultados}
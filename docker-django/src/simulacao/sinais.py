@@ -0,0 +1,47 @@
+"""
+Troca a versao_compilacao dos cenários afetados sempre que um cenário,
+produto ou insumo muda, invalidando o cenário compilado em cache
+(simulacao.cenario_compilado). A troca é um UPDATE na mesma transação
+da alteração: se ela for desfeita, a versão antiga continua valendo.
+"""
+from django.db.models.signals import m2m_changed, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from cenarios.models import Cenario, Insumo, Produto, nova_versao_compilacao
+
+
+def _renovar(cenarios):
+    cenarios.update(versao_compilacao=nova_versao_compilacao())
+
+
+@receiver(pre_save, sender=Cenario)
+def cenario_alterado(sender, instance, **kwargs):
+    instance.versao_compilacao = nova_versao_compilacao()
+
+
+@receiver(post_save, sender=Produto)
+def produto_alterado(sender, instance, created, **kwargs):
+    if not created:
+        _renovar(Cenario.objects.filter(produto=instance))
+
+
+@receiver(post_save, sender=Insumo)
+@receiver(pre_delete, sender=Insumo)
+def insumo_alterado(sender, instance, **kwargs):
+    # pre_delete: depois da exclusão o insumo já não aparece nos produtos
+    _renovar(Cenario.objects.filter(produto__insumos=instance))
+
+
+@receiver(m2m_changed, sender=Produto.insumos.through)
+def insumos_do_produto_alterados(sender, instance, action, reverse, pk_set, **kwargs):
+    # reverse=True: a alteração foi feita pelo lado do insumo (insumo.produtos)
+    if action in ("post_add", "post_remove"):
+        cenarios = Cenario.objects.filter(produto__in=pk_set) if reverse else Cenario.objects.filter(produto=instance)
+    elif action == "post_clear" and not reverse:
+        cenarios = Cenario.objects.filter(produto=instance)
+    elif action == "pre_clear" and reverse:
+        # Os produtos do insumo só são conhecidos antes de limpar
+        cenarios = Cenario.objects.filter(produto__insumos=instance)
+    else:
+        return
+    _renovar(cenarios)
@@ -0,0 +1,89 @@
+import logging
+from functools import partial
+
+from celery import chord
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from mydjango.celery import app
+
+from . import particoes, progresso, resumo
+from .services import processar_lista_por_jogo, gerar_lote_id, dividir_em_fatias, juntar_resultados
+
+logger = logging.getLogger("celery")
+
+
+def _usuario(user_id):
+    return get_user_model().objects.filter(pk=user_id).first() if user_id else None
+
+
+def _processar(jogos_ids, acao, user_id, lote_id):
+    try:
+        return processar_lista_por_jogo(
+            jogos_ids=jogos_ids,
+            acao=acao,
+            user=_usuario(user_id),
+            lote_id=lote_id,
+            ao_processar_jogo=partial(progresso.registrar_resultado, lote_id),
+        )
+    except Exception as exc:
+        logger.exception("Falha ao processar o lote %s", lote_id)
+        progresso.finalizar(lote_id, progresso.ERRO, erro=str(exc))
+        raise
+
+
+@app.task
+def processar_lote(jogos_ids, acao, user_id=None, lote_id=None):
+    progresso.marcar_executando(lote_id)
+    res = _processar(jogos_ids, acao, user_id, lote_id)
+    progresso.finalizar(lote_id, progresso.CONCLUIDO)
+    return res
+
+
+@app.task
+def processar_fatia(jogos_ids, acao, user_id=None, lote_id=None):
+    """Uma fatia do lote; cada worker usa a própria conexão e trava só os seus jogos."""
+    return _processar(jogos_ids, acao, user_id, lote_id)["resultados"]
+
+
+@app.task
+def consolidar_lote(resultados_fatias, lote_id):
+    res = juntar_resultados(lote_id, resultados_fatias)
+    progresso.finalizar(lote_id, progresso.CONCLUIDO)
+    return res
+
+
+def enfileirar_lote(jogos_ids, acao, user=None, lote_id=None, fatias=None):
+    """
+    Registra o lote no Redis e o envia para os workers do Celery.
+    Com mais de uma fatia, os jogos são divididos entre tarefas paralelas e
+    consolidar_lote junta os resultados ao final (chord).
+    Retorna o lote_id imediatamente; o andamento é lido com progresso.ler().
+    Um lote que já foi enfileirado não é enviado de novo.
+    """
+    lote = lote_id or gerar_lote_id()
+    user_id = user.pk if user else None
+    if not progresso.iniciar(lote, acao, jogos_ids):
+        # Reenvio de um lote já enfileirado: acompanha a execução existente
+        return lote
+
+    partes = dividir_em_fatias(jogos_ids, fatias or settings.SIMULACAO_FATIAS_PARALELAS)
+    if len(partes) <= 1:
+        processar_lote.delay(list(jogos_ids), acao, user_id=user_id, lote_id=lote)
+        return lote
+
+    progresso.marcar_executando(lote)
+    chord(
+        processar_fatia.s(parte, acao, user_id=user_id, lote_id=lote)
+        for parte in partes
+    )(consolidar_lote.s(lote_id=lote))
+    return lote
+
+
+@app.task
+def manter_particoes():
+    return particoes.manter()
+
+
+@app.task
+def atualizar_resumo():
+    return resumo.atualizar_resumo()
@@ -1,9 +1,39 @@
-from django.test import TestCase
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.models import F, Max, Sum
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
+
+import numpy as np
 
 from jogos.models import Jogo
+from jogo_empresa.models import Empresa
 from cenarios.models import Insumo, Produto, Cenario
-from simulacao.models import SimulacaoPeriodo, SimulacaoExecucao
+from simulacao.models import (
+    DecisaoEmpresa, EstadoPeriodo, ResultadoEmpresa, SimulacaoPeriodo, SimulacaoExecucao, SimulacaoResumoDiario,
+)
+from simulacao import arquivo, cenario_compilado, fluxo_caixa, motor, particoes, services
+from simulacao.resumo import atualizar_resumo
+from simulacao.services import (
+    processar_lista, processar_lista_por_jogo, processar_lista_vetorizada,
+    gerar_lote_id, dividir_em_fatias,
+)
+from simulacao.tasks import enfileirar_lote
+from simulacao.views import HistoricoView
+from mydjango.celery import app as celery_app
 
 
 def ativo_value():
@@ -15,17 +45,34 @@ def inativo_value():
     return "I" if val != "I" else "X"
 
 
-def bootstrap_cenario(nome_cenario="Cenário Teste"):
+def criar_mediador(username="mediador"):
+    return get_user_model().objects.create_user(
+        username=username,
+        email=f"{username}@teste.com",
+        password="senha-forte-123",
+        cpf=username[:14],
+    )
+
+
+def entrar_como_mediador(client, username="mediador_logado"):
+    usuario = criar_mediador(username)
+    usuario.groups.add(Group.objects.get_or_create(name="Mediador")[0])
+    client.force_login(usuario)
+    return usuario
+
+
+def bootstrap_cenario(nome_cenario="Cenário Teste", criador=None):
     """
     Cria a cadeia mínima válida para Cenário:
     - 1 Insumo
     - 1 Produto (com o insumo)
     - 1 Cenário (com o produto)
     """
-    insumo = Insumo.objects.create(nome="Insumo Base", fornecedor="Fornecedor X")
-    produto = Produto.objects.create(nome="Produto Teste")
+    criador = criador or criar_mediador(f"med_{Cenario.objects.count()}")
+    insumo = Insumo.objects.create(nome="Insumo Base", fornecedor="Fornecedor X", criador=criador)
+    produto = Produto.objects.create(nome="Produto Teste", criador=criador)
     produto.insumos.set([insumo])
-    return Cenario.objects.create(nome=nome_cenario, produto=produto)
+    return Cenario.objects.create(nome=nome_cenario, produto=produto, criador=criador)
 
 
 class SimulacaoViewTests(TestCase):
@@ -39,8 +86,10 @@ class SimulacaoViewTests(TestCase):
             cod="JATV",
             status=ativo_value(),
             periodo_atual=0,
-            status_decisoes_disponiveis=False,
+            # SPA só simula período liberado, com ou sem decisões automáticas
+            status_decisoes_disponiveis=True,
             cenario=cls.cen,
+            criador=cls.cen.criador,
         )
         cls.j_inativo = Jogo.objects.create(
             nome="Jogo Inativo",
@@ -49,6 +98,7 @@ class SimulacaoViewTests(TestCase):
             periodo_atual=0,
             status_decisoes_disponiveis=False,
             cenario=cls.cen,
+            criador=cls.cen.criador,
         )
 
     def test_get_simular_default_mostra_apenas_ativos_no_form(self):
@@ -115,6 +165,32 @@ class SimulacaoViewTests(TestCase):
         self.assertEqual(SimulacaoExecucao.objects.count(), 1)
         self.assertGreaterEqual(SimulacaoPeriodo.objects.count(), 1)
 
+    def test_forcar_decisoes_nao_simula_periodo_fechado(self):
+        Jogo.objects.filter(pk=self.j_ativo.pk).update(status_decisoes_disponiveis=False)
+        url = reverse("simulacao:simular")
+        form = self.client.get(url).context["form"]
+
+        data = {
+            "acao": SimulacaoPeriodo.SPA,
+            "forcar_decisoes_automaticas": "on",
+            "request_id": "",
+            "status": form.initial.get("status", ""),
+            "q": form.initial.get("q", ""),
+            "jogos": [str(self.j_ativo.id)],
+        }
+        resp = self.client.post(url, data)
+        self.assertEqual(resp.status_code, 200)
+
+        linha, = resp.context["linhas"]
+        self.assertFalse(linha["ok"])
+        self.assertEqual(linha["mensagem"], "Você deve liberar o período primeiro.")
+        self.assertContains(resp, "Você deve liberar o período primeiro.")
+
+        jogo = Jogo.objects.get(pk=self.j_ativo.pk)
+        self.assertEqual((jogo.periodo_atual, jogo.status_decisoes_disponiveis), (0, False))
+        self.assertFalse(SimulacaoPeriodo.objects.exists())
+        self.assertFalse(ResultadoEmpresa.objects.exists())
+
     def test_request_id_invalido_hex(self):
         url = reverse("simulacao:simular")
         get_resp = self.client.get(url)
@@ -163,11 +239,13 @@ class HistoricoViewTests(TestCase):
 
         cls.j1 = Jogo.objects.create(
             nome="Jogo H1", cod="H1", status=ativo_value(),
-            periodo_atual=0, status_decisoes_disponiveis=False, cenario=cls.cen
+            periodo_atual=0, status_decisoes_disponiveis=False, cenario=cls.cen,
+            criador=cls.cen.criador,
         )
         cls.j2 = Jogo.objects.create(
             nome="Jogo H2", cod="H2", status=ativo_value(),
-            periodo_atual=0, status_decisoes_disponiveis=False, cenario=cls.cen
+            periodo_atual=0, status_decisoes_disponiveis=False, cenario=cls.cen,
+            criador=cls.cen.criador,
         )
 
         e1 = SimulacaoExecucao.objects.create(
@@ -186,35 +264,1174 @@ class HistoricoViewTests(TestCase):
             periodo_de=0, periodo_para=1, step_index=0
         )
 
+    def setUp(self):
+        # O histórico e os endpoints que a página consulta são só de mediadores
+        entrar_como_mediador(self.client)
+
+    def test_historico_exige_mediador(self):
+        self.client.logout()
+        urls = [
+            reverse("simulacao:historico"),
+            reverse("simulacao:execucao_passos", args=[SimulacaoExecucao.objects.first().pk]),
+        ]
+        for url in urls:
+            self.assertEqual(self.client.get(url).status_code, 302)
+
+        self.client.force_login(criar_mediador("sem_grupo"))
+        for url in urls:
+            self.assertEqual(self.client.get(url).status_code, 403)
+
     def test_historico_sem_filtro_lista_tudo(self):
         url = reverse("simulacao:historico")
         resp = self.client.get(url)
         self.assertEqual(resp.status_code, 200)
-        page_obj = resp.context["page_obj"]
-        self.assertEqual(page_obj.paginator.count, 2)
+        pagina = resp.context["pagina"]
+        self.assertEqual(len(pagina), 2)
+        self.assertFalse(pagina.has_next)
+
+    def test_historico_expande_faixa_compactada(self):
+        execucao = SimulacaoExecucao.objects.create(
+            jogo=self.j2, acao=SimulacaoPeriodo.RND, lote_id="ffffffffffffffff"
+        )
+        SimulacaoPeriodo.objects.create(
+            execucao=execucao, jogo=self.j2, acao=SimulacaoPeriodo.RND,
+            periodo_de=0, periodo_para=3, passos=3, step_index=0
+        )
+        resp = self.client.get(reverse("simulacao:historico"), {"lote": "ffffffffffffffff"})
+        self.assertContains(resp, "(3 passos)")
+        self.assertContains(resp, "0 → 1, 1 → 2, 2 → 3")
+
+    def test_historico_agrupado_por_execucao(self):
+        jogo = Jogo.objects.create(
+            nome="Jogo H3", cod="H3", status=ativo_value(),
+            periodo_atual=5, status_decisoes_disponiveis=False,
+            cenario=self.cen, criador=self.cen.criador,
+        )
+        processar_lista([jogo.id], SimulacaoPeriodo.RSD, lote_id="gggggggggggggggg")
+
+        url = reverse("simulacao:historico")
+        resp = self.client.get(url, {"agrupar": "execucao", "jogo": str(jogo.id)})
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.context["agrupar"])
+        (execucao,) = resp.context["pagina"]
+        self.assertEqual(
+            (execucao.logs, execucao.passos, execucao.periodo_min, execucao.periodo_max), (3, 7, 0, 6)
+        )
+
+        url_passos = reverse("simulacao:execucao_passos", args=[execucao.pk])
+        passos = self.client.get(url_passos).json()["passos"]
+        self.assertEqual(len(passos), 7)
+        self.assertEqual((passos[0]["de"], passos[-1]["para"]), (0, 6))
+
+    def test_historico_agrupado_totaliza_so_a_pagina(self):
+        jogo = Jogo.objects.create(
+            nome="Jogo H4", cod="H4", status=ativo_value(),
+            periodo_atual=3, status_decisoes_disponiveis=False,
+            cenario=self.cen, criador=self.cen.criador,
+        )
+        for lote in ("1111111111111111", "2222222222222222", "3333333333333333"):
+            processar_lista([jogo.id], SimulacaoPeriodo.R0D, lote_id=lote)
+
+        url = reverse("simulacao:historico")
+        params = {"agrupar": "execucao", "jogo": str(jogo.id)}
+        with mock.patch.object(HistoricoView, "por_pagina", 2), \
+                CaptureQueriesContext(connection) as ctx:
+            pagina = self.client.get(url, params).context["pagina"]
+            seguinte = self.client.get(url, dict(params, apos=pagina.cursor_proximo)).context["pagina"]
+
+        self.assertEqual([len(pagina), len(seguinte)], [2, 1])
+        for execucao in list(pagina) + list(seguinte):
+            self.assertEqual((execucao.logs, execucao.passos, execucao.periodo_max), (1, 3, 3))
+        # O GROUP BY sobre os logs vem depois da página, filtrado pelas execuções dela
+        agregacoes = [q["sql"] for q in ctx.captured_queries if "GROUP BY" in q["sql"]]
+        self.assertEqual(len(agregacoes), 2)
+        for sql in agregacoes:
+            self.assertNotIn("LIMIT", sql)
+            self.assertIn('"execucao_id" IN', sql)
+
+    def test_historico_filtra_por_intervalo_de_datas(self):
+        ontem = timezone.now() - timezone.timedelta(days=1)
+        SimulacaoPeriodo.objects.filter(jogo=self.j1).update(requested_at=ontem)
+        dia = timezone.localdate(ontem).isoformat()
+
+        url = reverse("simulacao:historico")
+        pagina = self.client.get(url, {"de": dia, "ate": dia}).context["pagina"]
+        self.assertEqual([p.jogo_id for p in pagina], [self.j1.id])
+
+        pagina = self.client.get(url, {"de": timezone.localdate().isoformat()}).context["pagina"]
+        self.assertEqual([p.jogo_id for p in pagina], [self.j2.id])
+
+        resp = self.client.get(url, {"de": "ontem"})
+        self.assertEqual(len(resp.context["pagina"]), 2)
+        self.assertEqual(resp.context["de"], "")
 
     def test_historico_filtra_por_acao(self):
         url = reverse("simulacao:historico")
         resp = self.client.get(url, {"acao": SimulacaoPeriodo.SPA})
         self.assertEqual(resp.status_code, 200)
-        page_obj = resp.context["page_obj"]
-        self.assertEqual(page_obj.paginator.count, 1)
-        obj = page_obj.object_list[0]  # lista
+        pagina = resp.context["pagina"]
+        self.assertEqual(len(pagina), 1)
+        obj = pagina.object_list[0]  # lista
         self.assertEqual(obj.acao, SimulacaoPeriodo.SPA)
 
     def test_historico_filtra_por_jogo(self):
         url = reverse("simulacao:historico")
         resp = self.client.get(url, {"jogo": str(self.j2.id)})
         self.assertEqual(resp.status_code, 200)
-        page_obj = resp.context["page_obj"]
-        self.assertEqual(page_obj.paginator.count, 1)
-        self.assertEqual(page_obj.object_list[0].jogo_id, self.j2.id)
+        pagina = resp.context["pagina"]
+        self.assertEqual(len(pagina), 1)
+        self.assertEqual(pagina.object_list[0].jogo_id, self.j2.id)
 
     def test_historico_filtra_por_lote(self):
         url = reverse("simulacao:historico")
         resp = self.client.get(url, {"lote": "aaaaaaaaaaaaaaaa"})
         self.assertEqual(resp.status_code, 200)
-        page_obj = resp.context["page_obj"]
-        self.assertEqual(page_obj.paginator.count, 1)
+        pagina = resp.context["pagina"]
+        self.assertEqual(len(pagina), 1)
+
+        self.assertEqual(pagina.object_list[0].lote_id, "aaaaaaaaaaaaaaaa")
+
+    def test_exportar_exige_mediador(self):
+        self.client.logout()
+        url = reverse("simulacao:historico_exportar")
+        resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 302)
+        self.assertFalse(resp.streaming)
+
+        self.client.force_login(criar_mediador("sem_grupo"))
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+    def test_exportar_csv_respeita_filtros(self):
+        url = reverse("simulacao:historico_exportar")
+        resp = self.client.get(url, {"acao": SimulacaoPeriodo.R0D})
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.streaming)
+
+        linhas = b"".join(resp.streaming_content).decode().splitlines()
+        self.assertEqual(linhas[0].split(",")[:4], ["quando", "jogo_cod", "jogo_nome", "acao"])
+        self.assertEqual(len(linhas), 2)
+        self.assertIn("bbbbbbbbbbbbbbbb", linhas[1])
+
+    def test_exportar_ndjson(self):
+        url = reverse("simulacao:historico_exportar")
+        resp = self.client.get(url, {"formato": "ndjson"})
+        registros = [json.loads(l) for l in b"".join(resp.streaming_content).decode().splitlines()]
+        self.assertEqual(len(registros), 2)
+        self.assertEqual({r["lote"] for r in registros}, {"aaaaaaaaaaaaaaaa", "bbbbbbbbbbbbbbbb"})
+
+    def test_historico_navega_por_cursor_sem_repetir_nem_pular(self):
+        execucao = SimulacaoExecucao.objects.create(
+            jogo=self.j1, acao=SimulacaoPeriodo.R0D, lote_id="cccccccccccccccc"
+        )
+        SimulacaoPeriodo.objects.bulk_create([
+            SimulacaoPeriodo(execucao=execucao, jogo=self.j1, acao=SimulacaoPeriodo.R0D,
+                             periodo_de=k, periodo_para=k + 1, step_index=k)
+            for k in range(43)
+        ])
+        url = reverse("simulacao:historico")
+        esperado = list(
+            SimulacaoPeriodo.objects.order_by("-requested_at", "-id").values_list("id", flat=True)
+        )
+
+        vistos, params, paginas = [], {}, []
+        while True:
+            pagina = self.client.get(url, params).context["pagina"]
+            paginas.append(pagina)
+            vistos.extend(p.id for p in pagina)
+            if not pagina.has_next:
+                break
+            params = {"apos": pagina.cursor_proximo}
+        self.assertEqual(vistos, esperado)
+        self.assertEqual([len(p) for p in paginas], [20, 20, 5])
+
+        anterior = self.client.get(url, {"antes": paginas[-1].cursor_anterior}).context["pagina"]
+        self.assertEqual([p.id for p in anterior], [p.id for p in paginas[1]])
+        self.assertTrue(anterior.has_previous)
+
+
+class ProcessarListaReplayTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.cen = bootstrap_cenario("Cenário R")
+
+    def _jogo(self, cod, periodo):
+        return Jogo.objects.create(
+            nome=f"Jogo {cod}", cod=cod, status=ativo_value(),
+            periodo_atual=periodo, status_decisoes_disponiveis=False,
+            cenario=self.cen, criador=self.cen.criador,
+        )
+
+    def _queries(self, jogo, acao):
+        with CaptureQueriesContext(connection) as ctx:
+            processar_lista([jogo.id], acao, lote_id=gerar_lote_id())
+        return len(ctx.captured_queries)
+
+    def test_r0d_grava_o_reprocessamento_como_uma_faixa(self):
+        jogo = self._jogo("R0D5", 5)
+        res = processar_lista([jogo.id], SimulacaoPeriodo.R0D, lote_id="cccccccccccccccc")
+
+        faixa = SimulacaoPeriodo.objects.get(jogo=jogo)
+        self.assertEqual((faixa.step_index, faixa.periodo_de, faixa.periodo_para, faixa.passos), (0, 0, 5, 5))
+        self.assertEqual(list(faixa.expandir()), [(k, k + 1) for k in range(5)])
+        self.assertIn("[5 passos]", str(faixa))
+        self.assertEqual(res["resultados"][0]["logs_criados"], 5)
+
+    def test_rsd_termina_no_proximo_periodo_com_decisoes_liberadas(self):
+        jogo = self._jogo("RSD3", 3)
+        res = processar_lista([jogo.id], SimulacaoPeriodo.RSD, lote_id="dddddddddddddddd")
+
+        jogo.refresh_from_db()
+        self.assertEqual(jogo.periodo_atual, 4)
+        self.assertTrue(jogo.status_decisoes_disponiveis)
+        self.assertEqual(res["resultados"][0]["logs_criados"], 5)
+        acoes = list(
+            SimulacaoPeriodo.objects.filter(jogo=jogo)
+            .order_by("step_index")
+            .values_list("acao", flat=True)
+        )
+        self.assertEqual(acoes, [SimulacaoPeriodo.R0D, SimulacaoPeriodo.SPN, SimulacaoPeriodo.LPD])
+
+    def test_mesmo_lote_continua_o_contador_de_steps(self):
+        jogo = self._jogo("LOTE2", 0)
+        processar_lista([jogo.id], SimulacaoPeriodo.LPD, lote_id="eeeeeeeeeeeeeeee")
+        processar_lista([jogo.id], SimulacaoPeriodo.RND, lote_id="eeeeeeeeeeeeeeee")
+
+        execucao = SimulacaoExecucao.objects.get(jogo=jogo, lote_id="eeeeeeeeeeeeeeee")
+        steps = list(execucao.periodos.order_by("step_index").values_list("step_index", flat=True))
+        self.assertEqual(steps, [0, 1])
+        self.assertEqual(execucao.proximo_step, 2)
+
+    def test_logs_herdam_o_lote_da_execucao(self):
+        jogo = self._jogo("LOTE3", 2)
+        processar_lista([jogo.id], SimulacaoPeriodo.RSD, lote_id="abababababababab")
+        processar_lista_vetorizada([jogo.id], SimulacaoPeriodo.LPD, lote_id="cdcdcdcdcdcdcdcd")
+
+        lotes = set(SimulacaoPeriodo.objects.filter(jogo=jogo).values_list("lote_id", flat=True))
+        self.assertEqual(lotes, {"abababababababab", "cdcdcdcdcdcdcdcd"})
+
+    def test_replay_tem_custo_fixo_de_queries(self):
+        for acao in (SimulacaoPeriodo.R0D, SimulacaoPeriodo.RND, SimulacaoPeriodo.RSD):
+            with self.subTest(acao=acao):
+                curto = self._jogo(f"{acao}C", 1)
+                longo = self._jogo(f"{acao}L", 40)
+                self.assertEqual(self._queries(curto, acao), self._queries(longo, acao))
+
+
+class LoteAssincronoTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.cen = bootstrap_cenario("Cenário A")
+        cls.jogo = Jogo.objects.create(
+            nome="Jogo Async", cod="ASYNC", status=ativo_value(),
+            periodo_atual=0, status_decisoes_disponiveis=False,
+            cenario=cls.cen, criador=cls.cen.criador,
+        )
+
+    @mock.patch("simulacao.views.enfileirar_lote")
+    def test_post_assincrono_enfileira_e_nao_processa(self, enfileirar):
+        url = reverse("simulacao:simular")
+        resp = self.client.post(url, {
+            "acao": SimulacaoPeriodo.LPD,
+            "assincrono": "on",
+            "request_id": "abcdefabcdefabcd",
+            "status": "ativos",
+            "q": "",
+            "jogos": [str(self.jogo.id)],
+        })
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.context["lote_assincrono"])
+        self.assertEqual(resp.context["lote_id"], "abcdefabcdefabcd")
+        enfileirar.assert_called_once()
+        self.assertEqual(enfileirar.call_args.kwargs["jogos_ids"], [self.jogo.id])
+        self.assertEqual(SimulacaoExecucao.objects.count(), 0)
+
+    @mock.patch("simulacao.views.progresso.ler")
+    def test_status_do_lote_exige_mediador(self, ler):
+        ler.return_value = {"lote_id": "abcdefabcdefabcd", "status": "executando", "total": 1, "concluidos": 0, "jogos": []}
+        url = reverse("simulacao:lote_status", args=["abcdefabcdefabcd"])
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        self.client.force_login(criar_mediador("sem_grupo"))
+        self.assertEqual(self.client.get(url).status_code, 403)
+        ler.assert_not_called()
+
+    @mock.patch("simulacao.views.progresso.ler")
+    def test_status_do_lote(self, ler):
+        entrar_como_mediador(self.client)
+        ler.return_value = {"lote_id": "abcdefabcdefabcd", "status": "executando", "total": 1, "concluidos": 0, "jogos": []}
+        resp = self.client.get(reverse("simulacao:lote_status", args=["abcdefabcdefabcd"]))
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()["status"], "executando")
+
+        ler.return_value = None
+        resp = self.client.get(reverse("simulacao:lote_status", args=["0000000000000000"]))
+        self.assertEqual(resp.status_code, 404)
+
+    def test_processar_lista_notifica_cada_jogo(self):
+        vistos = []
+        processar_lista([self.jogo.id], SimulacaoPeriodo.LPD, ao_processar_jogo=vistos.append)
+        self.assertEqual([r["jogo_id"] for r in vistos], [self.jogo.id])
+
+
+class ProcessarListaPorJogoTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.cen = bootstrap_cenario("Cenário B")
+        cls.jogos = [
+            Jogo.objects.create(
+                nome=f"Jogo B{i}", cod=f"B{i}", status=ativo_value(),
+                periodo_atual=2, status_decisoes_disponiveis=True,
+                cenario=cls.cen, criador=cls.cen.criador,
+            )
+            for i in range(3)
+        ]
+
+    def test_jogo_com_falha_nao_desfaz_os_demais(self):
+        falho = self.jogos[1]
+        spn = services._FUNCS[SimulacaoPeriodo.SPN]
+
+        def spn_instavel(jogo, execucao):
+            info = spn(jogo, execucao)
+            if jogo.id == falho.id:
+                raise RuntimeError("banco indisponível")
+            return info
+
+        with mock.patch.dict(services._FUNCS, {SimulacaoPeriodo.SPN: spn_instavel}):
+            res = processar_lista_por_jogo(
+                [j.id for j in self.jogos], SimulacaoPeriodo.SPN, tamanho_bloco=2,
+            )
+
+        por_jogo = {r["jogo_id"]: r for r in res["resultados"]}
+        self.assertIn("banco indisponível", por_jogo[falho.id]["erro"])
+        self.assertEqual(por_jogo[falho.id]["periodo_depois"], 2)
+
+        for jogo in self.jogos:
+            jogo.refresh_from_db()
+        self.assertEqual([j.periodo_atual for j in self.jogos], [3, 2, 3])
+        self.assertFalse(SimulacaoExecucao.objects.filter(jogo=falho).exists())
+        self.assertEqual(SimulacaoPeriodo.objects.count(), 2)
+
+
+class LoteParaleloTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.cen = bootstrap_cenario("Cenário P")
+        cls.jogos = [
+            Jogo.objects.create(
+                nome=f"Jogo P{i}", cod=f"P{i}", status=ativo_value(),
+                periodo_atual=i, status_decisoes_disponiveis=False,
+                cenario=cls.cen, criador=cls.cen.criador,
+            )
+            for i in range(5)
+        ]
+
+    def test_dividir_em_fatias_distribui_todos_os_jogos(self):
+        fatias = dividir_em_fatias([5, 1, 4, 2, 3, 3], 2)
+        self.assertEqual(fatias, [[1, 3, 5], [2, 4]])
+        self.assertEqual(dividir_em_fatias([7], 8), [[7]])
+
+    @mock.patch("simulacao.tasks.progresso")
+    def test_lote_paralelo_monta_o_mesmo_payload(self, progresso):
+        ids = [j.id for j in self.jogos]
+        celery_app.conf.task_always_eager = True
+        try:
+            enfileirar_lote(ids, SimulacaoPeriodo.LPD, lote_id="ffffffffffffffff", fatias=3)
+        finally:
+            celery_app.conf.task_always_eager = False
+
+        self.assertEqual(progresso.registrar_resultado.call_count, 5)
+        progresso.finalizar.assert_called_once_with("ffffffffffffffff", progresso.CONCLUIDO)
+        self.assertEqual(
+            SimulacaoExecucao.objects.filter(lote_id="ffffffffffffffff").count(), 5,
+        )
+        self.assertFalse(Jogo.objects.filter(id__in=ids, status_decisoes_disponiveis=False).exists())
+
+
+class ProcessarListaVetorizadaTests(TestCase):
+    ESTADOS = [(0, False), (0, True), (3, False), (3, True)]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cen = bootstrap_cenario("Cenário V")
+
+    def _criar_jogos(self, prefixo, estados):
+        return [
+            Jogo.objects.create(
+                nome=f"Jogo {prefixo}{i}", cod=f"{prefixo}{i}", status=ativo_value(),
+                periodo_atual=periodo, status_decisoes_disponiveis=decisoes,
+                cenario=self.cen, criador=self.cen.criador,
+            ).id
+            for i, (periodo, decisoes) in enumerate(estados)
+        ]
+
+    @staticmethod
+    def _comparavel(res):
+        campos = ("periodo_antes", "periodo_depois", "decisoes_antes",
+                  "decisoes_depois", "logs_criados", "erro")
+        return [tuple(r[c] for c in campos) for r in res["resultados"]]
+
+    def test_mesmo_resultado_que_o_caminho_jogo_a_jogo(self):
+        for acao in services.ACOES_VETORIZADAS:
+            with self.subTest(acao=acao):
+                serie = self._criar_jogos(f"S{acao}", self.ESTADOS)
+                vetor = self._criar_jogos(f"V{acao}", self.ESTADOS)
+
+                esperado = processar_lista(serie, acao)
+                obtido = processar_lista_vetorizada(vetor, acao)
+
+                self.assertEqual(self._comparavel(obtido), self._comparavel(esperado))
+                estado = lambda ids: list(
+                    Jogo.objects.filter(id__in=ids).order_by("id")
+                    .values_list("periodo_atual", "status_decisoes_disponiveis")
+                )
+                self.assertEqual(estado(vetor), estado(serie))
+                self.assertEqual(
+                    SimulacaoPeriodo.objects.filter(jogo_id__in=vetor).count(),
+                    SimulacaoPeriodo.objects.filter(jogo_id__in=serie).count(),
+                )
+
+    def test_numero_de_queries_nao_depende_da_quantidade_de_jogos(self):
+        poucos = self._criar_jogos("QP", [(1, True)] * 2)
+        muitos = self._criar_jogos("QM", [(1, True)] * 30)
+
+        with CaptureQueriesContext(connection) as ctx_poucos:
+            processar_lista_vetorizada(poucos, SimulacaoPeriodo.SPN)
+        with CaptureQueriesContext(connection) as ctx_muitos:
+            processar_lista_vetorizada(muitos, SimulacaoPeriodo.SPN)
+
+        self.assertEqual(len(ctx_poucos.captured_queries), len(ctx_muitos.captured_queries))
+
+
+class LoteIdempotenteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.cen = bootstrap_cenario("Cenário I")
+
+    def _jogo(self, cod):
+        return Jogo.objects.create(
+            nome=f"Jogo {cod}", cod=cod, status=ativo_value(),
+            periodo_atual=1, status_decisoes_disponiveis=True,
+            cenario=self.cen, criador=self.cen.criador,
+        )
+
+    def test_reenvio_devolve_resultado_gravado_sem_reexecutar(self):
+        for executar in (processar_lista, processar_lista_vetorizada):
+            with self.subTest(executar=executar.__name__):
+                jogo = self._jogo(f"I{executar.__name__[-4:]}")
+                lote = gerar_lote_id()
+
+                primeiro = executar([jogo.id], SimulacaoPeriodo.SPN, lote_id=lote)["resultados"][0]
+                segundo = executar([jogo.id], SimulacaoPeriodo.SPN, lote_id=lote)["resultados"][0]
+
+                jogo.refresh_from_db()
+                self.assertEqual(jogo.periodo_atual, 2)
+                self.assertFalse(primeiro["repetido"])
+                self.assertTrue(segundo["repetido"])
+                self.assertEqual(segundo["periodo_depois"], primeiro["periodo_depois"])
+                self.assertEqual(SimulacaoPeriodo.objects.filter(jogo=jogo).count(), 1)
+
+    def test_formulario_reenviado_nao_avanca_o_periodo_duas_vezes(self):
+        jogo = self._jogo("IFORM")
+        url = reverse("simulacao:simular")
+        request_id = self.client.get(url).context["form"].initial["request_id"]
+        data = {
+            "acao": SimulacaoPeriodo.SPA,
+            "request_id": request_id,
+            "status": "ativos",
+            "q": "",
+            "jogos": [str(jogo.id)],
+        }
+        with mock.patch("simulacao.views.trava_lote") as trava:
+            self.client.post(url, data)
+            self.client.post(url, data)
+
+        self.assertEqual(trava.call_args.args, (request_id,))
+        jogo.refresh_from_db()
+        self.assertEqual(jogo.periodo_atual, 2)
+        self.assertEqual(SimulacaoExecucao.objects.filter(jogo=jogo, lote_id=request_id).count(), 1)
+
+
+class ConcorrenciaOtimistaTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.cen = bootstrap_cenario("Cenário O")
+
+    def setUp(self):
+        self.jogo = Jogo.objects.create(
+            nome="Jogo O", cod="OTM", status=ativo_value(),
+            periodo_atual=4, status_decisoes_disponiveis=True,
+            cenario=self.cen, criador=self.cen.criador,
+        )
+
+    def _spn_concorrente(self, jogo_id):
+        Jogo.objects.filter(pk=jogo_id).update(
+            periodo_atual=F("periodo_atual") + 1, versao=F("versao") + 1,
+        )
+
+    def test_conflito_e_refeito_sobre_o_estado_novo(self):
+        criar_execucao = services._criar_execucao
+
+        def criar_execucao_disputada(jogo, *args):
+            # Outro mediador simula o jogo logo depois de ele ter sido lido
+            self._spn_concorrente(jogo.pk)
+            return criar_execucao(jogo, *args)
+
+        with mock.patch.object(services, "_criar_execucao", criar_execucao_disputada):
+            res = processar_lista([self.jogo.id], SimulacaoPeriodo.SPN)["resultados"][0]
+
+        self.jogo.refresh_from_db()
+        self.assertEqual(self.jogo.periodo_atual, 6)
+        self.assertEqual((res["periodo_antes"], res["periodo_depois"]), (5, 6))
+        self.assertEqual(
+            list(SimulacaoPeriodo.objects.filter(jogo=self.jogo).values_list("periodo_de", "periodo_para")),
+            [(5, 6)],
+        )
+
+    def test_conflito_persistente_vira_erro_sem_logs(self):
+        spn = services._FUNCS[SimulacaoPeriodo.SPN]
+
+        def spn_sempre_disputado(jogo, execucao):
+            self._spn_concorrente(jogo.pk)
+            return spn(jogo, execucao)
+
+        with mock.patch.dict(services._FUNCS, {SimulacaoPeriodo.SPN: spn_sempre_disputado}):
+            res = processar_lista([self.jogo.id], SimulacaoPeriodo.SPN)["resultados"][0]
+
+        self.assertIn("Conflito", res["erro"])
+        self.assertEqual(res["logs_criados"], 0)
+        self.assertFalse(SimulacaoPeriodo.objects.filter(jogo=self.jogo).exists())
+
+    def test_repetir_lote_depois_de_conflito_tenta_de_novo(self):
+        spn = services._FUNCS[SimulacaoPeriodo.SPN]
+
+        def spn_sempre_disputado(jogo, execucao):
+            self._spn_concorrente(jogo.pk)
+            return spn(jogo, execucao)
+
+        lote = gerar_lote_id()
+        with mock.patch.dict(services._FUNCS, {SimulacaoPeriodo.SPN: spn_sempre_disputado}):
+            res = processar_lista([self.jogo.id], SimulacaoPeriodo.SPN, lote_id=lote)["resultados"][0]
+        self.assertIn("Conflito", res["erro"])
+
+        res = processar_lista([self.jogo.id], SimulacaoPeriodo.SPN, lote_id=lote)["resultados"][0]
+        self.assertFalse(res["erro"])
+        self.assertFalse(res["repetido"])
+        self.assertEqual(res["periodo_depois"], res["periodo_antes"] + 1)
+
+    def test_reprocessamentos_tambem_conferem_a_versao(self):
+        criar_execucao = services._criar_execucao
+
+        def criar_execucao_disputada(jogo, *args):
+            self._spn_concorrente(jogo.pk)
+            return criar_execucao(jogo, *args)
+
+        for acao, logs in ((SimulacaoPeriodo.R0D, 5), (SimulacaoPeriodo.RDA, 1)):
+            with self.subTest(acao=acao):
+                versao = Jogo.objects.get(pk=self.jogo.pk).versao
+                with mock.patch.object(services, "_criar_execucao", criar_execucao_disputada):
+                    res = processar_lista([self.jogo.id], acao)["resultados"][0]
+
+                # Refeito sobre o período gravado pelo SPN concorrente
+                self.assertFalse(res["erro"])
+                self.assertEqual(res["periodo_antes"], res["periodo_depois"])
+                self.assertEqual(res["logs_criados"], logs)
+                self.assertEqual(Jogo.objects.get(pk=self.jogo.pk).versao, versao + 2)
+                self.assertEqual(
+                    SimulacaoPeriodo.objects.filter(jogo=self.jogo, acao=acao)
+                    .values_list("periodo_para", flat=True).get(),
+                    res["periodo_depois"],
+                )
+
+    def test_conflito_com_empresas_nao_chega_ao_motor(self):
+        Empresa.objects.bulk_create([
+            Empresa(nome=f"Empresa O{i}", jogo=self.jogo, criador=self.cen.criador) for i in range(3)
+        ])
+        criar_execucao = services._criar_execucao
+        simular_jogos = motor.simular_jogos
+        trechos = []
+
+        def criar_execucao_disputada(jogo, *args):
+            # O outro mediador já gravou os resultados do período 4
+            simular_jogos({jogo.pk: (4, 5)})
+            self._spn_concorrente(jogo.pk)
+            return criar_execucao(jogo, *args)
+
+        def simular_jogos_espiado(pedidos, *args, **kwargs):
+            trechos.append(pedidos)
+            return simular_jogos(pedidos, *args, **kwargs)
+
+        with mock.patch.object(services, "_criar_execucao", criar_execucao_disputada), \
+                mock.patch.object(motor, "simular_jogos", simular_jogos_espiado):
+            res = processar_lista([self.jogo.id], SimulacaoPeriodo.SPN)["resultados"][0]
+
+        # A tentativa com o estado velho falha na versao antes de gravar
+        # resultados; só a repetida, sobre o período 5, chega ao motor
+        self.assertFalse(res["erro"])
+        self.assertEqual(trechos, [{self.jogo.id: (5, 6)}])
+        self.assertEqual(
+            sorted(ResultadoEmpresa.objects.filter(jogo=self.jogo).values_list("periodo", flat=True)),
+            [4, 4, 4, 5, 5, 5],
+        )
+
+    @override_settings(SIMULACAO_TENTATIVAS_CONFLITO=0)
+    def test_sem_tentativas_devolve_conflito(self):
+        res = processar_lista([self.jogo.id], SimulacaoPeriodo.SPN)["resultados"][0]
+        self.assertIn("Conflito", res["erro"])
+        self.assertEqual(res["periodo_antes"], res["periodo_depois"])
+
+
+@override_settings(SIMULACAO_PASSADAS_DISPUTA=2, SIMULACAO_ESPERA_DISPUTA=0)
+class DisputaDeJogosTests(TransactionTestCase):
+    def setUp(self):
+        cen = bootstrap_cenario("Cenário D")
+        self.jogos = [
+            Jogo.objects.create(
+                nome=f"Jogo D{i}", cod=f"D{i}", status=ativo_value(),
+                periodo_atual=0, status_decisoes_disponiveis=False,
+                cenario=cen, criador=cen.criador,
+            )
+            for i in range(3)
+        ]
+
+    def _travar_em_outra_conexao(self, jogo_id, travado, liberar):
+        with transaction.atomic():
+            Jogo.objects.select_for_update().get(pk=jogo_id)
+            travado.set()
+            liberar.wait(10)
+        connection.close()
+
+    def test_jogo_travado_e_adiado_e_reportado_como_disputado(self):
+        travado, liberar = threading.Event(), threading.Event()
+        outro = threading.Thread(
+            target=self._travar_em_outra_conexao, args=(self.jogos[1].id, travado, liberar),
+        )
+        outro.start()
+        travado.wait(10)
+        try:
+            res = processar_lista_por_jogo([j.id for j in self.jogos], SimulacaoPeriodo.LPD)
+        finally:
+            liberar.set()
+            outro.join()
+
+        por_jogo = {r["jogo_id"]: r for r in res["resultados"]}
+        self.assertEqual(list(por_jogo), [j.id for j in self.jogos])
+        self.assertTrue(por_jogo[self.jogos[1].id].get("disputado"))
+        self.assertEqual(por_jogo[self.jogos[1].id]["logs_criados"], 0)
+        self.assertTrue(por_jogo[self.jogos[0].id]["decisoes_depois"])
+        self.assertTrue(por_jogo[self.jogos[2].id]["decisoes_depois"])
+        self.assertFalse(SimulacaoExecucao.objects.filter(jogo=self.jogos[1]).exists())
+
+
+class BenchmarkSimulacaoTests(TestCase):
+    def test_relatorio_cobre_todas_as_acoes(self):
+        with tempfile.TemporaryDirectory() as pasta:
+            saida = os.path.join(pasta, "bench.json")
+            call_command(
+                "benchmark_simulacao", jogos=3, periodo=2, saida=saida,
+                banco_atual=True, stdout=open(os.devnull, "w"),
+            )
+            with open(saida, encoding="utf-8") as arquivo:
+                relatorio = json.load(arquivo)
+
+        self.assertTrue(set(services._FUNCS) <= set(relatorio["acoes"]))
+        r0d = relatorio["acoes"][SimulacaoPeriodo.R0D]
+        # Uma faixa compactada por jogo reprocessado (o de período 0 não grava)
+        self.assertEqual(r0d["linhas_log"], 0 + 1 + 1)
+        self.assertGreater(r0d["queries"], 0)
+        self.assertFalse(Jogo.objects.filter(cod__startswith="bench-").exists())
+
+
+@unittest.skipUnless(connection.vendor == "postgresql", "particionamento só existe no PostgreSQL")
+class ParticoesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cen = bootstrap_cenario("Cenário P")
+        cls.jogo = Jogo.objects.create(
+            nome="Jogo P", cod="P1", status=ativo_value(),
+            periodo_atual=0, status_decisoes_disponiveis=False,
+            cenario=cen, criador=cen.criador,
+        )
+        cls.execucao = SimulacaoExecucao.objects.create(
+            jogo=cls.jogo, acao=SimulacaoPeriodo.LPD, lote_id="pppppppppppppppp"
+        )
+        cls.atual = particoes.inicio_do_mes(timezone.now())
+
+    def _log_em(self, mes):
+        log = SimulacaoPeriodo.objects.create(
+            execucao=self.execucao, jogo=self.jogo, acao=SimulacaoPeriodo.LPD,
+            periodo_de=0, periodo_para=0, step_index=SimulacaoPeriodo.objects.count(),
+        )
+        quando = timezone.make_aware(timezone.datetime(mes.year, mes.month, 15), timezone.utc)
+        SimulacaoPeriodo.objects.filter(pk=log.pk).update(requested_at=quando)
+        return log
+
+    def _linhas(self, tabela):
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT count(*) FROM {tabela}")
+            return cursor.fetchone()[0]
+
+    def test_tabela_e_particionada(self):
+        self.assertTrue(particoes.particionada())
+
+    def test_manter_cria_os_meses_a_frente(self):
+        relatorio = particoes.manter(meses_a_frente=6, retencao_meses=0)
+        meses = [mes for mes, _ in particoes.listar_particoes()]
+        for n in range(7):
+            self.assertIn(particoes.somar_meses(self.atual, n), meses)
+        self.assertIn(particoes.nome_particao(particoes.somar_meses(self.atual, 6)), relatorio["criadas"])
+
+    def test_linhas_da_padrao_migram_para_a_particao_nova(self):
+        futuro = particoes.somar_meses(self.atual, 24)
+        log = self._log_em(futuro)
+        self.assertEqual(self._linhas(particoes.PADRAO), 1)
+
+        self.assertTrue(particoes.criar_particao(futuro))
+        self.assertEqual(self._linhas(particoes.PADRAO), 0)
+        self.assertEqual(self._linhas(particoes.nome_particao(futuro)), 1)
+        self.assertTrue(SimulacaoPeriodo.objects.filter(pk=log.pk).exists())
+
+    def test_retencao_desanexa_ou_remove_particoes_vencidas(self):
+        antigo = particoes.somar_meses(self.atual, -14)
+        recente = particoes.somar_meses(self.atual, -2)
+        for mes in (antigo, recente):
+            particoes.criar_particao(mes)
+            self._log_em(mes)
+
+        relatorio = particoes.manter(retencao_meses=12, desanexar=True)
+        self.assertEqual(relatorio["desanexadas"], [particoes.nome_particao(antigo)])
+        self.assertEqual(SimulacaoPeriodo.objects.count(), 1)
+        # Desanexada, a partição continua como tabela avulsa
+        self.assertEqual(self._linhas(particoes.nome_particao(antigo)), 1)
+
+        mais_antigo = particoes.somar_meses(self.atual, -15)
+        particoes.criar_particao(mais_antigo)
+        relatorio = particoes.manter(retencao_meses=12, desanexar=False)
+        self.assertEqual(relatorio["removidas"], [particoes.nome_particao(mais_antigo)])
+
+
+class ArquivoTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cen = bootstrap_cenario("Cenário A")
+        cls.jogos = [
+            Jogo.objects.create(
+                nome=f"Jogo A{i}", cod=f"A{i}", status=ativo_value(),
+                periodo_atual=3, status_decisoes_disponiveis=False,
+                cenario=cen, criador=cen.criador,
+            )
+            for i in range(3)
+        ]
+
+    def setUp(self):
+        self.pasta = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.pasta, ignore_errors=True)
+        ids = [j.id for j in self.jogos]
+        processar_lista(ids, SimulacaoPeriodo.RND, lote_id="velhovelhovelho1")
+        processar_lista(ids, SimulacaoPeriodo.LPD, lote_id="velhovelhovelho2")
+        passado = timezone.now() - timezone.timedelta(days=400)
+        SimulacaoExecucao.objects.update(requested_at=passado)
+        processar_lista(ids, SimulacaoPeriodo.LPD, lote_id="recenterecente01")
+
+    def test_arquiva_em_blocos_e_reidrata_um_lote(self):
+        corte = timezone.now() - timezone.timedelta(days=30)
+        antes = list(
+            SimulacaoPeriodo.objects.filter(lote_id="velhovelhovelho1")
+            .order_by("id").values_list("id", "periodo_de", "periodo_para", "passos")
+        )
+
+        totais = arquivo.arquivar(corte, pasta=self.pasta, tamanho_bloco=4)
+        self.assertEqual(totais["execucoes"], 6)
+        self.assertEqual(totais["blocos"], 2)
+        self.assertEqual(
+            set(SimulacaoExecucao.objects.values_list("lote_id", flat=True)), {"recenterecente01"}
+        )
+        self.assertFalse(SimulacaoPeriodo.objects.filter(lote_id="velhovelhovelho1").exists())
+
+        registros = arquivo.ler_lote("velhovelhovelho1", pasta=self.pasta)
+        self.assertEqual(len(registros["execucoes"]), 3)
+
+        arquivo.restaurar_lote("velhovelhovelho1", pasta=self.pasta)
+        depois = list(
+            SimulacaoPeriodo.objects.filter(lote_id="velhovelhovelho1")
+            .order_by("id").values_list("id", "periodo_de", "periodo_para", "passos")
+        )
+        self.assertEqual(depois, antes)
+        self.assertFalse(
+            SimulacaoExecucao.objects.filter(lote_id="velhovelhovelho1", requested_at__gte=corte).exists()
+        )
+
+    def test_retoma_do_ultimo_bloco_concluido(self):
+        corte = timezone.now() - timezone.timedelta(days=30)
+        blocos = []
+
+        def falhar_no_segundo(nome, *_):
+            blocos.append(nome)
+            if len(blocos) == 2:
+                raise RuntimeError("interrompido")
+
+        with self.assertRaises(RuntimeError):
+            arquivo.arquivar(corte, pasta=self.pasta, tamanho_bloco=2, ao_arquivar_bloco=falhar_no_segundo)
+
+        totais = arquivo.arquivar(corte, pasta=self.pasta, tamanho_bloco=2)
+        self.assertEqual(totais["blocos"], 1)
+        self.assertFalse(SimulacaoExecucao.objects.filter(requested_at__lt=corte).exists())
+        self.assertEqual(len(arquivo.ler_lote("velhovelhovelho2", pasta=self.pasta)["execucoes"]), 3)
+
+    def _total_no_resumo(self, acao):
+        return SimulacaoResumoDiario.objects.filter(acao=acao).aggregate(t=Sum("total"))["t"] or 0
+
+    def test_restaurar_soma_ao_resumo_o_que_nao_estava_somado(self):
+        depois = timezone.now() + timezone.timedelta(hours=1)
+        rnd = SimulacaoPeriodo.objects.filter(lote_id="velhovelhovelho1").count()
+        # Arquivado antes da primeira rodada do resumo: a marca já passou dele ao restaurar
+        arquivo.arquivar(timezone.now() - timezone.timedelta(days=30), pasta=self.pasta)
+        atualizar_resumo(agora=depois)
+        self.assertEqual(self._total_no_resumo(SimulacaoPeriodo.RND), 0)
+
+        arquivo.restaurar_lote("velhovelhovelho1", pasta=self.pasta)
+        self.assertEqual(self._total_no_resumo(SimulacaoPeriodo.RND), rnd)
+
+    def test_restaurar_nao_soma_de_novo_o_que_ja_estava_somado(self):
+        depois = timezone.now() + timezone.timedelta(hours=1)
+        atualizar_resumo(agora=depois)
+        rnd = self._total_no_resumo(SimulacaoPeriodo.RND)
+        self.assertTrue(rnd)
+
+        arquivo.arquivar(timezone.now() - timezone.timedelta(days=30), pasta=self.pasta)
+        arquivo.restaurar_lote("velhovelhovelho1", pasta=self.pasta)
+        atualizar_resumo(agora=depois + timezone.timedelta(hours=1))
+        self.assertEqual(self._total_no_resumo(SimulacaoPeriodo.RND), rnd)
+
+
+class ResumoDiarioTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cen = bootstrap_cenario("Cenário S")
+        cls.jogos = [
+            Jogo.objects.create(
+                nome=f"Jogo S{i}", cod=f"S{i}", status=ativo_value(),
+                periodo_atual=2, status_decisoes_disponiveis=True,
+                cenario=cen, criador=cen.criador,
+            )
+            for i in range(2)
+        ]
+
+    def _depois(self):
+        return timezone.now() + timezone.timedelta(hours=1)
+
+    def test_soma_incremental_a_partir_da_marca(self):
+        ids = [j.id for j in self.jogos]
+        processar_lista(ids, SimulacaoPeriodo.SPN, lote_id=gerar_lote_id())
+        processar_lista(ids, SimulacaoPeriodo.SPN, lote_id=gerar_lote_id())
+        self.assertEqual(atualizar_resumo(agora=self._depois()), 2)
+
+        resumo = SimulacaoResumoDiario.objects.get(jogo=self.jogos[0], acao=SimulacaoPeriodo.SPN)
+        self.assertEqual((resumo.total, resumo.passos, resumo.periodo_max), (2, 2, 4))
+
+        # O que já foi somado não conta de novo; o log novo entra na rodada seguinte
+        processar_lista([ids[0]], SimulacaoPeriodo.R0D, lote_id=gerar_lote_id())
+        SimulacaoPeriodo.objects.filter(acao=SimulacaoPeriodo.R0D).update(
+            requested_at=timezone.now() + timezone.timedelta(hours=2)
+        )
+        atualizar_resumo(agora=timezone.now() + timezone.timedelta(hours=3))
+        resumo.refresh_from_db()
+        self.assertEqual(resumo.total, 2)
+        r0d = SimulacaoResumoDiario.objects.get(jogo=self.jogos[0], acao=SimulacaoPeriodo.R0D)
+        self.assertEqual((r0d.total, r0d.passos), (1, 4))
+
+    def test_view_le_do_resumo(self):
+        processar_lista([self.jogos[1].id], SimulacaoPeriodo.SPA, lote_id=gerar_lote_id())
+        atualizar_resumo(agora=self._depois())
+
+        url = reverse("simulacao:historico_resumo")
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        entrar_como_mediador(self.client)
+        resp = self.client.get(url, {"jogo": str(self.jogos[1].id)})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual([r.acao for r in resp.context["page_obj"]], [SimulacaoPeriodo.SPA])
+        self.assertEqual(resp.context["totais"][0]["total"], 1)
+
+
+class MotorTests(TestCase):
+    PARAMETROS = {
+        "demanda": 1000.0, "preco_referencia": 100.0, "elasticidade": 2.0,
+        "caixa_inicial": 5000.0, "custo_unitario": 40.0,
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cen = bootstrap_cenario("Cenário M")
+        cls.cen.produto.insumos.update(preco_unitario=40)
+        cls.jogo = Jogo.objects.create(
+            nome="Jogo M", cod="M1", status=ativo_value(),
+            periodo_atual=0, status_decisoes_disponiveis=True,
+            cenario=cls.cen, criador=cls.cen.criador,
+        )
+        cls.empresas = [
+            Empresa.objects.create(nome=f"Empresa {i}", jogo=cls.jogo, criador=cls.cen.criador)
+            for i in range(3)
+        ]
+
+    def test_periodo_vetorizado(self):
+        precos = np.array([100.0, 100.0, 200.0])
+        saida = motor.simular_periodo(
+            self.PARAMETROS, precos, np.array([500.0, 100.0, 500.0]), np.zeros(3), np.zeros(3),
+        )
+        # Preço igual, fatia igual; o dobro do preço com elasticidade 2 leva 1/4
+        self.assertEqual(saida["demanda"][0], saida["demanda"][1])
+        self.assertEqual(saida["demanda"][2], np.floor(saida["demanda"][0] / 4))
+        # A empresa sem produto suficiente perde vendas para as outras
+        self.assertEqual(saida["vendas"][1], 100)
+        self.assertGreater(saida["vendas"][0], saida["demanda"][0])
+        np.testing.assert_allclose(saida["caixa"], saida["vendas"] * precos - np.array([500, 100, 500]) * 40)
+
+    def test_decisoes_automaticas_repetem_a_ultima(self):
+        matriz = np.array([[np.nan, 5.0], [7.0, np.nan], [np.nan, np.nan]])
+        preenchida = motor._preencher_decisoes(matriz, np.array([1.0, 2.0]))
+        np.testing.assert_array_equal(preenchida, [[1, 5], [7, 5], [7, 5]])
+
+    def test_spn_grava_resultados_e_encadeia_o_caixa(self):
+        DecisaoEmpresa.objects.create(empresa=self.empresas[0], periodo=0, preco=80, producao=400)
+        processar_lista([self.jogo.id], SimulacaoPeriodo.SPN, lote_id=gerar_lote_id())
+        processar_lista([self.jogo.id], SimulacaoPeriodo.SPN, lote_id=gerar_lote_id())
+
+        p0 = {r.empresa_id: r for r in ResultadoEmpresa.objects.filter(periodo=0)}
+        p1 = {r.empresa_id: r for r in ResultadoEmpresa.objects.filter(periodo=1)}
+        self.assertEqual(len(p0), 3)
+        self.assertFalse(p0[self.empresas[0].id].automatica)
+        self.assertTrue(p0[self.empresas[1].id].automatica)
+        # Sem decisão no período 1 a empresa repete a do período 0
+        self.assertEqual((p1[self.empresas[0].id].preco, p1[self.empresas[0].id].producao), (80, 400))
+        r0, r1 = p0[self.empresas[0].id], p1[self.empresas[0].id]
+        self.assertEqual(r1.caixa, r0.caixa + r1.receita - r1.custo_producao)
+        self.assertEqual(r1.pagamentos, r1.custo_producao)  # insumo à vista
+
+    def test_reprocessar_reproduz_e_cancelar_descarta(self):
+        for _ in range(3):
+            processar_lista([self.jogo.id], SimulacaoPeriodo.SPN, lote_id=gerar_lote_id())
+        antes = list(ResultadoEmpresa.objects.order_by("periodo", "empresa").values_list("periodo", "vendas", "caixa"))
+
+        processar_lista([self.jogo.id], SimulacaoPeriodo.R0D, lote_id=gerar_lote_id())
+        depois = list(ResultadoEmpresa.objects.order_by("periodo", "empresa").values_list("periodo", "vendas", "caixa"))
+        self.assertEqual(antes, depois)
+
+        processar_lista_vetorizada([self.jogo.id], SimulacaoPeriodo.CAD, lote_id=gerar_lote_id())
+        self.assertEqual(ResultadoEmpresa.objects.aggregate(p=Max("periodo"))["p"], 1)
+
+    def test_reprocessar_retoma_do_ultimo_checkpoint_valido(self):
+        for _ in range(3):
+            processar_lista([self.jogo.id], SimulacaoPeriodo.SPN, lote_id=gerar_lote_id())
+        self.assertEqual(EstadoPeriodo.objects.filter(jogo=self.jogo).count(), 3)
+
+        def ids_por_periodo():
+            return {
+                periodo: set(ResultadoEmpresa.objects.filter(periodo=periodo).values_list("pk", flat=True))
+                for periodo in range(3)
+            }
+
+        antes = ids_por_periodo()
+        # Nada mudou: o reprocessamento mantém todos os períodos
+        processar_lista([self.jogo.id], SimulacaoPeriodo.R0D, lote_id=gerar_lote_id())
+        self.assertEqual(ids_por_periodo(), antes)
+
+        # Uma decisão do período 1 invalida só dali em diante
+        DecisaoEmpresa.objects.create(empresa=self.empresas[0], periodo=1, preco=70, producao=600)
+        processar_lista([self.jogo.id], SimulacaoPeriodo.R0D, lote_id=gerar_lote_id())
+        depois = ids_por_periodo()
+        self.assertEqual(depois[0], antes[0])
+        self.assertFalse(depois[1] & antes[1])
+        self.assertEqual(ResultadoEmpresa.objects.get(periodo=1, empresa=self.empresas[0]).producao, 600)
+
+        retomado = list(ResultadoEmpresa.objects.values_list("periodo", "empresa", "vendas", "caixa", "a_pagar"))
+        motor.simular(self.jogo, 0, 3)
+        self.assertEqual(
+            list(ResultadoEmpresa.objects.values_list("periodo", "empresa", "vendas", "caixa", "a_pagar")), retomado,
+        )
+
+    def test_reprocessamento_identico_so_confere_impressoes(self):
+        decisao = DecisaoEmpresa.objects.create(empresa=self.empresas[1], periodo=1, preco=90, producao=300)
+        motor.simular(self.jogo, 0, 3)
+        antes = dict(ResultadoEmpresa.objects.values_list("pk", "periodo"))
+
+        decisao.save()  # regravar a mesma decisão não muda a impressão
+        with CaptureQueriesContext(connection) as ctx:
+            motor.reprocessar(self.jogo, 3)
+        self.assertFalse([q for q in ctx.captured_queries if q["sql"].startswith("INSERT")])
+        self.assertEqual(dict(ResultadoEmpresa.objects.values_list("pk", "periodo")), antes)
+
+        # Mudar o período 2 só recalcula o período 2
+        DecisaoEmpresa.objects.create(empresa=self.empresas[1], periodo=2, preco=90, producao=100)
+        motor.reprocessar(self.jogo, 3)
+        depois = dict(ResultadoEmpresa.objects.values_list("pk", "periodo"))
+        mantidos = {pk for pk, periodo in antes.items() if periodo < 2}
+        self.assertEqual(mantidos, {pk for pk, periodo in depois.items() if periodo < 2})
+        self.assertFalse({pk for pk, periodo in depois.items() if periodo == 2} & set(antes))
+
+    def test_checkpoint_de_outra_versao_do_cenario_nao_vale(self):
+        motor.simular(self.jogo, 0, 2)
+        self.cen.save()  # nova versao_compilacao
+        antes = set(ResultadoEmpresa.objects.values_list("pk", flat=True))
+        motor.reprocessar(self.jogo, 2)
+        self.assertFalse(antes & set(ResultadoEmpresa.objects.values_list("pk", flat=True)))
+        self.assertEqual(
+            set(EstadoPeriodo.objects.values_list("versao_cenario", flat=True)),
+            {Cenario.objects.get(pk=self.cen.pk).versao_compilacao},
+        )
+
+    def test_sem_periodo_liberado_nao_simula(self):
+        Jogo.objects.filter(pk=self.jogo.pk).update(status_decisoes_disponiveis=False)
+        res = processar_lista([self.jogo.id], SimulacaoPeriodo.SPA, lote_id=gerar_lote_id())
+        self.assertTrue(res["resultados"][0]["erro"])
+        self.assertFalse(ResultadoEmpresa.objects.exists())
+
+    def test_consultas_nao_crescem_com_as_empresas(self):
+        def consultas():
+            with CaptureQueriesContext(connection) as ctx:
+                motor.simular(self.jogo, 0, 3)
+            return len(ctx.captured_queries)
+
+        consultas()  # a primeira chamada compila o cenário
+        base = consultas()
+        Empresa.objects.bulk_create([
+            Empresa(nome=f"Extra {i}", jogo=self.jogo, criador=self.cen.criador) for i in range(50)
+        ])
+        self.assertEqual(consultas(), base)
+        self.assertEqual(ResultadoEmpresa.objects.filter(periodo=2).count(), 53)
+
+
+class FluxoCaixaTests(TestCase):
+    def test_parcelas_acumuladas_por_empresa_e_periodo(self):
+        # Empresa 0 compra 100 à vista e 60 em x2 no período 0; empresa 1 compra 30 em x2 no período 1
+        prazos = np.array([[1, 0, 0], [0, 0.5, 0.5], [0, 0.5, 0.5]])
+        contas = fluxo_caixa.contas_a_pagar(
+            np.array([0, 0, 1]), np.array([0, 0, 1]), np.array([100.0, 60.0, 30.0]), prazos,
+            n_devedores=2, n_periodos=2,
+        )
+        self.assertEqual(contas.shape, (2, 2, 4))
+        np.testing.assert_array_equal(contas.sum(axis=0), [[100, 30, 30, 0], [0, 0, 15, 15]])
+
+        pagamentos, pendentes = fluxo_caixa.vencimentos(contas, np.array([[0, 0], [10.0, 5.0]]))
+        np.testing.assert_array_equal(pagamentos, [[100, 10], [30, 5]])
+        # No fechamento do período 0 a compra do período 1 ainda não existe
+        np.testing.assert_array_equal(pendentes[0], [[30, 30], [5, 0]])
+        np.testing.assert_array_equal(pendentes[1], [[30, 0], [15, 15]])
+
+    def test_compras_de_producao(self):
+        devedor, periodo, valores, prazos = fluxo_caixa.compras_de_producao(
+            np.array([[10.0, 20.0]]), np.array([2.0, 1.0]), np.array([[1, 0, 0], [0, 0.5, 0.5]]),
+        )
+        np.testing.assert_array_equal(devedor, [0, 0, 1, 1])
+        np.testing.assert_array_equal(periodo, [0, 0, 0, 0])
+        np.testing.assert_array_equal(valores, [20, 10, 40, 20])
+        np.testing.assert_array_equal(prazos[1], [0, 0.5, 0.5])
+
+    def test_motor_paga_insumos_a_prazo(self):
+        cen = bootstrap_cenario("Cenário Prazo")
+        cen.produto.insumos.update(preco_unitario=40, forma_pagamento="x2")
+        jogo = Jogo.objects.create(
+            nome="Jogo Prazo", cod="FP1", status=ativo_value(), periodo_atual=0,
+            status_decisoes_disponiveis=True, cenario=cen, criador=cen.criador,
+        )
+        empresa = Empresa.objects.create(nome="Empresa P", jogo=jogo, criador=cen.criador)
+        DecisaoEmpresa.objects.create(empresa=empresa, periodo=0, preco=100, producao=100)
+
+        motor.simular(jogo, 0, 1)
+        motor.simular(jogo, 1, 3)
+        r = list(ResultadoEmpresa.objects.filter(jogo=jogo).order_by("periodo"))
+        # 100 unidades x 40 por período, metade paga um e dois períodos depois
+        self.assertEqual([x.pagamentos for x in r], [0, 2000, 4000])
+        self.assertEqual(r[0].a_pagar, [2000, 2000])
+        self.assertEqual(r[2].a_pagar, [4000, 2000])
+        self.assertEqual(r[0].caixa, 100000 + r[0].receita)
+
+        # Resimular tudo de uma vez dá o mesmo que período a período
+        antes = [(x.caixa, x.a_pagar) for x in r]
+        motor.simular(jogo, 0, 3)
+        self.assertEqual(
+            [(x.caixa, x.a_pagar) for x in ResultadoEmpresa.objects.filter(jogo=jogo).order_by("periodo")], antes,
+        )
+
+
+class _RedisFalso:
+    """O suficiente do cliente Redis para o cache de cenários compilados."""
+
+    def __init__(self):
+        self.dados = {}
+
+    def mget(self, chaves):
+        return [self.dados.get(chave) for chave in chaves]
+
+    def set(self, chave, valor, ex=None):
+        self.dados[chave] = valor
+
+    def pipeline(self):
+        return self
+
+    def execute(self):
+        pass
+
+
+class CenarioCompiladoTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.cen = bootstrap_cenario("Cenário C")
+        criador = cls.cen.criador
+        cls.base = cls.cen.produto.insumos.get()
+        cls.base.preco_unitario, cls.base.quantidade = 10, 2
+        cls.base.save()
+        cls.parcelado = Insumo.objects.create(
+            nome="Parcelado", fornecedor="F", forma_pagamento="x2", preco_unitario=5, criador=criador,
+        )
+        cls.cen.produto.insumos.add(cls.parcelado)
+
+    def setUp(self):
+        cenario_compilado.limpar_cache_local()
+        self.cen.refresh_from_db()
+
+    def test_compila_custos_e_parcelas(self):
+        compilado = cenario_compilado.obter(self.cen)
+        np.testing.assert_array_equal(compilado.custos, [20, 5])
+        np.testing.assert_array_equal(compilado.parcelas, [[1, 0, 0], [0, 0.5, 0.5]])
+        self.assertEqual(compilado.parametros["custo_unitario"], 25)
+
+    def test_cache_local_dispensa_o_banco(self):
+        cenario_compilado.obter(self.cen)
+        with self.assertNumQueries(0):
+            cenario_compilado.obter(self.cen)
+
+    def test_redis_compartilha_entre_processos(self):
+        with mock.patch.object(cenario_compilado, "get_redis", return_value=_RedisFalso()):
+            cenario_compilado.obter(self.cen)
+            # Outro processo: LRU vazio, mas o compilado vem do Redis
+            cenario_compilado.limpar_cache_local()
+            with self.assertNumQueries(0):
+                compilado = cenario_compilado.obter(self.cen)
+        self.assertEqual(compilado.parametros["custo_unitario"], 25)
+        np.testing.assert_array_equal(compilado.parcelas[1], [0, 0.5, 0.5])
+
+    def test_alteracoes_trocam_a_versao(self):
+        versoes = [self.cen.versao_compilacao]
+
+        def versao_nova():
+            self.cen.refresh_from_db()
+            self.assertNotIn(self.cen.versao_compilacao, versoes)
+            versoes.append(self.cen.versao_compilacao)
+
+        self.parcelado.preco_unitario = 7
+        self.parcelado.save()
+        versao_nova()
+        self.assertEqual(cenario_compilado.obter(self.cen).parametros["custo_unitario"], 27)
 
-        self.assertEqual(page_obj.object_list[0].execucao.lote_id, "aaaaaaaaaaaaaaaa")
+        self.cen.produto.insumos.remove(self.parcelado)
+        versao_nova()
+        self.parcelado.produtos.add(self.cen.produto)
+        versao_nova()
+        self.parcelado.produtos.clear()
+        versao_nova()
+        self.cen.demanda_mercado = 500
+        self.cen.save()
+        versao_nova()
+        self.base.delete()
+        versao_nova()
+        self.assertEqual(cenario_compilado.obter(self.cen).parametros["custo_unitario"], 0)
@@ -0,0 +1,46 @@
+import logging
+from contextlib import contextmanager
+
+from django.conf import settings
+from redis.exceptions import ConnectionError as RedisConnectionError, LockError
+
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+
+class LoteEmExecucao(Exception):
+    """O mesmo lote continua em execução depois do tempo máximo de espera."""
+
+
+@contextmanager
+def trava_lote(lote_id):
+    """
+    Garante uma única execução em andamento por lote. Um reenvio concorrente
+    espera a primeira execução terminar e então encontra os resultados já
+    gravados em SimulacaoExecucao, que são devolvidos sem reexecutar nada.
+
+    Sem Redis disponível a trava é ignorada: a unicidade (jogo, lote_id) no
+    banco continua impedindo execuções duplicadas.
+    """
+    trava = get_redis().lock(
+        f"simulacao:lote:{lote_id}:trava",
+        timeout=settings.SIMULACAO_TRAVA_TIMEOUT,
+        blocking_timeout=settings.SIMULACAO_TRAVA_ESPERA,
+    )
+    try:
+        adquirida = trava.acquire()
+    except RedisConnectionError:
+        logger.warning("Redis indisponível; lote %s segue sem trava", lote_id)
+        yield
+        return
+
+    if not adquirida:
+        raise LoteEmExecucao(lote_id)
+    try:
+        yield
+    finally:
+        try:
+            trava.release()
+        except (LockError, RedisConnectionError):
+            logger.warning("Trava do lote %s expirou antes do fim da execução", lote_id)
@@ -1,9 +1,13 @@
 from django.urls import path
-from .views import SimulacaoView, HistoricoView
+from .views import SimulacaoView, HistoricoView, HistoricoExportView, HistoricoResumoView, ExecucaoPassosView, LoteStatusView
 
 app_name = "simulacao"
 
 urlpatterns = [
     path("simular/", SimulacaoView.as_view(), name="simular"),
     path("historico/", HistoricoView.as_view(), name="historico"),
+    path("historico/exportar/", HistoricoExportView.as_view(), name="historico_exportar"),
+    path("historico/resumo/", HistoricoResumoView.as_view(), name="historico_resumo"),
+    path("historico/execucoes/<int:pk>/passos/", ExecucaoPassosView.as_view(), name="execucao_passos"),
+    path("lotes/<str:lote_id>/status/", LoteStatusView.as_view(), name="lote_status"),
 ]
\ No newline at end of file
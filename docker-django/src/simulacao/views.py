@@ -1,11 +1,27 @@
-from django.shortcuts import render
-from django.views import View
+import csv
+import datetime
+import json
+
+from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
+from django.db.models import Count, Max, Min, Sum
+from django.http import JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404, render
+from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.utils.dateparse import parse_date
+from django.utils.http import urlencode
+from django.views import View
 
+from authentication.decorators import group_required
 from jogos.models import Jogo
+from . import progresso
+from .paginacao import paginar
 from .forms import SimularForm, FiltroJogosForm
-from .services import processar_lista, gerar_lote_id
-from .models import SimulacaoPeriodo
+from .services import processar_lista, processar_lista_vetorizada, gerar_lote_id, ACOES_VETORIZADAS
+from .tasks import enfileirar_lote
+from .travas import trava_lote, LoteEmExecucao
+from .models import SimulacaoExecucao, SimulacaoPeriodo, SimulacaoResumoDiario, SimulacaoResumoMarca
 
 
 class SimulacaoView(View):
@@ -40,17 +56,26 @@ class SimulacaoView(View):
 
         return filtro_form, jogos_filtrados, jogos_ativos_para_simular
 
-    def get(self, request):
-        filtro_form, jogos_filtrados, jogos_ativos = self._jogos_filtrados(request)
-        form = SimularForm(
+    def _form_inicial(self, filtro_form, jogos_ativos):
+        """
+        SimularForm vazio, preservando os filtros atuais nos campos ocultos.
+        O request_id já vem gerado: reenviar o mesmo formulário (duplo clique,
+        retry do navegador) repete o lote em vez de criar outro.
+        """
+        return SimularForm(
             jogos_qs=jogos_ativos,
             initial={
+                "request_id": gerar_lote_id(),
                 "status": (filtro_form.cleaned_data.get("status")
                            if filtro_form.is_valid() else FiltroJogosForm.STATUS_ATIVOS),
                 "q": (filtro_form.cleaned_data.get("q")
                       if filtro_form.is_valid() else ""),
             },
         )
+
+    def get(self, request):
+        filtro_form, jogos_filtrados, jogos_ativos = self._jogos_filtrados(request)
+        form = self._form_inicial(filtro_form, jogos_ativos)
         return render(request, self.template_name, {
             "form": form,
             "filtro_form": filtro_form,
@@ -90,13 +115,34 @@ class SimulacaoView(View):
         jogos_ids = list(ids_post)
         acao = form.cleaned_data["acao"]
         lote_id = form.cleaned_data.get("request_id") or gerar_lote_id()
+        user = request.user if getattr(request, "user", None) and request.user.is_authenticated else None
 
-        res = processar_lista(
-            jogos_ids=jogos_ids,
-            acao=acao,
-            user=(request.user if getattr(request, "user", None) and request.user.is_authenticated else None),
-            lote_id=lote_id,
-        )
+        if form.cleaned_data.get("assincrono"):
+            enfileirar_lote(jogos_ids=jogos_ids, acao=acao, user=user, lote_id=lote_id)
+            return render(request, self.template_name, {
+                "form": self._form_inicial(filtro_form, jogos_ativos),
+                "filtro_form": filtro_form,
+                "jogos": jogos_filtrados,
+                "lote_id": lote_id,
+                "lote_assincrono": True,
+            })
+
+        executar = processar_lista_vetorizada if acao in ACOES_VETORIZADAS else processar_lista
+        try:
+            with trava_lote(lote_id):
+                res = executar(
+                    jogos_ids=jogos_ids,
+                    acao=acao,
+                    user=user,
+                    lote_id=lote_id,
+                )
+        except LoteEmExecucao:
+            form.add_error(None, "Este lote ainda está em execução. Aguarde e consulte o histórico.")
+            return render(request, self.template_name, {
+                "form": form,
+                "filtro_form": filtro_form,
+                "jogos": jogos_filtrados,
+            })
 
         resultados = res["resultados"]
         jogos_map = {j.id: j for j in Jogo.objects.filter(id__in=jogos_ids)}
@@ -106,21 +152,13 @@ class SimulacaoView(View):
             linhas.append({
                 "jogo": j,
                 "acao": r["acao"],
-                "ok": True,
-                "mensagem": "",
+                "ok": not r.get("erro"),
+                "mensagem": r.get("erro", ""),
                 "periodo_final": r["periodo_depois"],
                 "logs_count": r["logs_criados"],
             })
 
-        form = SimularForm(
-            jogos_qs=jogos_ativos,
-            initial={
-                "status": (filtro_form.cleaned_data.get("status")
-                           if filtro_form.is_valid() else FiltroJogosForm.STATUS_ATIVOS),
-                "q": (filtro_form.cleaned_data.get("q")
-                      if filtro_form.is_valid() else ""),
-            },
-        )
+        form = self._form_inicial(filtro_form, jogos_ativos)
 
         contexto = {
             "form": form,
@@ -131,38 +169,237 @@ class SimulacaoView(View):
         }
         return render(request, self.template_name, contexto)
 
+# Endpoints de consulta: só mediadores logados
+apenas_mediadores = method_decorator([login_required, group_required(["Mediador"])], name="dispatch")
+
+
+@apenas_mediadores
+class LoteStatusView(View):
+    """Progresso de um lote em segundo plano, lido direto do Redis."""
+
+    def get(self, request, lote_id):
+        dados = progresso.ler(lote_id)
+        if dados is None:
+            return JsonResponse({"erro": "Lote não encontrado."}, status=404)
+        return JsonResponse(dados)
+
+
+def _inicio_do_dia(dia):
+    return timezone.make_aware(datetime.datetime.combine(dia, datetime.time.min))
+
 
+def _jogo_do_filtro(valor):
+    """Jogo escolhido no filtro, para preencher a caixa de autocomplete."""
+    return Jogo.objects.filter(pk=valor).first() if valor.isdigit() else None
+
+
+def _historico_filtrado(request, qs=None):
+    """
+    Aplica os filtros do histórico (acao/jogo/lote) do querystring.
+    Serve tanto para os logs (padrão) quanto para as execuções, que têm
+    os mesmos campos.
+    """
+    if qs is None:
+        qs = SimulacaoPeriodo.objects.all()
+
+    filtros = {
+        "acao": request.GET.get("acao") or "",
+        "jogo": request.GET.get("jogo") or "",
+        "lote": request.GET.get("lote") or "",
+        "de": request.GET.get("de") or "",
+        "ate": request.GET.get("ate") or "",
+    }
+
+    if filtros["acao"]:
+        qs = qs.filter(acao=filtros["acao"])
+    if filtros["jogo"]:
+        qs = qs.filter(jogo_id=filtros["jogo"])
+    if filtros["lote"]:
+        qs = qs.filter(lote_id=filtros["lote"])
+
+    # Datas inclusivas, no fuso local; datas inválidas são ignoradas
+    de, ate = parse_date(filtros["de"]), parse_date(filtros["ate"])
+    if de:
+        qs = qs.filter(requested_at__gte=_inicio_do_dia(de))
+    else:
+        filtros["de"] = ""
+    if ate:
+        qs = qs.filter(requested_at__lt=_inicio_do_dia(ate + datetime.timedelta(days=1)))
+    else:
+        filtros["ate"] = ""
+
+    return qs, filtros
+
+
+def _totalizar_execucoes(execucoes):
+    """
+    Anota em cada execução logs, passos e a faixa de períodos dos seus logs.
+    O GROUP BY roda depois do LIMIT da página e só sobre os logs dessas
+    execuções: o custo acompanha o tamanho da página, não o do log.
+    """
+    totais = {
+        linha["execucao_id"]: linha
+        for linha in SimulacaoPeriodo.objects.filter(execucao_id__in=[e.pk for e in execucoes])
+        .values("execucao_id")
+        .annotate(logs=Count("id"), passos=Sum("passos"),
+                  periodo_min=Min("periodo_de"), periodo_max=Max("periodo_para"))
+        .order_by()
+    }
+    for execucao in execucoes:
+        linha = totais.get(execucao.pk, {})
+        execucao.logs = linha.get("logs", 0)
+        execucao.passos = linha.get("passos")
+        execucao.periodo_min = linha.get("periodo_min")
+        execucao.periodo_max = linha.get("periodo_max")
+
+
+@apenas_mediadores
 class HistoricoView(View):
     template_name = "simulacao/historico.html"
+    por_pagina = 20
 
     def get(self, request):
-        qs = (
-            SimulacaoPeriodo.objects
-            .select_related("jogo", "execucao")
-            .order_by("-requested_at")
+        agrupar = request.GET.get("agrupar") == "execucao"
+        # Agrupado: uma linha por execução, paginada sem tocar nos logs
+        qs, filtros = _historico_filtrado(request, SimulacaoExecucao.objects.all() if agrupar else None)
+
+        pagina = paginar(
+            qs.select_related("jogo"),
+            apos=request.GET.get("apos"),
+            antes=request.GET.get("antes"),
+            tamanho=self.por_pagina,
         )
 
-        acao = request.GET.get("acao") or ""
-        jogo_id = request.GET.get("jogo") or ""
-        lote = request.GET.get("lote") or ""
+        if agrupar:
+            _totalizar_execucoes(pagina.object_list)
+            filtros["agrupar"] = "execucao"
+
+        return render(request, self.template_name, {
+            "pagina": pagina,
+            "agrupar": agrupar,
+            "filtros_qs": urlencode(filtros),
+            "jogo_obj": _jogo_do_filtro(filtros["jogo"]),
+            "acao": filtros["acao"],
+            "jogo_sel": filtros["jogo"],
+            "lote": filtros["lote"],
+            "de": filtros["de"],
+            "ate": filtros["ate"],
+            "SimulacaoPeriodo": SimulacaoPeriodo,
+        })
+
+
+@apenas_mediadores
+class ExecucaoPassosView(View):
+    """Passos de uma execução (faixas já expandidas), pedidos ao abrir a linha agrupada."""
 
-        if acao:
-            qs = qs.filter(acao=acao)
-        if jogo_id:
-            qs = qs.filter(jogo_id=jogo_id)
-        if lote:
-            qs = qs.filter(execucao__lote_id=lote)
+    def get(self, request, pk):
+        execucao = get_object_or_404(SimulacaoExecucao, pk=pk)
+        passos = [
+            {"acao": log.get_acao_display(), "de": de, "para": para, "step": log.step_index}
+            for log in execucao.periodos.order_by("step_index")
+            for de, para in log.expandir()
+        ]
+        return JsonResponse({"execucao": execucao.pk, "passos": passos})
 
-        paginator = Paginator(qs, 20)
-        page_obj = paginator.get_page(request.GET.get("page"))
 
-        jogos = Jogo.objects.order_by("nome")
+@apenas_mediadores
+class HistoricoResumoView(View):
+    """
+    Atividade por dia, jogo e ação, lida do resumo diário em vez do log:
+    o custo depende de dias x jogos, não do número de linhas do histórico.
+    """
+    template_name = "simulacao/historico_resumo.html"
+    por_pagina = 50
+    dias_padrao = 30
+
+    def get(self, request):
+        hoje = timezone.localdate()
+        filtros = {
+            "acao": request.GET.get("acao") or "",
+            "jogo": request.GET.get("jogo") or "",
+            "de": request.GET.get("de") or "",
+            "ate": request.GET.get("ate") or "",
+        }
+        de = parse_date(filtros["de"]) or hoje - datetime.timedelta(days=self.dias_padrao - 1)
+        ate = parse_date(filtros["ate"]) or hoje
+
+        qs = SimulacaoResumoDiario.objects.filter(dia__gte=de, dia__lte=ate)
+        if filtros["acao"]:
+            qs = qs.filter(acao=filtros["acao"])
+        if filtros["jogo"]:
+            qs = qs.filter(jogo_id=filtros["jogo"])
+
+        totais = qs.values("acao").annotate(total=Sum("total"), passos=Sum("passos")).order_by("acao")
+        rotulos = dict(SimulacaoPeriodo.ACAO_CHOICES)
+        page_obj = Paginator(
+            qs.select_related("jogo").order_by("-dia", "jogo__nome", "acao"), self.por_pagina
+        ).get_page(request.GET.get("page"))
+        marca = SimulacaoResumoMarca.objects.filter(pk=1).values_list("ate", flat=True).first()
 
         return render(request, self.template_name, {
             "page_obj": page_obj,
-            "jogos": jogos,
-            "acao": acao,
-            "jogo_sel": jogo_id,
-            "lote": lote,
+            "totais": [dict(t, rotulo=rotulos.get(t["acao"], t["acao"])) for t in totais],
+            "filtros_qs": urlencode(filtros),
+            "jogo_obj": _jogo_do_filtro(filtros["jogo"]),
+            "acao": filtros["acao"],
+            "jogo_sel": filtros["jogo"],
+            "de": de,
+            "ate": ate,
+            "atualizado_ate": marca,
             "SimulacaoPeriodo": SimulacaoPeriodo,
         })
+
+
+class _Eco:
+    """Pseudo-arquivo para o csv.writer: devolve a linha em vez de guardá-la."""
+
+    def write(self, valor):
+        return valor
+
+
+@apenas_mediadores
+class HistoricoExportView(View):
+    """
+    Exporta o histórico filtrado em CSV ou NDJSON (?formato=ndjson).
+    As linhas saem em streaming, lidas do banco em blocos pelo iterator():
+    a memória fica constante e o primeiro byte sai na hora.
+    """
+    campos = (
+        "requested_at", "jogo__cod", "jogo__nome", "acao",
+        "periodo_de", "periodo_para", "passos", "step_index", "lote_id",
+    )
+    cabecalho = (
+        "quando", "jogo_cod", "jogo_nome", "acao",
+        "periodo_de", "periodo_para", "passos", "step", "lote",
+    )
+    chunk_size = 2000
+
+    def get(self, request):
+        qs, _ = _historico_filtrado(request)
+        linhas = (
+            qs.order_by("-requested_at", "-id")
+            .values_list(*self.campos)
+            .iterator(chunk_size=self.chunk_size)
+        )
+
+        nome = f"historico_simulacoes_{timezone.now():%Y%m%d_%H%M%S}"
+        if request.GET.get("formato") == "ndjson":
+            resposta = StreamingHttpResponse(self._ndjson(linhas), content_type="application/x-ndjson")
+            nome += ".ndjson"
+        else:
+            resposta = StreamingHttpResponse(self._csv(linhas), content_type="text/csv; charset=utf-8")
+            nome += ".csv"
+        resposta["Content-Disposition"] = f'attachment; filename="{nome}"'
+        return resposta
+
+    def _csv(self, linhas):
+        escritor = csv.writer(_Eco())
+        yield escritor.writerow(self.cabecalho)
+        for linha in linhas:
+            yield escritor.writerow((linha[0].isoformat(),) + linha[1:])
+
+    def _ndjson(self, linhas):
+        for linha in linhas:
+            registro = dict(zip(self.cabecalho, linha))
+            registro["quando"] = registro["quando"].isoformat()
+            yield json.dumps(registro, ensure_ascii=False) + "\n"